@@ -0,0 +1,105 @@
+"""
+Pre-rendered map backgrounds cached on disk
+
+Building the Basemap and drawing coastlines, countries, continents and
+the blue marble takes seconds. The first time a background is needed it
+is drawn normally and then saved: the pickled Basemap, the rendered
+figure as an RGBA array and the position and limits of the map axes.
+Later runs paste the raster into a new figure of the same size and put
+a transparent axes with the same position and limits over it, so events
+drawn through the unpickled Basemap land on the same pixels.
+
+Entries are keyed by a hash of the Basemap parameters (projection,
+resolution, ...), the figure size, the dpi and LAYERS_VERSION
+"""
+import hashlib
+import json
+import os
+import pickle
+
+import numpy as np
+import matplotlib.pyplot as plt
+
+from render import BASEMAP_PARAMS, draw_background
+
+
+# change when draw_background draws different layers
+LAYERS_VERSION = 1
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                         ".background_cache")
+
+
+def background_key(map_params, figsize, dpi):
+    text = json.dumps({"map": map_params, "figsize": list(figsize),
+                       "dpi": dpi, "layers": LAYERS_VERSION}, sort_keys=True)
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def _draw(map_params, figsize, dpi):
+    from mpl_toolkits.basemap import Basemap
+
+    figure = plt.figure(figsize=figsize, dpi=dpi)
+    basemap = Basemap(**map_params)
+    # pickled before drawing: the drawn Basemap refers to its artists
+    pickled = pickle.dumps(basemap, pickle.HIGHEST_PROTOCOL)
+    draw_background(basemap)
+    figure.canvas.draw()
+    return figure, basemap, pickled
+
+
+def _paste(raster, layout, figsize, dpi):
+    figure = plt.figure(figsize=figsize, dpi=dpi)
+    # below the axes, which are drawn in the same zorder before images
+    figure.figimage(raster, 0, 0, origin="upper", resize=False, zorder=-1)
+    ax = figure.add_axes(layout["position"])
+    ax.set_xlim(layout["xlim"])
+    ax.set_ylim(layout["ylim"])
+    ax.patch.set_visible(False)
+    ax.set_axis_off()
+    return figure
+
+
+def background_figure(map_params=None, figsize=(12, 7), dpi=100,
+                      cache_dir=CACHE_DIR, refresh=False):
+    """
+    a figure with the map background and its Basemap, ready for events;
+    the current axes are the map axes
+    map_params: Basemap keyword arguments, by default BASEMAP_PARAMS
+    refresh: draw and store the background even if it is cached
+    returns (figure, basemap)
+    """
+    if map_params is None:
+        map_params = BASEMAP_PARAMS
+    key = background_key(map_params, figsize, dpi)
+    path = os.path.join(cache_dir, key)
+
+    if not refresh and os.path.exists(path + ".json"):
+        with open(path + ".json") as f:
+            layout = json.load(f)
+        with open(path + ".pickle", "rb") as f:
+            basemap = pickle.load(f)
+        raster = np.load(path + ".npy", mmap_mode="r")
+        return _paste(raster, layout, figsize, dpi), basemap
+
+    figure, basemap, pickled = _draw(map_params, figsize, dpi)
+    ax = plt.gca()
+    layout = {"position": list(ax.get_position().bounds),
+              "xlim": list(ax.get_xlim()), "ylim": list(ax.get_ylim())}
+
+    if not os.path.isdir(cache_dir):
+        os.makedirs(cache_dir)
+    # every file is renamed into place and the layout comes last, so a
+    # reader never sees a partial entry
+    _write(path + ".npy", lambda f: np.save(f, np.asarray(
+        figure.canvas.buffer_rgba())))
+    _write(path + ".pickle", lambda f: f.write(pickled))
+    _write(path + ".json", lambda f: f.write(json.dumps(layout).encode("utf-8")))
+    return figure, basemap
+
+
+def _write(path, write):
+    tmp = "%s.%d.tmp" % (path, os.getpid())
+    with open(tmp, "wb") as f:
+        write(f)
+    os.replace(tmp, path)
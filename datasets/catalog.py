@@ -0,0 +1,142 @@
+"""
+Columnar loader for USGS earthquake CSV feeds (earthquake_data.csv)
+
+The file is read in chunks of rows; every chunk is converted column by
+column into typed NumPy arrays, so millions of rows never exist as
+Python floats. Times become datetime64[ms] (UTC), empty fields NaN/NaT.
+
+With cache=True the columns are also saved as one .npy file each in a
+sidecar directory next to the CSV; later loads memory-map them instead
+of parsing the CSV again, as long as the CSV has not changed
+"""
+import csv
+import itertools
+import json
+import os
+
+import numpy as np
+
+
+# dtype of every column of the USGS feed; "U" columns are fixed-width
+# strings as wide as their longest value
+COLUMN_TYPES = {
+    "time": "datetime64[ms]",
+    "latitude": np.float64,
+    "longitude": np.float64,
+    "depth": np.float64,
+    "mag": np.float64,
+    "magType": "U",
+    "nst": np.float64,
+    "gap": np.float64,
+    "dmin": np.float64,
+    "rms": np.float64,
+    "net": "U",
+    "id": "U",
+    "updated": "datetime64[ms]",
+    "place": "U",
+    "type": "U",
+}
+
+DEFAULT_COLUMNS = ("time", "latitude", "longitude", "depth", "mag")
+
+
+def _convert(values, dtype):
+    """
+    a typed array from a tuple of CSV fields
+    """
+    strings = np.array(values, dtype="U")
+    if dtype == "U":
+        return strings
+    empty = strings == ""
+    if dtype == "datetime64[ms]":
+        strings = np.where(empty, "NaT", np.char.rstrip(strings, "Z"))
+    else:
+        strings = np.where(empty, "nan", strings)
+    return strings.astype(dtype)
+
+
+def _parse(filename, columns, chunk_rows):
+    """
+    parses the named columns of the CSV into {column: array}
+    """
+    chunks = dict((name, []) for name in columns)
+    with open(filename, newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        indices = []
+        for name in columns:
+            if name not in header:
+                raise ValueError("no column %r in %s" % (name, filename))
+            indices.append(header.index(name))
+
+        while True:
+            rows = list(itertools.islice(reader, chunk_rows))
+            if not rows:
+                break
+            fields = list(zip(*rows))
+            for name, index in zip(columns, indices):
+                chunks[name].append(
+                    _convert(fields[index], COLUMN_TYPES.get(name, "U")))
+
+    catalog = {}
+    for name in columns:
+        if chunks[name]:
+            catalog[name] = np.concatenate(chunks[name])
+        else:
+            dtype = COLUMN_TYPES.get(name, "U")
+            catalog[name] = np.empty(0, dtype="U1" if dtype == "U" else dtype)
+    return catalog
+
+
+def sidecar_dir(filename):
+    return filename + ".columns"
+
+
+def _source_stamp(filename):
+    stat = os.stat(filename)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def _read_meta(directory):
+    try:
+        with open(os.path.join(directory, "meta.json")) as f:
+            return json.load(f)
+    except (IOError, ValueError):
+        return None
+
+
+def load_catalog(filename, columns=DEFAULT_COLUMNS, chunk_rows=100000,
+                 cache=False):
+    """
+    the selected columns of a USGS earthquake CSV as {column: array}
+    columns: names from the CSV header, see COLUMN_TYPES for their types
+    chunk_rows: rows converted at a time
+    cache: keep the columns in a sidecar directory (sidecar_dir) and
+           memory-map them (read-only) on later loads; columns that are
+           not cached yet are parsed and added
+    """
+    columns = list(columns)
+    if not cache:
+        return _parse(filename, columns, chunk_rows)
+
+    directory = sidecar_dir(filename)
+    stamp = _source_stamp(filename)
+    meta = _read_meta(directory)
+    if meta is None or meta["source"] != stamp:
+        meta = {"source": stamp, "rows": None, "columns": []}
+
+    missing = [name for name in columns if name not in meta["columns"]]
+    if missing:
+        parsed = _parse(filename, missing, chunk_rows)
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        for name, values in parsed.items():
+            np.save(os.path.join(directory, name + ".npy"), values)
+        meta["columns"] += missing
+        meta["rows"] = len(parsed[missing[0]])
+        with open(os.path.join(directory, "meta.json"), "w") as f:
+            json.dump(meta, f)
+
+    return dict((name, np.load(os.path.join(directory, name + ".npy"),
+                               mmap_mode="r"))
+                for name in columns)
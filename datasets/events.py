@@ -0,0 +1,161 @@
+"""
+Indexed store of earthquake events for radius, bounding box and time
+window queries
+
+Events are indexed by a KD-tree on their positions as 3-D unit vectors,
+so "within N km" is a ball query with the chord length of N km (exact
+great-circle distances, no trouble at the poles or the antimeridian),
+and by their times sorted once, so a time window is two binary searches
+"""
+import numpy as np
+from scipy.spatial import cKDTree
+
+from catalog import load_catalog
+
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def unit_vectors(lons, lats):
+    """
+    (n, 3) unit vectors of points given in degrees
+    """
+    lons = np.radians(np.asarray(lons, dtype=np.float64))
+    lats = np.radians(np.asarray(lats, dtype=np.float64))
+    cos_lats = np.cos(lats)
+    return np.column_stack([cos_lats * np.cos(lons), cos_lats * np.sin(lons),
+                            np.sin(lats)])
+
+
+def chord_length(distance_km):
+    """
+    straight-line distance on the unit sphere between two points
+    distance_km apart along the surface
+    """
+    return 2 * np.sin(np.asarray(distance_km) / (2 * EARTH_RADIUS_KM))
+
+
+def _datetime(value):
+    return None if value is None else np.datetime64(value, "ms")
+
+
+class EventStore:
+    """
+    Events of a catalog ({column: array} as returned by load_catalog,
+    with at least latitude, longitude and time). Queries return event
+    indices into the catalog arrays; select() gathers their columns
+    """
+    def __init__(self, catalog):
+        self.catalog = catalog
+        self.lons = np.asarray(catalog["longitude"], dtype=np.float64)
+        self.lats = np.asarray(catalog["latitude"], dtype=np.float64)
+        self.times = np.asarray(catalog["time"]).astype("datetime64[ms]")
+
+        # events without a position are left out of the spatial index
+        self._located = np.flatnonzero(np.isfinite(self.lons)
+                                       & np.isfinite(self.lats))
+        self._tree = cKDTree(unit_vectors(self.lons[self._located],
+                                          self.lats[self._located]))
+
+        # NaT sorts last, so it is never inside a time window
+        self._time_order = np.argsort(self.times, kind="mergesort")
+        self._sorted_times = self.times[self._time_order]
+
+    @classmethod
+    def from_csv(cls, filename, cache=True):
+        return cls(load_catalog(filename, cache=cache))
+
+    def __len__(self):
+        return len(self.times)
+
+    def _time_slice(self, start, end):
+        """
+        positions in the time order of the events with start <= time < end
+        """
+        lo = 0 if start is None else \
+            np.searchsorted(self._sorted_times, _datetime(start), "left")
+        hi = np.searchsorted(self._sorted_times, np.datetime64("NaT"), "left") \
+            if end is None else \
+            np.searchsorted(self._sorted_times, _datetime(end), "left")
+        return lo, max(hi, lo)
+
+    def in_time_window(self, start=None, end=None):
+        """
+        indices of the events with start <= time < end, in time order
+        """
+        lo, hi = self._time_slice(start, end)
+        return self._time_order[lo:hi]
+
+    def _in_window(self, indices, start, end):
+        if start is None and end is None:
+            return indices
+        times = self.times[indices]
+        keep = ~np.isnat(times)
+        if start is not None:
+            keep &= times >= _datetime(start)
+        if end is not None:
+            keep &= times < _datetime(end)
+        return indices[keep]
+
+    def within_radius(self, lons, lats, radius_km, start=None, end=None):
+        """
+        events within radius_km (great-circle) of every site, optionally
+        restricted to start <= time < end
+        lons, lats: site coordinates in degrees (scalars or arrays)
+        radius_km: one radius or one per site
+        returns a list with a sorted index array per site
+        """
+        sites = unit_vectors(np.atleast_1d(lons), np.atleast_1d(lats))
+        radii = np.broadcast_to(chord_length(radius_km), (len(sites),))
+        neighbours = self._tree.query_ball_point(sites, radii,
+                                                 return_sorted=True)
+        return [self._in_window(self._located[np.asarray(found, dtype=np.int64)],
+                                start, end)
+                for found in neighbours]
+
+    def count_within_radius(self, lons, lats, radius_km):
+        """
+        number of events within radius_km of every site, as an array
+        """
+        sites = unit_vectors(np.atleast_1d(lons), np.atleast_1d(lats))
+        radii = np.broadcast_to(chord_length(radius_km), (len(sites),))
+        return np.asarray(self._tree.query_ball_point(sites, radii,
+                                                      return_length=True))
+
+    def in_bbox(self, west, south, east, north, start=None, end=None):
+        """
+        events inside the box (degrees, edges included) and, optionally,
+        start <= time < end; a box with west > east crosses the antimeridian
+        returns the indices in time order
+        """
+        return self.in_bboxes([(west, south, east, north)], start, end)[0]
+
+    def in_bboxes(self, boxes, start=None, end=None):
+        """
+        in_bbox for many (west, south, east, north) boxes sharing one time
+        window; the window is searched once
+        """
+        if start is None and end is None:
+            candidates = self._time_order
+        else:
+            candidates = self.in_time_window(start, end)
+        lons = self.lons[candidates]
+        lats = self.lats[candidates]
+        results = []
+        for west, south, east, north in boxes:
+            inside = (lats >= south) & (lats <= north)
+            if west <= east:
+                inside &= (lons >= west) & (lons <= east)
+            else:
+                inside &= (lons >= west) | (lons <= east)
+            results.append(candidates[inside])
+        return results
+
+    def select(self, indices, columns=None):
+        """
+        the catalog columns (all by default) of the given events
+        """
+        if columns is None:
+            columns = self.catalog.keys()
+        return dict((name, np.asarray(self.catalog[name])[indices])
+                    for name in columns)
@@ -0,0 +1,167 @@
+"""
+Animation of an earthquake catalog: events are binned by time interval
+(hourly, daily, ...) and by lat/lon cell, and every interval becomes one
+frame of the world map
+
+Binning is a single np.unique over a combined (frame, cell) key followed
+by grouped reductions. Frames are rendered by a pool of processes; each
+worker builds the Basemap figure and draws the background once and then
+only swaps the event layer between frames; the background itself comes
+from the on-disk cache of background.py. ffmpeg turns the frames into
+a video
+"""
+import os
+import subprocess
+import sys
+from collections import namedtuple
+from multiprocessing import Pool
+
+import numpy as np
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+
+from background import background_figure
+from catalog import load_catalog
+from render import BASEMAP_PARAMS, MAGNITUDE_COLORS, magnitude_classes
+
+
+# frame_times: start of every frame, empty frames included
+# the other fields have one entry per non-empty (frame, cell), sorted by
+# frame: frame index, cell centre, event count, max and mean magnitude
+Bins = namedtuple("Bins", ["frame_times", "frame", "lon", "lat", "count",
+                           "max_mag", "mean_mag"])
+
+
+def bin_events(times, lons, lats, magnitudes, interval="1h", cell_deg=1.0):
+    """
+    bins the events by time and space
+    interval: frame length, a np.timedelta64 or a string like "1h", "1D"
+    cell_deg: cell size in degrees
+    events without a time, position or magnitude are left out
+    """
+    if isinstance(interval, str):
+        interval = np.timedelta64(int(interval[:-1] or 1), interval[-1])
+    interval = interval.astype("timedelta64[ms]").astype(np.int64)
+
+    times = np.asarray(times).astype("datetime64[ms]")
+    lons = np.asarray(lons, dtype=np.float64)
+    lats = np.asarray(lats, dtype=np.float64)
+    magnitudes = np.asarray(magnitudes, dtype=np.float64)
+    valid = ~np.isnat(times) & np.isfinite(lons) & np.isfinite(lats) \
+        & np.isfinite(magnitudes)
+    times, lons, lats, magnitudes = \
+        times[valid], lons[valid], lats[valid], magnitudes[valid]
+    if len(times) == 0:
+        empty = np.empty(0)
+        return Bins(np.empty(0, dtype="datetime64[ms]"), empty.astype(np.int64),
+                    empty, empty, empty.astype(np.int64), empty, empty)
+
+    ms = times.astype(np.int64)
+    start = ms.min() // interval * interval
+    frame = (ms - start) // interval
+    n_lon = int(np.ceil(360.0 / cell_deg))
+    n_lat = int(np.ceil(180.0 / cell_deg))
+    lon_cell = np.clip(np.floor((lons + 180.0) / cell_deg), 0, n_lon - 1).astype(np.int64)
+    lat_cell = np.clip(np.floor((lats + 90.0) / cell_deg), 0, n_lat - 1).astype(np.int64)
+
+    # frame is the most significant part of the key, so the groups come
+    # out sorted by frame
+    key = (frame * n_lat + lat_cell) * n_lon + lon_cell
+    groups, group_of, count = np.unique(key, return_inverse=True,
+                                        return_counts=True)
+    max_mag = np.full(len(groups), -np.inf)
+    np.maximum.at(max_mag, group_of, magnitudes)
+    mean_mag = np.bincount(group_of, weights=magnitudes) / count
+
+    n_frames = int(frame.max()) + 1
+    frame_times = (start + interval * np.arange(n_frames)).astype("datetime64[ms]")
+    return Bins(frame_times, groups // (n_lat * n_lon),
+                (groups % n_lon + 0.5) * cell_deg - 180.0,
+                (groups // n_lon % n_lat + 0.5) * cell_deg - 90.0,
+                count, max_mag, mean_mag)
+
+
+def frame_slices(bins):
+    """
+    (start, stop) of the groups of every frame
+    """
+    bounds = np.searchsorted(bins.frame, np.arange(len(bins.frame_times) + 1))
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+# figure, Basemap and event layer of a rendering worker
+_worker = {}
+
+
+def _init_worker(map_params, figsize, dpi):
+    figure, basemap = background_figure(map_params, figsize, dpi)
+    _worker.update(figure=figure, basemap=basemap, layer=[], dpi=dpi)
+
+
+def _render_frame(job):
+    path, title, lons, lats, counts, max_mags = job
+    basemap = _worker["basemap"]
+    for artist in _worker["layer"]:
+        artist.remove()
+
+    x, y = basemap(lons, lats)
+    sizes = 8.0 * np.sqrt(counts)
+    colors = MAGNITUDE_COLORS[magnitude_classes(max_mags)]
+    _worker["layer"] = [basemap.scatter(x, y, s=sizes, c=colors, marker="o",
+                                        zorder=10)]
+    plt.title(title)
+    _worker["figure"].savefig(path, dpi=_worker["dpi"])
+    return path
+
+
+def render_frames(bins, out_dir, workers=None, map_params=None,
+                  figsize=(12, 7), dpi=100):
+    """
+    renders one PNG per frame into out_dir (frame_00000.png, ...); cells
+    are sized by event count and coloured by their largest magnitude
+    workers: rendering processes (number of CPUs by default)
+    returns the file names in frame order
+    """
+    if map_params is None:
+        map_params = BASEMAP_PARAMS
+    if not os.path.isdir(out_dir):
+        os.makedirs(out_dir)
+
+    jobs = []
+    for i, (lo, hi) in enumerate(frame_slices(bins)):
+        title = "Earthquakes %s" % np.datetime_as_string(bins.frame_times[i],
+                                                         unit="m")
+        jobs.append((os.path.join(out_dir, "frame_%05d.png" % i), title,
+                     bins.lon[lo:hi], bins.lat[lo:hi], bins.count[lo:hi],
+                     bins.max_mag[lo:hi]))
+
+    # draw and cache the background once before the workers load it
+    plt.close(background_figure(map_params, figsize, dpi)[0])
+    with Pool(workers, initializer=_init_worker,
+              initargs=(map_params, figsize, dpi)) as pool:
+        return pool.map(_render_frame, jobs, chunksize=4)
+
+
+def encode_video(out_dir, output, fps=10):
+    """
+    encodes the frames of render_frames into an H.264 video with ffmpeg
+    """
+    subprocess.check_call(["ffmpeg", "-y", "-loglevel", "error",
+                           "-framerate", str(fps),
+                           "-i", os.path.join(out_dir, "frame_%05d.png"),
+                           "-c:v", "libx264", "-pix_fmt", "yuv420p", output])
+
+
+if __name__ == "__main__":
+    # python datasets/frames.py [csv [interval [output.mp4]]]
+    filename = sys.argv[1] if len(sys.argv) > 1 else "datasets/earthquake_data.csv"
+    interval = sys.argv[2] if len(sys.argv) > 2 else "1h"
+    catalog = load_catalog(filename, columns=("time", "latitude", "longitude",
+                                              "mag"), cache=True)
+    bins = bin_events(catalog["time"], catalog["longitude"],
+                      catalog["latitude"], catalog["mag"], interval)
+    out_dir = os.path.splitext(filename)[0] + "_frames"
+    render_frames(bins, out_dir)
+    if len(sys.argv) > 3:
+        encode_video(out_dir, sys.argv[3])
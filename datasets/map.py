@@ -1,63 +1,36 @@
-import csv
+from catalog import load_catalog
+from background import background_figure
+from render import plot_events
 
 # Open the earthquake data file.
 filename = 'datasets/earthquake_data.csv'
 
-# Create empty lists for the data we are interested in.
-lats, lons = [], []
-magnitudes = []
-timestrings = []
-
-# Read through the entire file, skip the first line,
-#  and pull out just the lats and lons.
-with open(filename) as f:
-    # Create a csv reader object.
-    reader = csv.reader(f)
-    
-    # Ignore the header row.
-    next(reader)
-    
-    # Store the latitudes and longitudes in the appropriate lists.
-    for row in reader:
-        lats.append(float(row[1]))
-        lons.append(float(row[2]))
-        magnitudes.append(float(row[4]))
-        timestrings.append(row[0])
+# Load just the columns we are interested in as arrays; the parsed
+#  columns are cached next to the file, so later runs skip the CSV.
+catalog = load_catalog(filename, columns=('time', 'latitude', 'longitude', 'mag'),
+                       cache=True)
+lats = catalog['latitude']
+lons = catalog['longitude']
+magnitudes = catalog['mag']
+times = catalog['time']
         
 # --- Build Map ---
-from mpl_toolkits.basemap import Basemap
 import matplotlib.pyplot as plt
 import numpy as np
 
-def get_marker_color(magnitude):
-    # Returns green for small earthquakes, yellow for moderate
-    #  earthquakes, and red for significant earthquakes.
-    if magnitude < 3.0:
-        return ('go')
-    elif magnitude < 5.0:
-        return ('yo')
-    else:
-        return ('ro')
- 
-map = Basemap(projection='robin', resolution = 'l', area_thresh = 1000.0,
-              lat_0=0, lon_0=-130)
-map.drawcoastlines()
-map.drawcountries()
-map.fillcontinents(color = 'gray')
-map.bluemarble()
-map.drawmapboundary()
-map.drawmeridians(np.arange(0, 360, 30))
-map.drawparallels(np.arange(-90, 90, 30))
+# The projection and the static layers are drawn once and cached on
+#  disk; later runs only load the rendered background.
+fig, map = background_figure()
  
+# Green for small earthquakes, yellow for moderate earthquakes and red
+#  for significant earthquakes, all in one scatter; huge catalogs are
+#  drawn as a density map instead.
 min_marker_size = 2.25
-for lon, lat, mag in zip(lons, lats, magnitudes):
-    x,y = map(lon, lat)
-    msize = mag * min_marker_size
-    marker_string = get_marker_color(mag)
-    map.plot(x, y, marker_string, markersize=msize)
+plot_events(map, lons, lats, magnitudes, min_marker_size)
     
 title_string = "Earthquakes of Magnitude 1.0 or Greater\n"
-title_string += "%s through %s" % (timestrings[-1][:10], timestrings[0][:10])
+title_string += "%s through %s" % (np.datetime_as_string(times[-1], unit='D'),
+                                   np.datetime_as_string(times[0], unit='D'))
 plt.title(title_string)
  
 plt.show()
\ No newline at end of file
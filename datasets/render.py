@@ -0,0 +1,63 @@
+"""
+Vectorized drawing of earthquake events on a Basemap
+
+All events are projected in one call and drawn as a single scatter
+collection, coloured by magnitude class: green below 3.0, yellow below
+5.0, red otherwise. Catalogs too large for one marker per event are
+drawn as a hexbin density map instead
+"""
+import numpy as np
+
+
+MAGNITUDE_BINS = (3.0, 5.0)
+MAGNITUDE_COLORS = np.array(["g", "y", "r"])
+
+# the world map of map.py
+BASEMAP_PARAMS = dict(projection="robin", resolution="l", area_thresh=1000.0,
+                      lat_0=0, lon_0=-130)
+
+
+def draw_background(basemap):
+    """
+    the static layers: coastlines, countries, continents, the blue marble
+    image, the map boundary and a 30 degree graticule
+    """
+    basemap.drawcoastlines()
+    basemap.drawcountries()
+    basemap.fillcontinents(color="gray")
+    basemap.bluemarble()
+    basemap.drawmapboundary()
+    basemap.drawmeridians(np.arange(0, 360, 30))
+    basemap.drawparallels(np.arange(-90, 90, 30))
+
+
+def magnitude_classes(magnitudes):
+    """
+    0, 1 or 2 for every magnitude: below 3.0, below 5.0, the rest
+    """
+    return np.digitize(magnitudes, MAGNITUDE_BINS)
+
+
+def plot_events(basemap, lons, lats, magnitudes, min_marker_size=2.25,
+                max_points=100000, gridsize=200):
+    """
+    draws the events on basemap and returns the matplotlib collection
+    min_marker_size: marker diameter in points per unit of magnitude
+    max_points: above this many events a hexbin of event counts (log
+                colour scale) with `gridsize` hexagons across is drawn
+    """
+    lons = np.asarray(lons, dtype=np.float64)
+    lats = np.asarray(lats, dtype=np.float64)
+    magnitudes = np.asarray(magnitudes, dtype=np.float64)
+    valid = np.isfinite(lons) & np.isfinite(lats) & np.isfinite(magnitudes)
+    x, y = basemap(lons[valid], lats[valid])
+
+    if len(x) > max_points:
+        return basemap.hexbin(np.asarray(x), np.asarray(y), gridsize=gridsize,
+                              bins="log", mincnt=1, cmap="hot", zorder=10)
+
+    magnitudes = magnitudes[valid]
+    # scatter sizes are areas, plot() marker sizes diameters
+    sizes = (magnitudes * min_marker_size) ** 2
+    colors = MAGNITUDE_COLORS[magnitude_classes(magnitudes)]
+    return basemap.scatter(x, y, s=sizes, c=colors, marker="o", zorder=10)
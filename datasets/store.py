@@ -0,0 +1,232 @@
+"""
+Persistent, incrementally updated earthquake catalog
+
+USGS feeds overlap and re-publish revised events under the same id with
+a later `updated` time. CatalogStore keeps one row per id in a directory
+of column files plus a sorted id index; ingesting a feed appends new ids,
+overwrites rows whose incoming `updated` is later, and ignores the rest,
+without rewriting the rows that did not change.
+Every ingest returns a CatalogDelta so that maps and statistics can be
+updated from the changed rows instead of being rebuilt
+"""
+import json
+import os
+from collections import namedtuple
+
+import numpy as np
+
+from catalog import COLUMN_TYPES, load_catalog
+
+
+# added: row indices of new events (appended at the end)
+# revised: row indices of events that were overwritten
+# previous: {column: values of the revised rows before the overwrite}
+# ignored: incoming rows that were duplicates, older revisions or had no id
+CatalogDelta = namedtuple("CatalogDelta", ["added", "revised", "previous",
+                                           "ignored"])
+
+OLDEST = np.datetime64(-2**62, "ms")
+
+
+def _latest_per_id(ids, updated):
+    """
+    positions of the rows to keep from a batch: per id the one with the
+    latest `updated` (the last one in the batch on ties); rows without an
+    id are dropped. Returned in increasing order
+    """
+    updated = np.where(np.isnat(updated), OLDEST, updated)
+    order = np.lexsort((np.arange(len(ids)), updated, ids))
+    sorted_ids = ids[order]
+    last = np.r_[sorted_ids[1:] != sorted_ids[:-1], True]
+    keep = order[last & (sorted_ids != "")]
+    return np.sort(keep)
+
+
+class CatalogStore:
+    """
+    Catalog columns kept in `directory`, one raw binary file per column
+    plus the id index (row numbers in id order); rows are never
+    reordered, so indices from earlier deltas stay valid
+
+    meta.json holds the row count, the dtype and file of every column and
+    the index file, and is replaced last, so it is the commit point:
+    bytes appended past `rows` by an interrupted ingest are ignored and
+    truncated by the next one. Columns that must be rewritten (strings
+    that got wider) and the index go to new files that only the new
+    meta.json refers to. Revised rows are overwritten in place after the
+    commit, `updated` last: an interrupted ingest can leave some of them
+    half written, and ingesting the same feed again completes them
+    """
+    def __init__(self, directory, columns=None):
+        self.directory = directory
+        meta = self._read_meta()
+        if meta is None:
+            if columns is None:
+                columns = list(COLUMN_TYPES)
+            for name in ("id", "updated"):
+                if name not in columns:
+                    columns = list(columns) + [name]
+            meta = {"columns": list(columns), "rows": 0, "dtypes": {},
+                    "files": {}, "index": None}
+        self.meta = meta
+        self._load()
+
+    def _path(self, filename):
+        return os.path.join(self.directory, filename)
+
+    def _read_meta(self):
+        try:
+            with open(self._path("meta.json")) as f:
+                return json.load(f)
+        except (IOError, ValueError):
+            return None
+
+    def _open(self, filename, dtype, rows, mode="r"):
+        if rows == 0:
+            return np.empty(0, dtype)
+        return np.memmap(self._path(filename), dtype=dtype, mode=mode,
+                         shape=(rows,))
+
+    def _load(self):
+        rows = self.meta["rows"]
+        self.catalog = {}
+        for name in self.meta["columns"]:
+            dtype = self.meta["dtypes"].get(name, COLUMN_TYPES.get(name, "U"))
+            self.catalog[name] = self._open(self.meta["files"].get(name),
+                                            "U1" if dtype == "U" else dtype,
+                                            rows)
+        self.id_order = self._open(self.meta["index"], np.int64, rows)
+
+    def __len__(self):
+        return self.meta["rows"]
+
+    def lookup(self, ids):
+        """
+        row index of every id, -1 for ids not in the catalog
+        """
+        ids = np.asarray(ids)
+        if len(self) == 0:
+            return np.full(ids.shape, -1, dtype=np.int64)
+        pos = np.minimum(np.searchsorted(self.catalog["id"], ids,
+                                         sorter=self.id_order),
+                         len(self) - 1)
+        rows = self.id_order[pos]
+        return np.where(self.catalog["id"][rows] == ids, rows, -1)
+
+    def _write(self, filename, values, offset=None):
+        """
+        writes values to a new file, or appends them at byte offset
+        (dropping anything past it) of an existing one
+        """
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+        if offset is None:
+            with open(self._path(filename), "wb") as f:
+                f.write(np.ascontiguousarray(values).tobytes())
+            return
+        with open(self._path(filename), "r+b") as f:
+            f.truncate(offset)
+            f.seek(offset)
+            f.write(np.ascontiguousarray(values).tobytes())
+
+    def _commit(self, meta):
+        tmp = self._path("meta.json.tmp")
+        with open(tmp, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp, self._path("meta.json"))
+        used = set(meta["files"].values()) | set([meta["index"], "meta.json"])
+        for filename in os.listdir(self.directory):
+            # column and index files no longer referenced
+            if filename.endswith(".bin") and filename not in used:
+                os.remove(self._path(filename))
+        self.meta = meta
+        self._load()
+
+    def ingest(self, source, chunk_rows=100000):
+        """
+        merges a feed into the catalog and saves it; new rows are appended
+        to the column files and revised rows overwritten, the rest of the
+        catalog is not rewritten
+        source: a CSV file name or a {column: array} catalog with at least
+                the columns of the store
+        returns the CatalogDelta
+        """
+        if isinstance(source, str):
+            source = load_catalog(source, self.meta["columns"], chunk_rows)
+        ids = np.asarray(source["id"])
+        updated = np.asarray(source["updated"]).astype("datetime64[ms]")
+
+        keep = _latest_per_id(ids, updated)
+        ignored = len(ids) - len(keep)
+        ids = ids[keep]
+        updated = updated[keep]
+
+        rows = self.lookup(ids)
+        known = rows >= 0
+        old_updated = self.catalog["updated"][rows[known]]
+        newer = np.where(np.isnat(updated[known]), OLDEST, updated[known]) \
+            > np.where(np.isnat(old_updated), OLDEST, old_updated)
+        revised_rows = rows[known][newer]
+        revised_from = keep[known][newer]
+        added_from = keep[~known]
+        ignored += int(known.sum() - newer.sum())
+
+        if len(revised_rows) == 0 and len(added_from) == 0:
+            return CatalogDelta(np.empty(0, dtype=np.int64),
+                                np.empty(0, dtype=np.int64), {}, ignored)
+
+        n_rows = len(self)
+        total = n_rows + len(added_from)
+        previous = dict((name, np.array(self.catalog[name][revised_rows]))
+                        for name in self.meta["columns"])
+        meta = dict(self.meta, rows=total, dtypes=dict(self.meta["dtypes"]),
+                    files=dict(self.meta["files"]))
+        in_place = []
+        for name in self.meta["columns"]:
+            incoming = np.asarray(source[name])
+            old = self.catalog[name]
+            # incoming strings may be wider than the stored ones
+            dtype = np.result_type(old.dtype, incoming.dtype) if n_rows \
+                else incoming.dtype
+            if n_rows and dtype == old.dtype:
+                self._write(meta["files"][name],
+                            incoming[added_from].astype(dtype),
+                            n_rows * dtype.itemsize)
+                in_place.append(name)
+                continue
+            values = np.concatenate([old, incoming[added_from]]).astype(dtype)
+            values[revised_rows] = incoming[revised_from]
+            filename = "%s.%s.bin" % (name, dtype.str.lstrip("<>|="))
+            self._write(filename, values)
+            meta["files"][name] = filename
+            meta["dtypes"][name] = dtype.str
+
+        if len(added_from):
+            # merge the new ids into the index; they are not in it yet
+            id_dtype = np.dtype(meta["dtypes"]["id"])
+            old_ids = self._open(meta["files"]["id"], id_dtype, n_rows)
+            added_ids = np.asarray(source["id"])[added_from].astype(id_dtype)
+            order = np.argsort(added_ids, kind="mergesort")
+            pos = np.searchsorted(old_ids, added_ids[order],
+                                  sorter=self.id_order)
+            meta["index"] = "_id_order.%d.bin" % total
+            self._write(meta["index"], np.insert(
+                np.asarray(self.id_order), pos, n_rows + order))
+            del old_ids
+        self._commit(meta)
+
+        # `updated` goes last, so a half-revised row still looks older
+        # than the feed and a repeated ingest revises it again
+        in_place.sort(key=lambda name: name == "updated")
+        for name in in_place:
+            if len(revised_rows) == 0:
+                break
+            column = self._open(meta["files"][name],
+                                np.dtype(meta["dtypes"][name]), total, "r+")
+            column[revised_rows] = np.asarray(source[name])[revised_from]
+            column.flush()
+            del column
+        self._load()
+
+        return CatalogDelta(np.arange(n_rows, total), revised_rows, previous,
+                            ignored)
@@ -0,0 +1,155 @@
+"""
+In-memory caches for raster bands, so that point lookups are served from
+NumPy arrays instead of a GDAL ReadAsArray call per lookup
+"""
+from collections import OrderedDict, namedtuple
+
+import numpy as np
+
+
+# hits and misses count looked-up points in both caches: a hit is a point
+# served from memory, a miss a point whose block (the whole band for
+# BandCache) had to be read first, so every miss is one ReadAsArray call
+CacheInfo = namedtuple("CacheInfo", ["hits", "misses", "blocks", "nbytes"])
+
+
+class BandCache:
+    """
+    Holds a whole band in memory; the band is read on first use
+    """
+    def __init__(self, band):
+        self._band = band
+        self._array = None
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def array(self):
+        """
+        the whole band as a 2-D array (rows, cols); reading it counts as
+        a miss, using it later is not counted
+        """
+        if self._array is None:
+            self.misses += 1
+            self._array = self._band.ReadAsArray()
+        return self._array
+
+    def _count(self, n_points):
+        # the first point looked up before the band is read is the miss
+        if self._array is None and n_points:
+            n_points -= 1
+        self.hits += n_points
+
+    def value(self, x_offset, y_offset):
+        """
+        the pixel value at one (x_offset, y_offset) pixel index
+        """
+        self._count(1)
+        return self.array[y_offset, x_offset]
+
+    def take(self, rows, cols):
+        """
+        gathers the pixel values at integer index arrays rows, cols;
+        the indices must be inside the band
+        """
+        rows = np.asarray(rows)
+        self._count(rows.size)
+        return self.array[rows, cols]
+
+    def info(self):
+        if self._array is None:
+            return CacheInfo(self.hits, self.misses, 0, 0)
+        return CacheInfo(self.hits, self.misses, 1, self._array.nbytes)
+
+    def clear(self):
+        self._array = None
+
+
+class BlockCache:
+    """
+    Reads a band lazily, one GDAL block at a time, and keeps the most
+    recently used `max_blocks` blocks in memory
+    """
+    def __init__(self, band, max_blocks=256):
+        self._band = band
+        self._block_x, self._block_y = band.GetBlockSize()
+        self._cols = band.XSize
+        self._rows = band.YSize
+        self._n_blocks_x = -(-self._cols // self._block_x)
+        self.max_blocks = max_blocks
+        self._blocks = OrderedDict()    # (block_x, block_y) -> array
+        self.hits = 0
+        self.misses = 0
+
+    def _block(self, block_x, block_y, n_points=1):
+        """
+        the block at (block_x, block_y), looked up for n_points points
+        """
+        key = (block_x, block_y)
+        block = self._blocks.get(key)
+        if block is not None:
+            self.hits += n_points
+            self._blocks.move_to_end(key)
+            return block
+
+        self.misses += 1
+        self.hits += n_points - 1
+        x_offset = block_x * self._block_x
+        y_offset = block_y * self._block_y
+        x_size = min(self._block_x, self._cols - x_offset)
+        y_size = min(self._block_y, self._rows - y_offset)
+        block = self._band.ReadAsArray(x_offset, y_offset, x_size, y_size)
+
+        self._blocks[key] = block
+        if len(self._blocks) > self.max_blocks:
+            self._blocks.popitem(last=False)
+        return block
+
+    def value(self, x_offset, y_offset):
+        """
+        the pixel value at one (x_offset, y_offset) pixel index
+        """
+        block = self._block(x_offset // self._block_x,
+                            y_offset // self._block_y)
+        return block[y_offset % self._block_y, x_offset % self._block_x]
+
+    def take(self, rows, cols):
+        """
+        gathers the pixel values at integer index arrays rows, cols;
+        the indices must be inside the band. Points are grouped by block
+        so every block is looked up once per call
+        """
+        rows = np.asarray(rows)
+        cols = np.asarray(cols)
+        block_rows = rows // self._block_y
+        block_cols = cols // self._block_x
+        keys = (block_rows * self._n_blocks_x + block_cols).ravel()
+
+        order = np.argsort(keys, kind="stable")
+        sorted_keys = keys[order]
+        starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]]) \
+            if len(sorted_keys) else np.empty(0, dtype=np.int64)
+        ends = np.r_[starts[1:], len(sorted_keys)]
+
+        flat_rows = rows.ravel()
+        flat_cols = cols.ravel()
+        out = None
+        for start, end in zip(starts, ends):
+            index = order[start:end]
+            block_y, block_x = divmod(int(sorted_keys[start]), self._n_blocks_x)
+            block = self._block(block_x, block_y, int(end - start))
+            if out is None:
+                out = np.empty(keys.shape, dtype=block.dtype)
+            out[index] = block[flat_rows[index] - block_y * self._block_y,
+                               flat_cols[index] - block_x * self._block_x]
+
+        if out is None:
+            out = np.empty(keys.shape)
+        return out.reshape(rows.shape)
+
+    def info(self):
+        nbytes = sum(block.nbytes for block in self._blocks.values())
+        return CacheInfo(self.hits, self.misses, len(self._blocks), nbytes)
+
+    def clear(self):
+        self._blocks.clear()
@@ -0,0 +1,196 @@
+"""
+Parallel checksums of bands and their overviews
+
+Every band (and overview) is split into strips of rows that worker
+processes checksum independently; the partial results are combined in
+strip order, so the result does not depend on the number of workers.
+
+mode "gdal" gives the same value as GDAL's band.Checksum(): the sum of
+every pixel value (converted to a 32-bit int) modulo a prime cycling
+through the first 11 primes from 7, taken modulo 2**16. That sum is
+associative, so each strip contributes a partial sum.
+mode "sha256" hashes the raw pixels of every strip and then hashes the
+strip digests in order; it also depends on strip_rows
+"""
+import hashlib
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+try:
+    from osgeo import gdal
+except ImportError:
+    import gdal
+
+
+PRIMES = np.array([7, 11, 13, 17, 19, 23, 29, 31, 37, 41, 43], dtype=np.int64)
+
+INT_MIN = -2147483648
+INT_MAX = 2147483647
+
+
+def _band(data_set, band, overview):
+    hBand = data_set.GetRasterBand(band)
+    if overview is not None:
+        hBand = hBand.GetOverview(overview)
+    return hBand
+
+
+def _gdal_values(hBand, y0, y1):
+    """
+    the pixel values of rows y0..y1 as GDAL's checksum sees them: 32-bit
+    ints, complex pixels as real and imaginary parts
+    """
+    data_type = hBand.DataType
+    complex_types = (gdal.GDT_CInt16, gdal.GDT_CInt32,
+                     gdal.GDT_CFloat32, gdal.GDT_CFloat64)
+    floating_types = (gdal.GDT_Float32, gdal.GDT_Float64,
+                      gdal.GDT_CFloat32, gdal.GDT_CFloat64)
+
+    if data_type in floating_types:
+        buf_type = gdal.GDT_CFloat64 if data_type in complex_types \
+            else gdal.GDT_Float64
+    else:
+        buf_type = gdal.GDT_CInt32 if data_type in complex_types \
+            else gdal.GDT_Int32
+    data = hBand.ReadAsArray(0, y0, hBand.XSize, y1 - y0, buf_type=buf_type)
+    if np.iscomplexobj(data):
+        data = np.stack([data.real, data.imag], axis=-1)
+    data = data.ravel()
+
+    if data.dtype.kind != "f":
+        return data.astype(np.int64)
+
+    # NaN and infinity count as INT_MIN, other values are rounded like
+    # GDALCopyWords does when converting to Int32
+    finite = np.isfinite(data)
+    rounded = np.floor(np.where(finite, data, 0) + 0.5)
+    values = np.clip(rounded, -INT_MAX, INT_MAX).astype(np.int64)
+    values[~finite] = INT_MIN
+    return values
+
+
+def _strip_checksum(path, band, overview, y0, y1, mode):
+    data_set = gdal.Open(path, gdal.GA_ReadOnly)
+    hBand = _band(data_set, band, overview)
+
+    if mode == "gdal":
+        values = _gdal_values(hBand, y0, y1)
+        per_row = len(values) // max(y1 - y0, 1)
+        index = np.arange(y0 * per_row, y0 * per_row + len(values))
+        # C's % truncates towards zero, like np.fmod
+        return int(np.fmod(values, PRIMES[index % len(PRIMES)]).sum())
+
+    data = np.ascontiguousarray(hBand.ReadAsArray(0, y0, hBand.XSize, y1 - y0))
+    return hashlib.sha256(data.astype(data.dtype.newbyteorder("<")).tobytes()).digest()
+
+
+def _combine(parts, mode):
+    if mode == "gdal":
+        return sum(parts) & 0xffff
+    sha256 = hashlib.sha256()
+    for digest in parts:
+        sha256.update(digest)
+    return sha256.hexdigest()
+
+
+def _strips(n_rows, block_rows, strip_rows):
+    strip_rows = max(int(round(strip_rows / float(block_rows))), 1) * block_rows
+    return [(y0, min(y0 + strip_rows, n_rows))
+            for y0 in range(0, n_rows, strip_rows)]
+
+
+def band_checksums(path, bands=None, overviews=True, mode="gdal",
+                   workers=None, strip_rows=256):
+    """
+    checksums of the bands (1-based, all by default) of the raster at path
+    and, with overviews=True, of all their overviews. All strips of all
+    bands and overviews share one process pool
+    returns {band: {"checksum": value, "overviews": [value, ...]}}
+    """
+    if mode not in ("gdal", "sha256"):
+        raise ValueError("unknown checksum mode: %r" % (mode,))
+
+    data_set = gdal.Open(path, gdal.GA_ReadOnly)
+    if data_set is None:
+        raise IOError("could not open %s" % path)
+    if bands is None:
+        bands = list(range(1, data_set.RasterCount + 1))
+
+    # one job per strip; targets are (band, overview index or None)
+    targets = []
+    jobs = []
+    for band in bands:
+        hBand = data_set.GetRasterBand(band)
+        levels = [None]
+        if overviews:
+            levels += list(range(hBand.GetOverviewCount()))
+        for overview in levels:
+            hTarget = _band(data_set, band, overview)
+            targets.append((band, overview))
+            if hTarget is None:
+                jobs.append(None)
+                continue
+            block_rows = hTarget.GetBlockSize()[1]
+            jobs.append([(path, band, overview, y0, y1, mode)
+                         for y0, y1 in _strips(hTarget.YSize, block_rows,
+                                               strip_rows)])
+    data_set = None
+
+    # a missing overview (None) gets no jobs and no checksum
+    if workers is not None and workers <= 1:
+        parts = [strips and [_strip_checksum(*job) for job in strips]
+                 for strips in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [strips and [executor.submit(_strip_checksum, *job)
+                                   for job in strips]
+                       for strips in jobs]
+            parts = [strips and [future.result() for future in strips]
+                     for strips in futures]
+
+    result = dict((band, {"checksum": None, "overviews": []}) for band in bands)
+    for (band, overview), strip_parts in zip(targets, parts):
+        value = None if strip_parts is None else _combine(strip_parts, mode)
+        if overview is None:
+            result[band]["checksum"] = value
+        else:
+            result[band]["overviews"].append(value)
+    return result
+
+
+def benchmark(path, workers=None, strip_rows=256):
+    """
+    times the serial GDAL Checksum() of every band and overview against
+    band_checksums and checks that they agree
+    """
+    start = time.time()
+    data_set = gdal.Open(path, gdal.GA_ReadOnly)
+    serial = {}
+    for band in range(1, data_set.RasterCount + 1):
+        hBand = data_set.GetRasterBand(band)
+        serial[band] = {"checksum": hBand.Checksum(),
+                        "overviews": [hBand.GetOverview(i).Checksum()
+                                      for i in range(hBand.GetOverviewCount())]}
+    data_set = None
+    serial_seconds = time.time() - start
+
+    start = time.time()
+    parallel = band_checksums(path, workers=workers, strip_rows=strip_rows)
+    parallel_seconds = time.time() - start
+
+    return {"serial_seconds": serial_seconds,
+            "parallel_seconds": parallel_seconds,
+            "speedup": serial_seconds / parallel_seconds,
+            "identical": serial == parallel}
+
+
+if __name__ == "__main__":
+    path = sys.argv[1] if len(sys.argv) > 1 else "../lewisburg_pa/lewisburg_pa.dem"
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else None
+    result = benchmark(path, workers)
+    print("serial:   %.3f s" % result["serial_seconds"])
+    print("parallel: %.3f s (%.1fx)" % (result["parallel_seconds"], result["speedup"]))
+    print("identical checksums: %s" % result["identical"])
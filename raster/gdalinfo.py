@@ -4,12 +4,12 @@
 # *
 # * Project:  GDAL Utilities
 # * Purpose:  Python port of Commandline application to list info about a file.
-# * Author:   Even Rouault, &lt;even dot rouault at mines dash paris dot org&gt;
+# * Author:   Even Rouault, <even dot rouault at mines dash paris dot org>
 # *
 # * Port from gdalinfo.c whose author is Frank Warmerdam
 # *
 # ******************************************************************************
-# * Copyright (c) 2010-2011, Even Rouault &lt;even dot rouault at mines-paris dot org&gt;
+# * Copyright (c) 2010-2011, Even Rouault <even dot rouault at mines-paris dot org>
 # * Copyright (c) 1998, Frank Warmerdam
 # *
 # * Permission is hereby granted, free of charge, to any person obtaining a
@@ -31,6 +31,7 @@
 # * DEALINGS IN THE SOFTWARE.
 # ****************************************************************************/
 
+import json
 import sys
 try:
     from osgeo import gdal
@@ -39,13 +40,33 @@ except:
     import gdal
     import osr
 
+try:
+    from raster.checksum import band_checksums
+    from raster.rasterstats import compute_statistics
+    from raster.reportcache import ReportCache
+except ImportError:
+    from checksum import band_checksums
+    from rasterstats import compute_statistics
+    from reportcache import ReportCache
+
 #/************************************************************************/
 #/*                               Usage()                                */
 #/************************************************************************/
 
 def Usage():
     print( "Usage: gdalinfo [--help-general] [-mm] [-stats] [-hist] [-nogcp] [-nomd]\n" + \
-            "                [-norat] [-noct] [-nofl] [-checksum] [-mdd domain]* datasetname" )
+            "                [-norat] [-noct] [-nofl] [-checksum] [-mdd domain]*\n" + \
+            "                [-native_stats] [-percentiles p1,p2,...] [-stats_workers n]\n" + \
+            "                [-checksum_workers n] [-checksum_hash sha256]\n" + \
+            "                [-json] datasetname\n" + \
+            "       gdalinfo -batch [-workers n] [-timeout seconds] [options]\n" + \
+            "                directory|pattern ...\n" + \
+            "\n" + \
+            "       Both forms accept a persistent report cache:\n" + \
+            "                [-cache file] [-cache_size MB] [-content_hash]\n" + \
+            "                [-refresh] [-invalidate]\n" + \
+            "       Cached reports are reused while the file and the sidecars\n" + \
+            "       GDAL listed for it are unchanged; -refresh after adding one." )
     return 1
 
 
@@ -69,16 +90,29 @@ def main( argv = None ):
     bReportHistograms = False
     pszFilename = None
     papszExtraMDDomains = [ ]
-    pszProjection = None
-    hTransform = None
     bShowFileList = True
+    bNativeStats = False
+    adfPercentiles = None
+    nStatsWorkers = 1
+    nChecksumWorkers = 1
+    pszChecksumHash = None
+    bJson = False
+    bBatch = False
+    papszBatchPaths = [ ]
+    nWorkers = None
+    dfTimeout = None
+    pszCacheFile = None
+    dfCacheSizeMB = None
+    bContentHash = False
+    bRefresh = False
+    bInvalidate = False
 
     #/* Must process GDAL_SKIP before GDALAllRegister(), but we can't call */
     #/* GDALGeneralCmdLineProcessor before it needs the drivers to be registered */
     #/* for the --format or --formats options */
-    #for( i = 1; i &lt; argc; i++ )
+    #for( i = 1; i < argc; i++ )
     #{
-    #    if EQUAL(argv[i],"--config") and i + 2 &lt; argc and EQUAL(argv[i + 1], "GDAL_SKIP"):
+    #    if EQUAL(argv[i],"--config") and i + 2 < argc and EQUAL(argv[i + 1], "GDAL_SKIP"):
     #    {
     #        CPLSetConfigOption( argv[i+1], argv[i+2] );
     #
@@ -101,7 +135,7 @@ def main( argv = None ):
 #/*      Parse arguments.                                                */
 #/* -------------------------------------------------------------------- */
     i = 1
-    while i &lt; nArgc:
+    while i < nArgc:
 
         if EQUAL(argv[i], "--utility_version"):
             print("%s is running against GDAL %s" %
@@ -127,13 +161,56 @@ def main( argv = None ):
             bShowRAT = False
         elif EQUAL(argv[i], "-noct"):
             bShowColorTable = False
-        elif EQUAL(argv[i], "-mdd") and i &lt; nArgc-1:
+        elif EQUAL(argv[i], "-mdd") and i < nArgc-1:
             i = i + 1
             papszExtraMDDomains.append( argv[i] )
         elif EQUAL(argv[i], "-nofl"):
             bShowFileList = False
+        elif EQUAL(argv[i], "-native_stats"):
+            bNativeStats = True
+        elif EQUAL(argv[i], "-percentiles") and i < nArgc-1:
+            i = i + 1
+            bNativeStats = True
+            adfPercentiles = [float(p) for p in argv[i].split(",")]
+        elif EQUAL(argv[i], "-stats_workers") and i < nArgc-1:
+            i = i + 1
+            nStatsWorkers = int(argv[i])
+        elif EQUAL(argv[i], "-checksum_workers") and i < nArgc-1:
+            i = i + 1
+            bComputeChecksum = True
+            nChecksumWorkers = int(argv[i])
+        elif EQUAL(argv[i], "-checksum_hash") and i < nArgc-1:
+            i = i + 1
+            bComputeChecksum = True
+            pszChecksumHash = argv[i].lower()
+            if pszChecksumHash != "sha256":
+                return Usage()
+        elif EQUAL(argv[i], "-json"):
+            bJson = True
+        elif EQUAL(argv[i], "-batch"):
+            bBatch = True
+        elif EQUAL(argv[i], "-workers") and i < nArgc-1:
+            i = i + 1
+            nWorkers = int(argv[i])
+        elif EQUAL(argv[i], "-timeout") and i < nArgc-1:
+            i = i + 1
+            dfTimeout = float(argv[i])
+        elif EQUAL(argv[i], "-cache") and i < nArgc-1:
+            i = i + 1
+            pszCacheFile = argv[i]
+        elif EQUAL(argv[i], "-cache_size") and i < nArgc-1:
+            i = i + 1
+            dfCacheSizeMB = float(argv[i])
+        elif EQUAL(argv[i], "-content_hash"):
+            bContentHash = True
+        elif EQUAL(argv[i], "-refresh"):
+            bRefresh = True
+        elif EQUAL(argv[i], "-invalidate"):
+            bInvalidate = True
         elif argv[i][0] == '-':
             return Usage()
+        elif bBatch:
+            papszBatchPaths.append( argv[i] )
         elif pszFilename is None:
             pszFilename = argv[i]
         else:
@@ -141,174 +218,221 @@ def main( argv = None ):
 
         i = i + 1
 
+    options = dict( bComputeMinMax = bComputeMinMax, \
+                    bShowGCPs = bShowGCPs, bShowMetadata = bShowMetadata, \
+                    bStats = bStats, bApproxStats = bApproxStats, \
+                    bShowColorTable = bShowColorTable, \
+                    bComputeChecksum = bComputeChecksum, \
+                    bReportHistograms = bReportHistograms, \
+                    papszExtraMDDomains = papszExtraMDDomains, \
+                    bNativeStats = bNativeStats, \
+                    adfPercentiles = adfPercentiles, \
+                    nStatsWorkers = nStatsWorkers, \
+                    nChecksumWorkers = nChecksumWorkers, \
+                    pszChecksumHash = pszChecksumHash )
+
+    nCacheBytes = int(dfCacheSizeMB * 2**20) \
+        if dfCacheSizeMB is not None else None
+
+#/* -------------------------------------------------------------------- */
+#/*      Drop cached reports if requested.                               */
+#/* -------------------------------------------------------------------- */
+    if bInvalidate:
+        if pszCacheFile is None:
+            return Usage()
+        with ReportCache( pszCacheFile ) as hCache:
+            if bBatch:
+                try:
+                    from raster.inventory import find_rasters
+                except ImportError:
+                    from inventory import find_rasters
+                for pszPath in find_rasters( papszBatchPaths ):
+                    hCache.invalidate( pszPath )
+            elif pszFilename is not None:
+                hCache.invalidate( pszFilename )
+            else:
+                hCache.invalidate()
+        return 0
+
+#/* -------------------------------------------------------------------- */
+#/*      Batch mode: JSON Lines reports for many files.                  */
+#/* -------------------------------------------------------------------- */
+    if bBatch:
+        if len(papszBatchPaths) == 0:
+            return Usage()
+        if pszCacheFile is not None:
+            options.update( cache = pszCacheFile, cache_bytes = nCacheBytes, \
+                            content_hash = bContentHash, refresh = bRefresh )
+        return GDALInfoBatch( papszBatchPaths, nWorkers, dfTimeout, options )
+
     if pszFilename is None:
         return Usage()
 
 #/* -------------------------------------------------------------------- */
-#/*      Open dataset.                                                   */
+#/*      Open dataset and build the report, or take it from the cache.   */
 #/* -------------------------------------------------------------------- */
-    hDataset = gdal.Open( pszFilename, gdal.GA_ReadOnly )
+    if pszCacheFile is None:
+        report = GDALInfo( pszFilename, **options )
+    else:
+        with ReportCache( pszCacheFile, content_hash = bContentHash ) as hCache:
+            if nCacheBytes is not None:
+                hCache.max_bytes = nCacheBytes
+            report = None if bRefresh else hCache.get( pszFilename, options )
+            if report is None:
+                report = GDALInfo( pszFilename, **options )
+                if report is not None:
+                    hCache.put( pszFilename, options, report )
 
-    if hDataset is None:
+    if report is None:
 
         print("gdalinfo failed - unable to open '%s'." % pszFilename )
 
         return 1
-    
+
+    if bJson:
+        print( json.dumps( report, indent = 2 ) )
+    else:
+        GDALInfoPrint( report, bShowFileList )
+
+    return 0
+
+#/************************************************************************/
+#/*                           GDALInfoBatch()                            */
+#/************************************************************************/
+
+def GDALInfoBatch( papszPatterns, nWorkers, dfTimeout, options ):
+
+    try:
+        from raster.inventory import find_rasters, inventory
+    except ImportError:
+        from inventory import find_rasters, inventory
+
+    summary = inventory( find_rasters( papszPatterns ), sys.stdout, \
+                         nWorkers, dfTimeout, **options )
+
+    sys.stderr.write( "%d files (%d failed, %d cached), %d bytes in %.1f s: " \
+                      "%.1f files/s, %.1f MB/s\n" % ( \
+                      summary["files"], summary["failed"], summary["cached"], \
+                      summary["bytes"], \
+                      summary["seconds"], summary["files_per_second"], \
+                      summary["bytes_per_second"] / 1e6 ))
+
+    return 1 if summary["failed"] > 0 else 0
+
+#/************************************************************************/
+#/*                              GDALInfo()                              */
+#/************************************************************************/
+
+def GDALInfo( pszFilename, **options ):
+    """
+    opens pszFilename and returns its GDALInfoReport() dict, or None if
+    the file cannot be opened
+    """
+    hDataset = gdal.Open( pszFilename, gdal.GA_ReadOnly )
+
+    if hDataset is None:
+        return None
+
+    return GDALInfoReport( hDataset, **options )
+
+#/************************************************************************/
+#/*                           GDALInfoReport()                           */
+#/************************************************************************/
+
+def GDALInfoReport( hDataset, bComputeMinMax = False, bShowGCPs = True, \
+                    bShowMetadata = True, bStats = False, \
+                    bApproxStats = True, bShowColorTable = True, \
+                    bComputeChecksum = False, bReportHistograms = False, \
+                    papszExtraMDDomains = (), bNativeStats = False, \
+                    adfPercentiles = None, nStatsWorkers = 1, \
+                    nChecksumWorkers = 1, pszChecksumHash = None ):
+    """
+    everything gdalinfo reports about an open dataset, as a dict of plain
+    Python values that can be dumped as JSON; the options are the same as
+    the command line flags. GDALInfoPrint() prints it as text
+    """
+    report = {}
+    hTransform = None
+
 #/* -------------------------------------------------------------------- */
 #/*      Report general info.                                            */
 #/* -------------------------------------------------------------------- */
+    report["description"] = hDataset.GetDescription()
+
     hDriver = hDataset.GetDriver();
-    print( "Driver: %s/%s" % ( \
-            hDriver.ShortName, \
-            hDriver.LongName ))
+    report["driver"] = { "short_name": hDriver.ShortName, \
+                         "long_name": hDriver.LongName }
 
     papszFileList = hDataset.GetFileList();
-    if papszFileList is None or len(papszFileList) == 0:
-        print( "Files: none associated" )
-    else:
-        print( "Files: %s" % papszFileList[0] )
-        if bShowFileList:
-            for i in range(1, len(papszFileList)):
-                print( "       %s" % papszFileList[i] )
+    report["files"] = list(papszFileList) if papszFileList is not None else []
 
-    print( "Size is %d, %d" % (hDataset.RasterXSize, hDataset.RasterYSize))
+    report["size"] = [ hDataset.RasterXSize, hDataset.RasterYSize ]
 
 #/* -------------------------------------------------------------------- */
 #/*      Report projection.                                              */
 #/* -------------------------------------------------------------------- */
+    report["coordinate_system"] = None
     pszProjection = hDataset.GetProjectionRef()
     if pszProjection is not None:
 
         hSRS = osr.SpatialReference()
         if hSRS.ImportFromWkt(pszProjection ) == gdal.CE_None:
-            pszPrettyWkt = hSRS.ExportToPrettyWkt(False)
-
-            print( "Coordinate System is:\n%s" % pszPrettyWkt )
+            report["coordinate_system"] = { "wkt": hSRS.ExportToPrettyWkt(False), \
+                                            "valid": True }
         else:
-            print( "Coordinate System is `%s'" % pszProjection )
+            report["coordinate_system"] = { "wkt": pszProjection, \
+                                            "valid": False }
 
 #/* -------------------------------------------------------------------- */
 #/*      Report Geotransform.                                            */
 #/* -------------------------------------------------------------------- */
     adfGeoTransform = hDataset.GetGeoTransform(can_return_null = True)
-    if adfGeoTransform is not None:
-
-        if adfGeoTransform[2] == 0.0 and adfGeoTransform[4] == 0.0:
-            print( "Origin = (%.15f,%.15f)" % ( \
-                    adfGeoTransform[0], adfGeoTransform[3] ))
-
-            print( "Pixel Size = (%.15f,%.15f)" % ( \
-                    adfGeoTransform[1], adfGeoTransform[5] ))
-
-        else:
-            print( "GeoTransform =\n" \
-                    "  %.16g, %.16g, %.16g\n" \
-                    "  %.16g, %.16g, %.16g" % ( \
-                    adfGeoTransform[0], \
-                    adfGeoTransform[1], \
-                    adfGeoTransform[2], \
-                    adfGeoTransform[3], \
-                    adfGeoTransform[4], \
-                    adfGeoTransform[5] ))
+    report["geotransform"] = list(adfGeoTransform) \
+        if adfGeoTransform is not None else None
 
 #/* -------------------------------------------------------------------- */
 #/*      Report GCPs.                                                    */
 #/* -------------------------------------------------------------------- */
-    if bShowGCPs and hDataset.GetGCPCount() &gt; 0:
+    if bShowGCPs and hDataset.GetGCPCount() > 0:
 
+        report["gcp_projection"] = None
         pszProjection = hDataset.GetGCPProjection()
         if pszProjection is not None:
 
             hSRS = osr.SpatialReference()
             if hSRS.ImportFromWkt(pszProjection ) == gdal.CE_None:
-                pszPrettyWkt = hSRS.ExportToPrettyWkt(False)
-                print( "GCP Projection = \n%s" % pszPrettyWkt )
-
+                report["gcp_projection"] = hSRS.ExportToPrettyWkt(False)
             else:
-                print( "GCP Projection = %s" % \
-                        pszProjection )
-
-        gcps = hDataset.GetGCPs()
-        i = 0
-        for gcp in gcps:
+                report["gcp_projection"] = pszProjection
 
-            print( "GCP[%3d]: Id=%s, Info=%s\n" \
-                    "          (%.15g,%.15g) -&gt; (%.15g,%.15g,%.15g)" % ( \
-                    i, gcp.Id, gcp.Info, \
-                    gcp.GCPPixel, gcp.GCPLine, \
-                    gcp.GCPX, gcp.GCPY, gcp.GCPZ ))
-            i = i + 1
+        report["gcps"] = [ { "id": gcp.Id, "info": gcp.Info, \
+                             "pixel": gcp.GCPPixel, "line": gcp.GCPLine, \
+                             "x": gcp.GCPX, "y": gcp.GCPY, "z": gcp.GCPZ } \
+                           for gcp in hDataset.GetGCPs() ]
 
 #/* -------------------------------------------------------------------- */
-#/*      Report metadata.                                                */
+#/*      Report metadata, by domain ("" is the default domain).          */
 #/* -------------------------------------------------------------------- */
+    report["metadata"] = {}
     if bShowMetadata:
-        papszMetadata = hDataset.GetMetadata_List()
-    else:
-        papszMetadata = None
-    if bShowMetadata and papszMetadata is not None and len(papszMetadata) &gt; 0 :
-        print( "Metadata:" )
-        for metadata in papszMetadata:
-            print( "  %s" % metadata )
-
-    if bShowMetadata:
-        for extra_domain in papszExtraMDDomains:
-            papszMetadata = hDataset.GetMetadata_List(extra_domain)
-            if papszMetadata is not None and len(papszMetadata) &gt; 0 :
-                print( "Metadata (%s):" % extra_domain)
-                for metadata in papszMetadata:
-                  print( "  %s" % metadata )
-
-#/* -------------------------------------------------------------------- */
-#/*      Report "IMAGE_STRUCTURE" metadata.                              */
-#/* -------------------------------------------------------------------- */
-    if bShowMetadata:
-        papszMetadata = hDataset.GetMetadata_List("IMAGE_STRUCTURE")
-    else:
-        papszMetadata = None
-    if bShowMetadata and papszMetadata is not None and len(papszMetadata) &gt; 0 :
-        print( "Image Structure Metadata:" )
-        for metadata in papszMetadata:
-            print( "  %s" % metadata )
+        for domain in [""] + list(papszExtraMDDomains) + \
+                      ["IMAGE_STRUCTURE", "GEOLOCATION", "RPC"]:
+            papszMetadata = hDataset.GetMetadata_List(domain) if domain \
+                else hDataset.GetMetadata_List()
+            if papszMetadata is not None and len(papszMetadata) > 0 :
+                report["metadata"][domain] = list(papszMetadata)
 
 #/* -------------------------------------------------------------------- */
 #/*      Report subdatasets.                                             */
 #/* -------------------------------------------------------------------- */
     papszMetadata = hDataset.GetMetadata_List("SUBDATASETS")
-    if papszMetadata is not None and len(papszMetadata) &gt; 0 :
-        print( "Subdatasets:" )
-        for metadata in papszMetadata:
-            print( "  %s" % metadata )
-
-#/* -------------------------------------------------------------------- */
-#/*      Report geolocation.                                             */
-#/* -------------------------------------------------------------------- */
-    if bShowMetadata:
-        papszMetadata = hDataset.GetMetadata_List("GEOLOCATION")
-    else:
-        papszMetadata = None
-    if bShowMetadata and papszMetadata is not None and len(papszMetadata) &gt; 0 :
-        print( "Geolocation:" )
-        for metadata in papszMetadata:
-            print( "  %s" % metadata )
-
-#/* -------------------------------------------------------------------- */
-#/*      Report RPCs                                                     */
-#/* -------------------------------------------------------------------- */
-    if bShowMetadata:
-        papszMetadata = hDataset.GetMetadata_List("RPC")
-    else:
-        papszMetadata = None
-    if bShowMetadata and papszMetadata is not None and len(papszMetadata) &gt; 0 :
-        print( "RPC Metadata:" )
-        for metadata in papszMetadata:
-            print( "  %s" % metadata )
+    report["subdatasets"] = list(papszMetadata) \
+        if papszMetadata is not None else []
 
 #/* -------------------------------------------------------------------- */
 #/*      Setup projected to lat/long transform if appropriate.           */
 #/* -------------------------------------------------------------------- */
-    if pszProjection is not None and len(pszProjection) &gt; 0:
+    if pszProjection is not None and len(pszProjection) > 0:
         hProj = osr.SpatialReference( pszProjection )
         if hProj is not None:
             hLatLong = hProj.CloneGeogCS()
@@ -323,26 +447,47 @@ def main( argv = None ):
 #/* -------------------------------------------------------------------- */
 #/*      Report corners.                                                 */
 #/* -------------------------------------------------------------------- */
-    print( "Corner Coordinates:" )
-    GDALInfoReportCorner( hDataset, hTransform, "Upper Left", \
-                          0.0, 0.0 );
-    GDALInfoReportCorner( hDataset, hTransform, "Lower Left", \
-                          0.0, hDataset.RasterYSize);
-    GDALInfoReportCorner( hDataset, hTransform, "Upper Right", \
-                          hDataset.RasterXSize, 0.0 );
-    GDALInfoReportCorner( hDataset, hTransform, "Lower Right", \
-                          hDataset.RasterXSize, \
-                          hDataset.RasterYSize );
-    GDALInfoReportCorner( hDataset, hTransform, "Center", \
-                          hDataset.RasterXSize/2.0, \
-                          hDataset.RasterYSize/2.0 );
+    report["corners"] = [
+        GDALInfoReportCorner( hDataset, hTransform, "Upper Left", \
+                              0.0, 0.0 ),
+        GDALInfoReportCorner( hDataset, hTransform, "Lower Left", \
+                              0.0, hDataset.RasterYSize),
+        GDALInfoReportCorner( hDataset, hTransform, "Upper Right", \
+                              hDataset.RasterXSize, 0.0 ),
+        GDALInfoReportCorner( hDataset, hTransform, "Lower Right", \
+                              hDataset.RasterXSize, \
+                              hDataset.RasterYSize ),
+        GDALInfoReportCorner( hDataset, hTransform, "Center", \
+                              hDataset.RasterXSize/2.0, \
+                              hDataset.RasterYSize/2.0 ) ]
+
+#/* -------------------------------------------------------------------- */
+#/*      Compute the statistics of all bands in one pass if requested.   */
+#/* -------------------------------------------------------------------- */
+    if bNativeStats:
+        nativeStats = compute_statistics( hDataset.GetDescription(), \
+                            compression = 100 if adfPercentiles else None, \
+                            workers = nStatsWorkers, \
+                            histogram = bReportHistograms )
+
+#/* -------------------------------------------------------------------- */
+#/*      Checksum bands and overviews in parallel strips if requested.   */
+#/* -------------------------------------------------------------------- */
+    checksums = None
+    if bComputeChecksum and (nChecksumWorkers > 1 or pszChecksumHash):
+        checksums = band_checksums( hDataset.GetDescription(), \
+                            mode = pszChecksumHash or "gdal", \
+                            workers = nChecksumWorkers )
 
 #/* ==================================================================== */
 #/*      Loop over bands.                                                */
 #/* ==================================================================== */
+    report["bands"] = []
     for iBand in range(hDataset.RasterCount):
 
         hBand = hDataset.GetRasterBand(iBand+1 )
+        band = { "band": iBand+1 }
+        report["bands"].append( band )
 
         #if( bSample )
         #{
@@ -353,89 +498,242 @@ def main( argv = None ):
         #    print( "Got %d samples.\n", nCount );
         #}
 
-        (nBlockXSize, nBlockYSize) = hBand.GetBlockSize()
-        print( "Band %d Block=%dx%d Type=%s, ColorInterp=%s" % ( iBand+1, \
-                nBlockXSize, nBlockYSize, \
-                gdal.GetDataTypeName(hBand.DataType), \
-                gdal.GetColorInterpretationName( \
-                    hBand.GetRasterColorInterpretation()) ))
-
-        if hBand.GetDescription() is not None \
-            and len(hBand.GetDescription()) &gt; 0 :
-            print( "  Description = %s" % hBand.GetDescription() )
-
-        dfMin = hBand.GetMinimum()
-        dfMax = hBand.GetMaximum()
-        if dfMin is not None or dfMax is not None or bComputeMinMax:
-
-            line =  "  "
-            if dfMin is not None:
-                line = line + ("Min=%.3f " % dfMin)
-            if dfMax is not None:
-                line = line + ("Max=%.3f " % dfMax)
-
-            if bComputeMinMax:
-                gdal.ErrorReset()
-                adfCMinMax = hBand.ComputeRasterMinMax(False)
-                if gdal.GetLastErrorType() == gdal.CE_None:
-                  line = line + ( "  Computed Min/Max=%.3f,%.3f" % ( \
-                          adfCMinMax[0], adfCMinMax[1] ))
-
-            print( line )
-
-        stats = hBand.GetStatistics( bApproxStats, bStats)
-        # Dirty hack to recognize if stats are valid. If invalid, the returned
-        # stddev is negative
-        if stats[3] &gt;= 0.0:
-            print( "  Minimum=%.3f, Maximum=%.3f, Mean=%.3f, StdDev=%.3f" % ( \
-                    stats[0], stats[1], stats[2], stats[3] ))
+        band["block"] = list(hBand.GetBlockSize())
+        band["type"] = gdal.GetDataTypeName(hBand.DataType)
+        band["color_interpretation"] = gdal.GetColorInterpretationName( \
+                    hBand.GetRasterColorInterpretation())
+        band["description"] = hBand.GetDescription()
 
-        if bReportHistograms:
+        if bNativeStats:
+            band.update( GDALInfoReportNativeStats( hBand, nativeStats[iBand], \
+                             bComputeMinMax, bReportHistograms, \
+                             adfPercentiles ) )
+        else:
+            band.update( GDALInfoReportStats( hBand, bComputeMinMax, bStats, \
+                             bApproxStats, bReportHistograms ) )
 
-            hist = hBand.GetDefaultHistogram(force = True, callback = gdal.TermProgress)
-            if hist is not None:
-                dfMin = hist[0]
-                dfMax = hist[1]
-                nBucketCount = hist[2]
-                panHistogram = hist[3]
+        if checksums is not None:
+            band["checksum"] = checksums[iBand+1]["checksum"]
+        elif bComputeChecksum:
+            band["checksum"] = hBand.Checksum()
 
-                print( "  %d buckets from %g to %g:" % ( \
-                        nBucketCount, dfMin, dfMax ))
-                line = '  '
-                for bucket in panHistogram:
-                    line = line + ("%d " % bucket)
+        dfNoData = hBand.GetNoDataValue()
+        if dfNoData is not None:
+            band["nodata"] = dfNoData
 
-                print(line)
+        band["overviews"] = []
+        for iOverview in range(hBand.GetOverviewCount()):
 
-        if bComputeChecksum:
-            print( "  Checksum=%d" % hBand.Checksum())
+            hOverview = hBand.GetOverview( iOverview );
+            if hOverview is not None:
 
-        dfNoData = hBand.GetNoDataValue()
-        if dfNoData is not None:
+                pszResampling = \
+                    hOverview.GetMetadataItem( "RESAMPLING", "" )
+
+                overview = { "size": [hOverview.XSize, hOverview.YSize], \
+                             "average_bit2": pszResampling is not None \
+                                 and len(pszResampling) >= 12 \
+                                 and EQUAL(pszResampling[0:12],"AVERAGE_BIT2") }
+                if checksums is not None:
+                    overview["checksum"] = \
+                        checksums[iBand+1]["overviews"][iOverview]
+                elif bComputeChecksum:
+                    overview["checksum"] = hOverview.Checksum()
+
+            else:
+                overview = None
+
+            band["overviews"].append( overview )
+
+        band["arbitrary_overviews"] = bool(hBand.HasArbitraryOverviews())
+
+        nMaskFlags = hBand.GetMaskFlags()
+        if (nMaskFlags & (gdal.GMF_NODATA|gdal.GMF_ALL_VALID)) == 0:
+
+            hMaskBand = hBand.GetMaskBand()
+
+            band["mask_flags"] = []
+            if (nMaskFlags & gdal.GMF_PER_DATASET) != 0:
+                band["mask_flags"].append( "PER_DATASET" )
+            if (nMaskFlags & gdal.GMF_ALPHA) != 0:
+                band["mask_flags"].append( "ALPHA" )
+            if (nMaskFlags & gdal.GMF_NODATA) != 0:
+                band["mask_flags"].append( "NODATA" )
+            if (nMaskFlags & gdal.GMF_ALL_VALID) != 0:
+                band["mask_flags"].append( "ALL_VALID" )
+
+            if hMaskBand is not None and \
+                hMaskBand.GetOverviewCount() > 0:
+
+                band["mask_overviews_checksum"] = []
+                for iOverview in range(hMaskBand.GetOverviewCount()):
+
+                    hOverview = hMaskBand.GetOverview( iOverview );
+                    band["mask_overviews_checksum"].append( \
+                        hOverview.Checksum() if hOverview is not None else None )
+
+        band["unit_type"] = hBand.GetUnitType()
+
+        papszCategories = hBand.GetRasterCategoryNames()
+        if papszCategories is not None:
+            band["categories"] = list(papszCategories)
+
+        band["offset"] = hBand.GetOffset()
+        band["scale"] = hBand.GetScale()
+
+        band["metadata"] = {}
+        if bShowMetadata:
+            for domain in ["", "IMAGE_STRUCTURE"]:
+                papszMetadata = hBand.GetMetadata_List(domain) if domain \
+                    else hBand.GetMetadata_List()
+                if papszMetadata is not None and len(papszMetadata) > 0 :
+                    band["metadata"][domain] = list(papszMetadata)
+
+        hTable = hBand.GetRasterColorTable()
+        if hBand.GetRasterColorInterpretation() == gdal.GCI_PaletteIndex  \
+            and hTable is not None:
+
+            band["color_table"] = { \
+                "palette_interpretation": gdal.GetPaletteInterpretationName( \
+                        hTable.GetPaletteInterpretation(  )), \
+                "count": hTable.GetCount() }
+
+            if bShowColorTable:
+
+                band["color_table"]["entries"] = \
+                    [ list(hTable.GetColorEntry(i)) \
+                      for i in range(hTable.GetCount()) ]
+
+        #if bShowRAT:
+            #hRAT = hBand.GetDefaultRAT()
+
+            #GDALRATDumpReadable( hRAT, None );
+
+    return report
+
+#/************************************************************************/
+#/*                           GDALInfoPrint()                            */
+#/************************************************************************/
+
+def GDALInfoPrint( report, bShowFileList = True ):
+    """
+    prints a GDALInfoReport() dict in the usual gdalinfo text format
+    """
+    print( "Driver: %s/%s" % ( \
+            report["driver"]["short_name"], \
+            report["driver"]["long_name"] ))
+
+    papszFileList = report["files"]
+    if len(papszFileList) == 0:
+        print( "Files: none associated" )
+    else:
+        print( "Files: %s" % papszFileList[0] )
+        if bShowFileList:
+            for i in range(1, len(papszFileList)):
+                print( "       %s" % papszFileList[i] )
+
+    print( "Size is %d, %d" % tuple(report["size"]) )
+
+    if report["coordinate_system"] is not None:
+        if report["coordinate_system"]["valid"]:
+            print( "Coordinate System is:\n%s" % report["coordinate_system"]["wkt"] )
+        else:
+            print( "Coordinate System is `%s'" % report["coordinate_system"]["wkt"] )
+
+    adfGeoTransform = report["geotransform"]
+    if adfGeoTransform is not None:
+
+        if adfGeoTransform[2] == 0.0 and adfGeoTransform[4] == 0.0:
+            print( "Origin = (%.15f,%.15f)" % ( \
+                    adfGeoTransform[0], adfGeoTransform[3] ))
+
+            print( "Pixel Size = (%.15f,%.15f)" % ( \
+                    adfGeoTransform[1], adfGeoTransform[5] ))
+
+        else:
+            print( "GeoTransform =\n" \
+                    "  %.16g, %.16g, %.16g\n" \
+                    "  %.16g, %.16g, %.16g" % tuple(adfGeoTransform) )
+
+    if "gcps" in report:
+
+        if report["gcp_projection"] is not None:
+            print( "GCP Projection = \n%s" % report["gcp_projection"] )
+
+        for i, gcp in enumerate(report["gcps"]):
+
+            print( "GCP[%3d]: Id=%s, Info=%s\n" \
+                    "          (%.15g,%.15g) -> (%.15g,%.15g,%.15g)" % ( \
+                    i, gcp["id"], gcp["info"], \
+                    gcp["pixel"], gcp["line"], \
+                    gcp["x"], gcp["y"], gcp["z"] ))
+
+    # subdatasets are always reported, after the image structure metadata
+    bSubdatasetsReported = False
+    for domain, papszMetadata in report["metadata"].items():
+        if domain in ("GEOLOCATION", "RPC") and not bSubdatasetsReported:
+            GDALInfoPrintSubdatasets( report )
+            bSubdatasetsReported = True
+
+        if domain == "":
+            print( "Metadata:" )
+        elif domain == "IMAGE_STRUCTURE":
+            print( "Image Structure Metadata:" )
+        elif domain == "GEOLOCATION":
+            print( "Geolocation:" )
+        elif domain == "RPC":
+            print( "RPC Metadata:" )
+        else:
+            print( "Metadata (%s):" % domain)
+        for metadata in papszMetadata:
+            print( "  %s" % metadata )
+
+    if not bSubdatasetsReported:
+        GDALInfoPrintSubdatasets( report )
+
+    print( "Corner Coordinates:" )
+    for corner in report["corners"]:
+        GDALInfoPrintCorner( corner )
+
+    for band in report["bands"]:
+
+        print( "Band %d Block=%dx%d Type=%s, ColorInterp=%s" % ( band["band"], \
+                band["block"][0], band["block"][1], \
+                band["type"], band["color_interpretation"] ))
+
+        if band["description"] is not None \
+            and len(band["description"]) > 0 :
+            print( "  Description = %s" % band["description"] )
+
+        GDALInfoPrintMinMax( band )
+        if "native_stats" in band:
+            GDALInfoPrintNativeStats( band["native_stats"] )
+        else:
+            GDALInfoPrintStats( band )
+
+        if "checksum" in band:
+            print( "  Checksum=%s" % band["checksum"])
+
+        if "nodata" in band:
+            dfNoData = band["nodata"]
             if dfNoData != dfNoData:
                 print( "  NoData Value=nan" )
             else:
                 print( "  NoData Value=%.18g" % dfNoData )
 
-        if hBand.GetOverviewCount() &gt; 0:
+        if len(band["overviews"]) > 0:
 
             line = "  Overviews: "
-            for iOverview in range(hBand.GetOverviewCount()):
+            for iOverview, overview in enumerate(band["overviews"]):
 
                 if iOverview != 0 :
                     line = line +  ", "
 
-                hOverview = hBand.GetOverview( iOverview );
-                if hOverview is not None:
-
-                    line = line + ( "%dx%d" % (hOverview.XSize, hOverview.YSize))
+                if overview is not None:
 
-                    pszResampling = \
-                        hOverview.GetMetadataItem( "RESAMPLING", "" )
+                    line = line + ( "%dx%d" % tuple(overview["size"]))
 
-                    if pszResampling is not None \
-                       and len(pszResampling) &gt;= 12 \
-                       and EQUAL(pszResampling[0:12],"AVERAGE_BIT2"):
+                    if overview["average_bit2"]:
                         line = line + "*"
 
                 else:
@@ -443,118 +741,204 @@ def main( argv = None ):
 
             print(line)
 
-            if bComputeChecksum:
+            if "checksum" in band:
 
                 line = "  Overviews checksum: "
-                for iOverview in range(hBand.GetOverviewCount()):
+                for iOverview, overview in enumerate(band["overviews"]):
 
                     if iOverview != 0:
                         line = line +  ", "
 
-                    hOverview = hBand.GetOverview( iOverview );
-                    if hOverview is not None:
-                        line = line + ( "%d" % hOverview.Checksum())
+                    if overview is not None:
+                        line = line + ( "%s" % overview["checksum"])
                     else:
                         line = line + "(null)"
                 print(line)
 
-        if hBand.HasArbitraryOverviews():
+        if band["arbitrary_overviews"]:
             print( "  Overviews: arbitrary" )
 
-        nMaskFlags = hBand.GetMaskFlags()
-        if (nMaskFlags &amp; (gdal.GMF_NODATA|gdal.GMF_ALL_VALID)) == 0:
+        if "mask_flags" in band:
+            print( "  Mask Flags: " + "".join( flag + " " \
+                                              for flag in band["mask_flags"] ))
 
-            hMaskBand = hBand.GetMaskBand()
+        if len(band["unit_type"]) > 0:
+            print( "  Unit Type: %s" % band["unit_type"])
 
-            line = "  Mask Flags: "
-            if (nMaskFlags &amp; gdal.GMF_PER_DATASET) != 0:
-                line = line + "PER_DATASET "
-            if (nMaskFlags &amp; gdal.GMF_ALPHA) != 0:
-                line = line + "ALPHA "
-            if (nMaskFlags &amp; gdal.GMF_NODATA) != 0:
-                line = line + "NODATA "
-            if (nMaskFlags &amp; gdal.GMF_ALL_VALID) != 0:
-                line = line + "ALL_VALID "
-            print(line)
+        if "categories" in band:
 
-            if hMaskBand is not None and \
-                hMaskBand.GetOverviewCount() &gt; 0:
+            print( "  Categories:" );
+            for i, category in enumerate(band["categories"]):
+                print( "    %3d: %s" % (i, category) )
 
-                line = "  Overviews of mask band: "
-                for iOverview in range(hMaskBand.GetOverviewCount()):
+        if band["scale"] != 1.0 or band["offset"] != 0.0:
+            print( "  Offset: %.15g,   Scale:%.15g" % \
+                        ( band["offset"], band["scale"]))
 
-                    if iOverview != 0:
-                        line = line +  ", "
+        if "" in band["metadata"]:
+            print( "  Metadata:" )
+            for metadata in band["metadata"][""]:
+                print( "    %s" % metadata )
 
-                    hOverview = hMaskBand.GetOverview( iOverview );
-                    if hOverview is not None:
-                        line = line + ( "%d" % hOverview.Checksum())
-                    else:
-                        line = line + "(null)"
+        if "IMAGE_STRUCTURE" in band["metadata"]:
+            print( "  Image Structure Metadata:" )
+            for metadata in band["metadata"]["IMAGE_STRUCTURE"]:
+                print( "    %s" % metadata )
 
-        if len(hBand.GetUnitType()) &gt; 0:
-            print( "  Unit Type: %s" % hBand.GetUnitType())
+        if "color_table" in band:
 
-        papszCategories = hBand.GetRasterCategoryNames()
-        if papszCategories is not None:
+            print( "  Color Table (%s with %d entries)" % (\
+                    band["color_table"]["palette_interpretation"], \
+                    band["color_table"]["count"] ))
 
-            print( "  Categories:" );
-            i = 0
-            for category in papszCategories:
-                print( "    %3d: %s" % (i, category) )
-                i = i + 1
+            for i, sEntry in enumerate(band["color_table"].get("entries", [])):
+                print( "  %3d: %d,%d,%d,%d" % ( \
+                        i, \
+                        sEntry[0],\
+                        sEntry[1],\
+                        sEntry[2],\
+                        sEntry[3] ))
 
-        if hBand.GetScale() != 1.0 or hBand.GetOffset() != 0.0:
-            print( "  Offset: %.15g,   Scale:%.15g" % \
-                        ( hBand.GetOffset(), hBand.GetScale()))
 
-        if bShowMetadata:
-            papszMetadata = hBand.GetMetadata_List()
-        else:
-            papszMetadata = None
-        if bShowMetadata and papszMetadata is not None and len(papszMetadata) &gt; 0 :
-            print( "  Metadata:" )
-            for metadata in papszMetadata:
-                print( "    %s" % metadata )
+def GDALInfoPrintSubdatasets( report ):
 
+    if len(report["subdatasets"]) == 0:
+        return
+    print( "Subdatasets:" )
+    for metadata in report["subdatasets"]:
+        print( "  %s" % metadata )
 
-        if bShowMetadata:
-            papszMetadata = hBand.GetMetadata_List("IMAGE_STRUCTURE")
+#/************************************************************************/
+#/*                         GDALInfoReportStats()                        */
+#/************************************************************************/
+
+def GDALInfoReportStats( hBand, bComputeMinMax, bStats, bApproxStats, \
+                         bReportHistograms ):
+
+    band = {}
+    band["min"] = hBand.GetMinimum()
+    band["max"] = hBand.GetMaximum()
+
+    if bComputeMinMax:
+        gdal.ErrorReset()
+        adfCMinMax = hBand.ComputeRasterMinMax(False)
+        if gdal.GetLastErrorType() == gdal.CE_None:
+            band["computed_min_max"] = list(adfCMinMax)
         else:
-            papszMetadata = None
-        if bShowMetadata and papszMetadata is not None and len(papszMetadata) &gt; 0 :
-            print( "  Image Structure Metadata:" )
-            for metadata in papszMetadata:
-                print( "    %s" % metadata )
+            band["computed_min_max"] = None
 
+    stats = hBand.GetStatistics( bApproxStats, bStats)
+    # Dirty hack to recognize if stats are valid. If invalid, the returned
+    # stddev is negative
+    if stats[3] >= 0.0:
+        band["stats"] = { "minimum": stats[0], "maximum": stats[1], \
+                          "mean": stats[2], "stddev": stats[3] }
 
-        hTable = hBand.GetRasterColorTable()
-        if hBand.GetRasterColorInterpretation() == gdal.GCI_PaletteIndex  \
-            and hTable is not None:
+    if bReportHistograms:
 
-            print( "  Color Table (%s with %d entries)" % (\
-                    gdal.GetPaletteInterpretationName( \
-                        hTable.GetPaletteInterpretation(  )), \
-                    hTable.GetCount() ))
+        # no progress callback: reports are built for -json output and in
+        # batch workers, where anything printed would corrupt stdout
+        hist = hBand.GetDefaultHistogram(force = True)
+        if hist is not None:
+            band["histogram"] = { "min": hist[0], "max": hist[1], \
+                                  "count": hist[2], "buckets": list(hist[3]) }
 
-            if bShowColorTable:
+    return band
 
-                for i in range(hTable.GetCount()):
-                    sEntry = hTable.GetColorEntry(i)
-                    print( "  %3d: %d,%d,%d,%d" % ( \
-                            i, \
-                            sEntry[0],\
-                            sEntry[1],\
-                            sEntry[2],\
-                            sEntry[3] ))
-
-        if bShowRAT:
-            pass
-            #hRAT = hBand.GetDefaultRAT()
 
-            #GDALRATDumpReadable( hRAT, None );
+def GDALInfoPrintMinMax( band ):
+
+    dfMin = band["min"]
+    dfMax = band["max"]
+    if dfMin is not None or dfMax is not None or "computed_min_max" in band:
+
+        line =  "  "
+        if dfMin is not None:
+            line = line + ("Min=%.3f " % dfMin)
+        if dfMax is not None:
+            line = line + ("Max=%.3f " % dfMax)
+
+        if band.get("computed_min_max") is not None:
+            line = line + ( "  Computed Min/Max=%.3f,%.3f" % ( \
+                    band["computed_min_max"][0], band["computed_min_max"][1] ))
+
+        print( line )
+
+
+def GDALInfoPrintStats( band ):
+
+    if "stats" in band:
+        print( "  Minimum=%.3f, Maximum=%.3f, Mean=%.3f, StdDev=%.3f" % ( \
+                band["stats"]["minimum"], band["stats"]["maximum"], \
+                band["stats"]["mean"], band["stats"]["stddev"] ))
+
+    if "histogram" in band:
+        GDALInfoPrintHistogram( band["histogram"] )
 
-    return 0
+
+def GDALInfoPrintHistogram( histogram ):
+
+    print( "  %d buckets from %g to %g:" % ( \
+            histogram["count"], histogram["min"], histogram["max"] ))
+    line = '  '
+    for bucket in histogram["buckets"]:
+        line = line + ("%d " % bucket)
+
+    print(line)
+
+#/************************************************************************/
+#/*                      GDALInfoReportNativeStats()                     */
+#/************************************************************************/
+
+def GDALInfoReportNativeStats( hBand, stats, bComputeMinMax, \
+                               bReportHistograms, adfPercentiles ):
+
+    # min, max and computed min/max are reported as GDALInfoReportStats
+    # does, so -native_stats output can be compared with -stats output
+    band = {}
+    band["min"] = hBand.GetMinimum()
+    band["max"] = hBand.GetMaximum()
+    if bComputeMinMax:
+        band["computed_min_max"] = [ float(stats.min), float(stats.max) ] \
+            if stats.count > 0 else None
+
+    native = { "count": int(stats.count), \
+               "nodata_count": int(stats.nodata_count) }
+    band["native_stats"] = native
+    if stats.count > 0:
+        native["minimum"] = float(stats.min)
+        native["maximum"] = float(stats.max)
+        native["mean"] = float(stats.mean)
+        native["stddev"] = float(stats.stddev)
+        if adfPercentiles:
+            native["percentiles"] = [ [ p, float(v) ] for p, v in \
+                zip(adfPercentiles, stats.percentiles(adfPercentiles)) ]
+        if bReportHistograms:
+            native["histogram"] = { "min": float(stats.hist_min), \
+                                    "max": float(stats.hist_max), \
+                                    "count": len(stats.histogram), \
+                                    "buckets": stats.histogram.tolist() }
+
+    return band
+
+
+def GDALInfoPrintNativeStats( native ):
+
+    if native["count"] == 0:
+        print( "  NoData Count=%d" % native["nodata_count"] )
+        return
+
+    print( "  Minimum=%.3f, Maximum=%.3f, Mean=%.3f, StdDev=%.3f" % ( \
+            native["minimum"], native["maximum"], \
+            native["mean"], native["stddev"] ))
+    print( "  NoData Count=%d" % native["nodata_count"] )
+
+    if "percentiles" in native:
+        print( "  Percentiles: " + ", ".join( "P%g=%.3f" % (p, v) \
+                                             for p, v in native["percentiles"] ))
+
+    if "histogram" in native:
+        GDALInfoPrintHistogram( native["histogram"] )
 
 #/************************************************************************/
 #/*                        GDALInfoReportCorner()                        */
@@ -562,8 +946,8 @@ def main( argv = None ):
 
 def GDALInfoReportCorner( hDataset, hTransform, corner_name, x, y ):
 
-
-    line = "%-11s " % corner_name
+    corner = { "name": corner_name, "pixel": [x, y], \
+               "geo": None, "latlong": None }
 
 #/* -------------------------------------------------------------------- */
 #/*      Transform the point into georeferenced coordinates.             */
@@ -576,27 +960,40 @@ def GDALInfoReportCorner( hDataset, hTransform, corner_name, x, y ):
             + adfGeoTransform[5] * y
 
     else:
-        line = line + ("(%7.1f,%7.1f)" % (x, y ))
-        print(line)
-        return False
+        return corner
+
+    corner["geo"] = [dfGeoX, dfGeoY]
 
 #/* -------------------------------------------------------------------- */
-#/*      Report the georeferenced coordinates.                           */
+#/*      Transform to latlong.                                           */
 #/* -------------------------------------------------------------------- */
-    if abs(dfGeoX) &lt; 181 and abs(dfGeoY) &lt; 91:
+    if hTransform is not None:
+        pnt = hTransform.TransformPoint(dfGeoX, dfGeoY, 0)
+        if pnt is not None:
+            corner["latlong"] = [pnt[0], pnt[1]]
+
+    return corner
+
+
+def GDALInfoPrintCorner( corner ):
+
+    line = "%-11s " % corner["name"]
+
+    if corner["geo"] is None:
+        line = line + ("(%7.1f,%7.1f)" % tuple(corner["pixel"]))
+        print(line)
+        return False
+
+    dfGeoX, dfGeoY = corner["geo"]
+    if abs(dfGeoX) < 181 and abs(dfGeoY) < 91:
         line = line + ( "(%12.7f,%12.7f) " % (dfGeoX, dfGeoY ))
 
     else:
         line = line + ( "(%12.3f,%12.3f) " % (dfGeoX, dfGeoY ))
 
-#/* -------------------------------------------------------------------- */
-#/*      Transform to latlong and report.                                */
-#/* -------------------------------------------------------------------- */
-    if hTransform is not None:
-        pnt = hTransform.TransformPoint(dfGeoX, dfGeoY, 0)
-        if pnt is not None:
-            line = line + ( "(%s," % gdal.DecToDMS( pnt[0], "Long", 2 ) )
-            line = line + ( "%s)" % gdal.DecToDMS( pnt[1], "Lat", 2 ) )
+    if corner["latlong"] is not None:
+        line = line + ( "(%s," % gdal.DecToDMS( corner["latlong"][0], "Long", 2 ) )
+        line = line + ( "%s)" % gdal.DecToDMS( corner["latlong"][1], "Lat", 2 ) )
 
     print(line)
 
@@ -604,8 +1001,8 @@ def GDALInfoReportCorner( hDataset, hTransform, corner_name, x, y ):
 
 if __name__ == '__main__':
     version_num = int(gdal.VersionInfo('VERSION_NUM'))
-    if version_num &lt; 1800: # because of GetGeoTransform(can_return_null)
+    if version_num < 1800: # because of GetGeoTransform(can_return_null)
         print('ERROR: Python bindings of GDAL 1.8.0 or later required')
         sys.exit(1)
 
-    sys.exit(main(sys.argv))
\ No newline at end of file
+    sys.exit(main(sys.argv))
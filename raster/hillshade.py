@@ -0,0 +1,121 @@
+"""
+Shaded relief from a DEM, for whole arrays or tile by tile
+"""
+import numpy as np
+
+try:
+    from raster.tiles import run_tiled
+except ImportError:
+    from tiles import run_tiled
+
+
+# azimuths of the usual multidirectional (oblique weighted) hillshade
+MULTIDIRECTIONAL_AZIMUTHS = (225, 270, 315, 360)
+
+
+class Relief:
+    """
+    Slope and aspect of a DEM array, computed once in float32 and shared
+    by any number of shadings
+    """
+    def __init__(self, array):
+        x, y = np.gradient(np.asarray(array, dtype=np.float32))
+
+        # the shading only needs sin and cos of the slope angle
+        # pi/2 - arctan(sqrt(x*x + y*y)), which are 1/r and g/r with
+        # g = sqrt(x*x + y*y) and r = sqrt(1 + g*g)
+        gradient = np.multiply(x, x)
+        gradient += y * y
+        self.sin_slope = gradient + 1
+        np.sqrt(gradient, out=gradient)
+        np.sqrt(self.sin_slope, out=self.sin_slope)
+        np.divide(1, self.sin_slope, out=self.sin_slope)
+        self.cos_slope = gradient
+        self.cos_slope *= self.sin_slope
+
+        np.negative(x, out=x)
+        self.aspect = np.arctan2(x, y, out=x)
+        self._scratch = y
+
+    def shade(self, azimuth, angle_altitude, out=None):
+        """
+        hillshade (0-255, float32) for one sun position; `out` may be a
+        float32 array of the same shape to write into
+        """
+        azimuthrad = np.float32(azimuth * np.pi / 180.)
+        altituderad = np.float32(angle_altitude * np.pi / 180.)
+
+        if out is None:
+            out = np.empty_like(self.aspect)
+        np.subtract(azimuthrad, self.aspect, out=out)
+        np.cos(out, out=out)
+        out *= self.cos_slope
+        out *= np.cos(altituderad)
+        np.multiply(self.sin_slope, np.sin(altituderad), out=self._scratch)
+        out += self._scratch
+
+        out += 1
+        out *= 255 / 2.
+        return out
+
+    def multidirectional(self, azimuths=MULTIDIRECTIONAL_AZIMUTHS,
+                         angle_altitude=45, weights=None, out=None):
+        """
+        weighted blend of the shadings for several azimuths (equal weights
+        by default); angle_altitude may be one value or one per azimuth
+        """
+        altitudes = np.broadcast_to(angle_altitude, (len(azimuths),))
+        if weights is None:
+            weights = np.ones(len(azimuths))
+        weights = np.asarray(weights, dtype=np.float64) / np.sum(weights)
+
+        if out is None:
+            out = np.zeros_like(self.aspect)
+        else:
+            out[...] = 0
+        shaded = np.empty_like(self.aspect)
+        for azimuth, altitude, weight in zip(azimuths, altitudes, weights):
+            self.shade(azimuth, altitude, out=shaded)
+            shaded *= np.float32(weight)
+            out += shaded
+        return out
+
+
+def hillshade(array, azimuth, angle_altitude):
+    return Relief(array).shade(azimuth, angle_altitude)
+
+
+def tiled_hillshade(src_path, dst_path, azimuth=315, angle_altitude=45,
+                    tile_size=512, workers=4):
+    """
+    writes the hillshade of src_path to the GeoTIFF dst_path, reading the
+    DEM in block-aligned tiles with a one pixel halo so the gradient is
+    the same at tile seams as for the whole raster
+    """
+    run_tiled(src_path, dst_path,
+              lambda array: hillshade(array, azimuth, angle_altitude),
+              halo=1, tile_size=tile_size, workers=workers)
+
+
+def tiled_multidirectional(src_path, dst_path,
+                           azimuths=MULTIDIRECTIONAL_AZIMUTHS,
+                           angle_altitude=45, weights=None, blend=True,
+                           tile_size=512, workers=4):
+    """
+    like tiled_hillshade for several azimuths, with the slope and aspect
+    of every tile computed once. blend writes the weighted blend as one
+    band, otherwise every azimuth gets its own band
+    """
+    def shade_tile(array):
+        relief = Relief(array)
+        if blend:
+            return relief.multidirectional(azimuths, angle_altitude, weights)
+        altitudes = np.broadcast_to(angle_altitude, (len(azimuths),))
+        shaded = np.empty((len(azimuths),) + relief.aspect.shape,
+                          dtype=np.float32)
+        for i, (azimuth, altitude) in enumerate(zip(azimuths, altitudes)):
+            relief.shade(azimuth, altitude, out=shaded[i])
+        return shaded
+
+    run_tiled(src_path, dst_path, shade_tile, halo=1, tile_size=tile_size,
+              workers=workers, out_bands=1 if blend else len(azimuths))
@@ -0,0 +1,69 @@
+"""
+Sub-pixel interpolation kernels for sampling a raster between pixel
+centres
+
+A point at fractional pixel position t (0 at one pixel centre, 1 at the
+next) takes the values of its 2 (bilinear) or 4 (bicubic) neighbours in
+each direction; interpolate() gives the nodata-aware weighted sum
+"""
+import numpy as np
+
+
+METHODS = ("nearest", "bilinear", "bicubic")
+
+# neighbour offsets from the pixel centre at or left of/above the point
+OFFSETS = {"bilinear": np.array([0, 1]), "bicubic": np.array([-1, 0, 1, 2])}
+
+# Keys' cubic convolution parameter, the same as GDAL's cubic resampling
+CUBIC_A = -0.5
+
+
+def weights(t, method):
+    """
+    (n, k) weights of the k neighbours along one axis for fractional
+    positions t (n,) in [0, 1)
+    """
+    d = np.abs(t[:, None] - OFFSETS[method])
+    if method == "bilinear":
+        return np.maximum(1 - d, 0.0)
+    a = CUBIC_A
+    return np.where(d <= 1, ((a + 2) * d - (a + 3)) * d * d + 1,
+                    np.where(d < 2, ((a * d - 5 * a) * d + 8 * a) * d - 4 * a,
+                             0.0))
+
+
+def _bilinear(values, bad, tx, ty):
+    w = weights(ty, "bilinear")[:, :, None] * weights(tx, "bilinear")[:, None, :]
+    w = np.where(bad, 0.0, w)
+    total = w.sum(axis=(1, 2))
+    # a point on a nodata pixel stays nodata
+    rows = np.arange(len(tx))
+    valid = (total > 1e-12) & ~bad[rows, (ty >= 0.5).astype(int),
+                                   (tx >= 0.5).astype(int)]
+    result = (np.where(bad, 0.0, values) * w).sum(axis=(1, 2))
+    return result / np.where(valid, total, 1.0), valid
+
+
+def interpolate(values, bad, tx, ty, method):
+    """
+    values, bad: (n, k, k) neighbourhoods (rows, cols) and their nodata
+                 mask, k = len(OFFSETS[method])
+    tx, ty: (n,) fractional positions
+    points whose nearest pixel is nodata are not valid; otherwise bilinear
+    weights are renormalized over the valid neighbours, and as bicubic
+    weights can be negative, a bicubic neighbourhood with a nodata
+    pixel of nonzero weight falls back to bilinear on its inner 2 x 2
+    returns (result, valid) arrays of shape (n,)
+    """
+    if method == "bilinear":
+        return _bilinear(values, bad, tx, ty)
+
+    w = weights(ty, method)[:, :, None] * weights(tx, method)[:, None, :]
+    result = (np.where(bad, 0.0, values) * w).sum(axis=(1, 2))
+    valid = ~(bad & (w != 0)).any(axis=(1, 2))
+    fallback = ~valid
+    if fallback.any():
+        result[fallback], valid[fallback] = _bilinear(
+            values[fallback][:, 1:3, 1:3], bad[fallback][:, 1:3, 1:3],
+            tx[fallback], ty[fallback])
+    return result, valid
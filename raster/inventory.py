@@ -0,0 +1,208 @@
+"""
+Batch inventory of raster files: one gdalinfo report per file, written as
+JSON Lines while a process pool works through the files
+"""
+import glob
+import json
+import os
+import sys
+import time
+from collections import deque
+from functools import partial
+from multiprocessing import Pool
+
+try:
+    from raster.gdalinfo import GDALInfo
+    from raster.reportcache import ReportCache
+except ImportError:
+    from gdalinfo import GDALInfo
+    from reportcache import ReportCache
+
+
+def find_rasters(patterns):
+    """
+    expands directories (walked recursively) and glob patterns (** is
+    allowed) into a sorted list of file paths
+    """
+    paths = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            for root, dirs, files in os.walk(pattern):
+                paths.update(os.path.join(root, name) for name in files)
+        else:
+            paths.update(path for path in glob.glob(pattern, recursive=True)
+                         if os.path.isfile(path))
+    return sorted(paths)
+
+
+# one ReportCache connection per cache file in every process
+_report_caches = {}
+
+
+def open_cache(cache_path, max_bytes=None, content_hash=False):
+    cache = _report_caches.get(cache_path)
+    if cache is None:
+        cache = _report_caches[cache_path] = ReportCache(cache_path)
+    if max_bytes is not None:
+        cache.max_bytes = max_bytes
+    cache.content_hash = content_hash
+    return cache
+
+
+def _file_size(path, files):
+    """
+    bytes on disk of a dataset: all its files if GDAL listed them
+    """
+    size = 0
+    for name in files or [path]:
+        try:
+            size += os.path.getsize(name)
+        except OSError:
+            pass
+    return size
+
+
+def report_file(path, cache=None, cache_bytes=None, content_hash=False,
+                refresh=False, **options):
+    """
+    the gdalinfo report of one file, as the record written to the JSON
+    Lines output: path, bytes, seconds and either report or error
+    cache: path of a ReportCache file; unchanged files are served from it
+           (the record then has "cached": true) and new reports are stored;
+           cache_bytes and content_hash are passed to the ReportCache
+    refresh: recompute the report even if it is cached
+    """
+    record = {"path": path}
+    start = time.time()
+    if cache is not None:
+        cache = open_cache(cache, cache_bytes, content_hash)
+        report = None if refresh else cache.get(path, options)
+        if report is not None:
+            record["report"] = report
+            record["cached"] = True
+            record["seconds"] = time.time() - start
+            record["bytes"] = _file_size(path, report.get("files"))
+            return record
+
+    try:
+        report = GDALInfo(path, **options)
+        if report is None:
+            record["error"] = "unable to open"
+        else:
+            record["report"] = report
+    except Exception as e:
+        record["error"] = "%s: %s" % (type(e).__name__, e)
+
+    if cache is not None and "report" in record:
+        cache.put(path, options, record["report"])
+
+    record["seconds"] = time.time() - start
+    record["bytes"] = _file_size(path, record.get("report", {}).get("files"))
+    return record
+
+
+def _worker_init():
+    # only the parent writes to stdout, one JSON line per record: anything
+    # a worker or GDAL prints (progress, debug output) goes to stderr
+    os.dup2(2, 1)
+    sys.stdout = sys.stderr
+
+
+def _reports(paths, workers, options):
+    """
+    the report_file records of paths, in completion order
+    """
+    with Pool(workers, _worker_init) as pool:
+        for record in pool.imap_unordered(partial(report_file, **options),
+                                          paths, chunksize=4):
+            yield record
+
+
+def _timed_out(path, timeout):
+    return {"path": path, "error": "timed out", "seconds": timeout,
+            "bytes": _file_size(path, None)}
+
+
+def _reports_with_timeout(paths, workers, timeout, options):
+    """
+    the report_file records of paths, in completion order, with at most
+    `timeout` seconds per file. The deadline is kept here in the parent:
+    a worker stuck inside GDAL cannot be interrupted, so when a file runs
+    over, the pool is terminated and replaced; the file is recorded as
+    timed out and the other files that were in flight are started again
+    """
+    workers = workers or os.cpu_count() or 1
+    pending = deque(paths)
+    pool = Pool(workers, _worker_init)
+    running = {}    # AsyncResult -> (path, deadline)
+    try:
+        while pending or running:
+            # no more files in flight than workers, so a file starts as
+            # soon as it is submitted and its deadline is fair
+            while pending and len(running) < workers:
+                path = pending.popleft()
+                result = pool.apply_async(report_file, (path,), options)
+                running[result] = (path, time.time() + timeout)
+
+            oldest = min(running, key=lambda result: running[result][1])
+            oldest.wait(max(0.0, min(running[oldest][1] - time.time(), 0.1)))
+
+            now = time.time()
+            expired = []
+            for result, (path, deadline) in list(running.items()):
+                if result.ready():
+                    del running[result]
+                    try:
+                        yield result.get()
+                    except Exception as e:
+                        # the worker died or the record did not unpickle
+                        yield {"path": path, "bytes": _file_size(path, None),
+                               "error": "%s: %s" % (type(e).__name__, e)}
+                elif deadline <= now:
+                    expired.append(result)
+
+            if expired:
+                for result in expired:
+                    yield _timed_out(running.pop(result)[0], timeout)
+                pending.extendleft(path for path, deadline in running.values())
+                running = {}
+                pool.terminate()
+                pool.join()
+                pool = Pool(workers, _worker_init)
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def inventory(paths, output=None, workers=None, timeout=None, **options):
+    """
+    writes one JSON line per file to output (stdout by default) as soon as
+    its report is ready; options are passed to report_file and GDALInfo
+    workers: size of the process pool (number of CPUs by default)
+    timeout: seconds allowed per file; a file that takes longer is
+             recorded with "error": "timed out" and its worker is replaced
+    returns a summary: files, failed, cached, bytes, seconds,
+    files_per_second, bytes_per_second
+    """
+    if output is None:
+        output = sys.stdout
+
+    start = time.time()
+    n_files = n_failed = n_cached = n_bytes = 0
+    records = _reports_with_timeout(paths, workers, timeout, options) \
+        if timeout else _reports(paths, workers, options)
+    for record in records:
+        output.write(json.dumps(record) + "\n")
+        n_files += 1
+        n_bytes += record["bytes"]
+        if "error" in record:
+            n_failed += 1
+        if record.get("cached"):
+            n_cached += 1
+
+    seconds = time.time() - start
+    return {"files": n_files, "failed": n_failed, "cached": n_cached,
+            "bytes": n_bytes,
+            "seconds": seconds,
+            "files_per_second": n_files / seconds if seconds else 0.0,
+            "bytes_per_second": n_bytes / seconds if seconds else 0.0}
@@ -0,0 +1,193 @@
+"""
+Line of sight between many transmitter/receiver pairs over a DEM
+
+The terrain along every link is compared against the straight ray between
+the two antennas (ground elevation + antenna height at each end), not
+against the plan-view line between them
+"""
+from collections import namedtuple
+from multiprocessing import Pool
+
+import numpy as np
+
+
+EARTH_RADIUS = 6371000.0    # m
+
+# one entry per pair, all fields are 1-D arrays
+# visible: False when the terrain rises above the ray, or when an end point
+#          is outside the raster or on nodata
+# obstruction_x/y/z/distance: the first sample where the terrain is above the
+#          ray, nan for clear links
+# min_clearance: smallest height of the ray above the terrain between the end
+#          points (negative when obstructed), nan when it cannot be computed
+LineOfSight = namedtuple("LineOfSight", [
+    "visible", "obstruction_x", "obstruction_y", "obstruction_z",
+    "obstruction_distance", "min_clearance"])
+
+
+def clearance(distance, z, last, height1=0.0, height2=0.0, k_factor=None):
+    """
+    height of the antenna ray above the terrain along sampled profiles
+    distance, z: (pairs, samples) arrays of distance along the link and
+                 terrain elevation, z may be masked
+    last: per pair, the index of the receiver sample; later samples are
+          padding and are masked in the result, like the end points
+    k_factor: effective earth radius factor (4/3 for standard radio
+              refraction); None ignores earth curvature
+    """
+    distance = np.asarray(distance, dtype=np.float64)
+    z = np.ma.asarray(z).astype(np.float64)
+    last = np.asarray(last)
+    rows = np.arange(len(z))
+
+    length = distance[rows, last][:, None]
+    start = z[:, 0] + np.asarray(height1, dtype=np.float64)
+    end = z[rows, last] + np.asarray(height2, dtype=np.float64)
+    t = np.divide(distance, length, out=np.zeros_like(distance),
+                  where=length > 0)
+    ray = start[:, None] + t * (end - start)[:, None]
+
+    terrain = z
+    if k_factor is not None:
+        # the earth bulges up by d1 * d2 / (2 k R) between the end points
+        terrain = terrain + distance * (length - distance) \
+            / (2.0 * k_factor * EARTH_RADIUS)
+
+    result = ray - terrain
+    columns = np.arange(distance.shape[1])
+    interior = (columns > 0) & (columns < last[:, None])
+    return np.ma.masked_where(~interior | np.ma.getmaskarray(result), result)
+
+
+def _solve(reader, x1, y1, x2, y2, height1, height2, spacing, k_factor, band,
+           method="nearest"):
+    """
+    line of sight for one batch of pairs, all arguments are 1-D arrays
+    """
+    length = np.hypot(x2 - x1, y2 - y1)
+    n_samples = np.maximum(np.ceil(length / spacing).astype(np.int64), 1) + 1
+    columns = np.arange(n_samples.max())
+
+    # samples past the end of the shorter links repeat their end point
+    t = np.minimum(columns / (n_samples - 1)[:, None], 1.0)
+    xs = x1[:, None] + t * (x2 - x1)[:, None]
+    ys = y1[:, None] + t * (y2 - y1)[:, None]
+    distance = t * length[:, None]
+    z = reader._sample(xs, ys, [band - 1], 0, method)[0]
+
+    profile = clearance(distance, z, n_samples - 1, height1, height2,
+                        k_factor)
+
+    rows = np.arange(len(x1))
+    ends_valid = ~np.ma.getmaskarray(z)[:, 0] \
+        & ~np.ma.getmaskarray(z)[rows, n_samples - 1]
+
+    blocked = profile.filled(np.inf) < 0
+    obstructed = blocked.any(axis=1)
+    first = np.argmax(blocked, axis=1)
+
+    min_clearance = profile.min(axis=1).filled(np.nan)
+    min_clearance[~ends_valid] = np.nan
+
+    def at_first(values):
+        values = np.ma.asarray(values).astype(np.float64).filled(np.nan)
+        return np.where(obstructed, values[rows, first], np.nan)
+
+    return LineOfSight(
+        visible=ends_valid & ~obstructed,
+        obstruction_x=at_first(xs),
+        obstruction_y=at_first(ys),
+        obstruction_z=at_first(z),
+        obstruction_distance=at_first(distance),
+        min_clearance=min_clearance)
+
+
+def _concatenate(results):
+    return LineOfSight(*(np.concatenate(field) for field in zip(*results)))
+
+
+_worker_reader = None
+
+
+def _init_worker(file_name, cache):
+    global _worker_reader
+    try:
+        from raster.readerclass import Reader
+    except ImportError:
+        from readerclass import Reader
+    _worker_reader = Reader(file_name, cache=cache)
+
+
+def _init_shared_worker(descriptor):
+    global _worker_reader
+    try:
+        from raster.readerclass import Reader
+        from raster.sharedband import attach
+    except ImportError:
+        from readerclass import Reader
+        from sharedband import attach
+    _worker_reader = Reader.from_dataset(attach(descriptor))
+
+
+def _solve_in_worker(args):
+    return _solve(_worker_reader, *args)
+
+
+def line_of_sight(reader, x1, y1, x2, y2, height1=0.0, height2=0.0,
+                  spacing=None, k_factor=None, band=1, chunk_size=512,
+                  processes=None, shared=False, method="nearest",
+                  latlon=False):
+    """
+    reader: a Reader on the DEM
+    (x1, y1), (x2, y2): arrays of transmitter and receiver coordinates (UTM)
+    height1, height2: antenna heights above the ground, scalars or arrays
+    spacing: sample interval along every link (default: pixel size)
+    latlon: the end points are WGS84 (latitude, longitude) arrays, i.e.
+            x1, x2 are latitudes and y1, y2 longitudes
+    method: terrain sampling, "nearest", "bilinear" or "bicubic" (see
+            Reader.get_pixel_values)
+    chunk_size: pairs solved together in one batch of NumPy operations
+    processes: fan the batches out over a pool of this many processes;
+               every worker opens its own Reader on reader.file_name
+    shared: with processes, load the DEM once into shared memory that
+            all workers read, instead of one copy per worker
+    returns a LineOfSight of arrays, one entry per pair
+    """
+    x1, y1, x2, y2, height1, height2 = (
+        np.ravel(a) for a in np.broadcast_arrays(
+            *(np.asarray(a, dtype=np.float64)
+              for a in (x1, y1, x2, y2, height1, height2))))
+    if latlon:
+        x1, y1 = reader.from_latlon(x1, y1)
+        x2, y2 = reader.from_latlon(x2, y2)
+    if spacing is None:
+        spacing = min(abs(reader._pixelWidth), abs(reader._pixelHeight))
+
+    batches = [(x1[i:i+chunk_size], y1[i:i+chunk_size],
+                x2[i:i+chunk_size], y2[i:i+chunk_size],
+                height1[i:i+chunk_size], height2[i:i+chunk_size],
+                spacing, k_factor, band, method)
+               for i in range(0, len(x1), chunk_size)]
+    if not batches:
+        empty = np.empty(0)
+        return LineOfSight(empty.astype(bool), empty, empty, empty, empty, empty)
+
+    if processes is None or processes <= 1 or len(batches) == 1:
+        return _concatenate([_solve(reader, *batch) for batch in batches])
+
+    if shared:
+        try:
+            from raster.sharedband import SharedRaster
+        except ImportError:
+            from sharedband import SharedRaster
+        with SharedRaster(reader.file_name, bands=[band]) as shared_raster, \
+                Pool(processes, initializer=_init_shared_worker,
+                     initargs=(shared_raster.descriptor,)) as pool:
+            # the shared raster holds only `band`, as its band 1
+            return _concatenate(pool.map(_solve_in_worker,
+                                         [batch[:-2] + (1,) + batch[-1:]
+                                          for batch in batches]))
+
+    with Pool(processes, initializer=_init_worker,
+              initargs=(reader.file_name, "band")) as pool:
+        return _concatenate(pool.map(_solve_in_worker, batches))
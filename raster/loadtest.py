@@ -0,0 +1,130 @@
+"""
+Load test of a running service.py on localhost
+
+Opens `connections` keep-alive connections that each send `requests`
+queries back to back (point, batch of `batch_size` points, or transect,
+at random positions inside the raster) and reports the throughput and
+the client-side latency quantiles next to the server's /stats
+
+Usage: python loadtest.py [address [endpoint [connections [requests]]]]
+address: host:port (default 127.0.0.1:8080) or a Unix socket path
+endpoint: point, points or transect
+"""
+import asyncio
+import json
+import sys
+import time
+
+import numpy as np
+
+
+async def _connect(address):
+    if "/" in address:
+        return await asyncio.open_unix_connection(address)
+    host, _, port = address.rpartition(":")
+    return await asyncio.open_connection(host or "127.0.0.1", int(port))
+
+
+async def _request(stream_reader, writer, verb, target, payload=None):
+    """
+    one request on an open connection; returns (status, decoded JSON)
+    """
+    body = b"" if payload is None else json.dumps(payload).encode("utf-8")
+    writer.write(("%s %s HTTP/1.1\r\nHost: localhost\r\n"
+                  "Content-Length: %d\r\n\r\n" % (verb, target, len(body))
+                  ).encode("latin-1") + body)
+    await writer.drain()
+    status = int((await stream_reader.readline()).split()[1])
+    headers = {}
+    while True:
+        header = await stream_reader.readline()
+        if not header.strip():
+            break
+        name, _, value = header.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    data = await stream_reader.readexactly(int(headers["content-length"]))
+    return status, json.loads(data.decode("utf-8"))
+
+
+def _query(endpoint, bounds, random, batch_size, method):
+    """
+    (verb, target, payload) of one random query inside bounds
+    """
+    x0, y0, x1, y1 = bounds
+    xs = random.uniform(x0, x1, max(batch_size, 2))
+    ys = random.uniform(y0, y1, max(batch_size, 2))
+    if endpoint == "point":
+        return "GET", "/point?x=%.17g&y=%.17g&method=%s" \
+            % (xs[0], ys[0], method), None
+    if endpoint == "points":
+        return "POST", "/points", {"x": xs[:batch_size].tolist(),
+                                   "y": ys[:batch_size].tolist(),
+                                   "method": method}
+    if endpoint == "transect":
+        return "GET", "/transect?x1=%.17g&y1=%.17g&x2=%.17g&y2=%.17g" \
+            "&method=%s" % (xs[0], ys[0], xs[1], ys[1], method), None
+    raise ValueError("unknown endpoint: %r" % (endpoint,))
+
+
+async def _client(address, endpoint, n_requests, bounds, seed, batch_size,
+                  method, latencies):
+    random = np.random.RandomState(seed)
+    stream_reader, writer = await _connect(address)
+    try:
+        for i in range(n_requests):
+            verb, target, payload = _query(endpoint, bounds, random,
+                                           batch_size, method)
+            start = time.perf_counter()
+            status, answer = await _request(stream_reader, writer, verb,
+                                            target, payload)
+            latencies.append(time.perf_counter() - start)
+            if status != 200:
+                raise RuntimeError("%s %s: %s" % (verb, target, answer))
+    finally:
+        writer.close()
+
+
+async def run(address="127.0.0.1:8080", endpoint="point", connections=32,
+              requests=200, batch_size=100, method="nearest"):
+    """
+    runs the load test; returns a dict of the request count, wall time,
+    requests per second, client latency quantiles (ms) and server stats
+    """
+    stream_reader, writer = await _connect(address)
+    status, info = await _request(stream_reader, writer, "GET", "/info")
+    writer.close()
+
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*(_client(address, endpoint, requests, info["bounds"],
+                                   seed, batch_size, method, latencies)
+                           for seed in range(connections)))
+    seconds = time.perf_counter() - start
+
+    stream_reader, writer = await _connect(address)
+    status, stats = await _request(stream_reader, writer, "GET", "/stats")
+    writer.close()
+
+    quantiles = np.percentile(latencies, [50, 90, 99]) * 1000.0
+    return {"requests": len(latencies), "seconds": seconds,
+            "requests_per_second": len(latencies) / seconds,
+            "p50_ms": quantiles[0], "p90_ms": quantiles[1],
+            "p99_ms": quantiles[2], "server": stats}
+
+
+if __name__ == "__main__":
+    address = sys.argv[1] if len(sys.argv) > 1 else "127.0.0.1:8080"
+    endpoint = sys.argv[2] if len(sys.argv) > 2 else "point"
+    connections = int(sys.argv[3]) if len(sys.argv) > 3 else 32
+    requests = int(sys.argv[4]) if len(sys.argv) > 4 else 200
+    result = asyncio.run(run(address, endpoint, connections, requests))
+    print("%d %s requests in %.2f s: %.0f requests/s" % (
+        result["requests"], endpoint, result["seconds"],
+        result["requests_per_second"]))
+    print("client latency p50 %.2f ms, p90 %.2f ms, p99 %.2f ms" % (
+        result["p50_ms"], result["p90_ms"], result["p99_ms"]))
+    server = result["server"]
+    print("server latency /%s: %s" % (endpoint, json.dumps(
+        dict((k, v) for k, v in server["latency"]["/" + endpoint].items()
+             if k != "buckets"))))
+    print("batching: %s" % json.dumps(server["batching"]))
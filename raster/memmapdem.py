@@ -0,0 +1,176 @@
+"""
+Flat memory-mapped raster format, read without GDAL
+
+convert() writes the bands of any GDAL raster to a single file: a small
+JSON header (geotransform, dtype, nodata, projection WKT) followed, at a
+page-aligned offset, by the pixels of every band as one C-ordered array.
+MemmapDataset opens such a file with numpy.memmap and offers the parts
+of the GDAL Dataset/Band interface that Reader uses, so reads are plain
+array slicing: opening is instant, nothing is copied until points are
+gathered, and every process mapping the file shares the page cache
+
+Layout: MAGIC, header length (uint32, little endian), header, padding,
+data (bands, rows, cols)
+"""
+import json
+import mmap
+import struct
+import sys
+
+import numpy as np
+
+try:
+    from osgeo import gdal
+except ImportError:
+    import gdal
+
+try:
+    from raster.tiles import block_windows
+except ImportError:
+    from tiles import block_windows
+
+
+MAGIC = b"MDEM"
+ALIGNMENT = max(mmap.PAGESIZE, mmap.ALLOCATIONGRANULARITY)
+
+
+def _data_offset(header_length):
+    return -(-(len(MAGIC) + 4 + header_length) // ALIGNMENT) * ALIGNMENT
+
+
+def _read_header(path):
+    """
+    (header dict, offset of the data) of a memmap raster, or None for
+    other files
+    """
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            return None
+        length, = struct.unpack("<I", f.read(4))
+        return json.loads(f.read(length).decode("utf-8")), _data_offset(length)
+
+
+def is_memmap_raster(path):
+    try:
+        return _read_header(path) is not None
+    except (IOError, ValueError, struct.error):
+        return False
+
+
+def convert(src_path, dst_path, tile_size=512):
+    """
+    writes the raster at src_path (any GDAL format) as a memmap raster,
+    copying block-aligned tiles so the source never has to fit in memory
+    """
+    src = gdal.Open(src_path, gdal.GA_ReadOnly)
+    if src is None:
+        raise IOError("could not open %s" % src_path)
+    bands = [src.GetRasterBand(i+1) for i in range(src.RasterCount)]
+    dtype = np.result_type(*[band.ReadAsArray(0, 0, 1, 1).dtype
+                             for band in bands])
+    shape = (src.RasterCount, src.RasterYSize, src.RasterXSize)
+
+    header = json.dumps({
+        "version": 1,
+        "dtype": dtype.newbyteorder("<").str,
+        "shape": shape,
+        "geotransform": list(src.GetGeoTransform()),
+        "projection": src.GetProjectionRef(),
+        "nodata": [band.GetNoDataValue() for band in bands],
+        "description": src_path,
+    }).encode("utf-8")
+    offset = _data_offset(len(header))
+
+    with open(dst_path, "wb") as f:
+        f.write(MAGIC + struct.pack("<I", len(header)) + header)
+        f.truncate(offset)
+
+    data = np.memmap(dst_path, dtype=dtype.newbyteorder("<"), mode="r+",
+                     offset=offset, shape=shape)
+    for i, band in enumerate(bands):
+        for window in block_windows(band, tile_size):
+            data[i, window.y_offset:window.y_offset + window.y_size,
+                 window.x_offset:window.x_offset + window.x_size] = \
+                band.ReadAsArray(*window)
+    data.flush()
+    del data
+    return dst_path
+
+
+class MemmapBand:
+    """
+    One band of a MemmapDataset (or of any dataset backed by a NumPy
+    array, such as sharedband.SharedDataset); ReadAsArray returns views
+    """
+    def __init__(self, array, nodata):
+        self.array = array
+        self.YSize, self.XSize = array.shape
+        self._nodata = nodata
+
+    def ReadAsArray(self, xoff=0, yoff=0, win_xsize=None, win_ysize=None):
+        if win_xsize is None:
+            win_xsize = self.XSize - xoff
+        if win_ysize is None:
+            win_ysize = self.YSize - yoff
+        return self.array[yoff:yoff + win_ysize, xoff:xoff + win_xsize]
+
+    def GetNoDataValue(self):
+        return self._nodata
+
+    def GetBlockSize(self):
+        # rows are contiguous in the file
+        return [self.XSize, 1]
+
+    def GetOverviewCount(self):
+        return 0
+
+    def GetOverview(self, i):
+        return None
+
+
+class MemmapDataset:
+    """
+    A memmap raster with the GDAL Dataset methods Reader needs
+    """
+    def __init__(self, path):
+        found = _read_header(path)
+        if found is None:
+            raise IOError("%s is not a memmap raster" % path)
+        header, offset = found
+        self.header = header
+        self.array = np.memmap(path, dtype=np.dtype(header["dtype"]), mode="r",
+                               offset=offset, shape=tuple(header["shape"]))
+        self.RasterCount, self.RasterYSize, self.RasterXSize = self.array.shape
+        self._path = path
+        self._bands = [MemmapBand(self.array[i], nodata)
+                       for i, nodata in enumerate(header["nodata"])]
+
+    def GetRasterBand(self, i):
+        return self._bands[i-1]
+
+    def GetGeoTransform(self):
+        return tuple(self.header["geotransform"])
+
+    def GetProjectionRef(self):
+        return self.header["projection"]
+
+    def GetDescription(self):
+        return self._path
+
+
+def open_dataset(path):
+    """
+    a MemmapDataset for memmap rasters, otherwise the GDAL dataset (None
+    if GDAL cannot open the file)
+    """
+    if is_memmap_raster(path):
+        return MemmapDataset(path)
+    return gdal.Open(path, gdal.GA_ReadOnly)
+
+
+if __name__ == "__main__":
+    # python memmapdem.py ../lewisburg_pa/lewisburg_pa.dem lewisburg_pa.mdem
+    if len(sys.argv) != 3:
+        print("Usage: memmapdem.py src_raster dst.mdem")
+        sys.exit(1)
+    convert(sys.argv[1], sys.argv[2])
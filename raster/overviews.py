@@ -0,0 +1,89 @@
+"""
+Overviews (pyramids) of a raster: decimated copies of every band at
+2x, 4x, 8x... coarser resolution, built by GDAL with a selectable
+resampling, so previews and regional cross-sections read a fraction of
+the full resolution cells
+"""
+import sys
+
+try:
+    from osgeo import gdal
+except ImportError:
+    import gdal
+
+
+# resampling methods accepted by GDAL's BuildOverviews; "average" or
+# "cubic" suit elevation, "nearest" or "mode" suit categorical rasters
+RESAMPLING = ("nearest", "average", "gauss", "cubic", "cubicspline",
+              "lanczos", "average_magphase", "mode")
+
+
+def overview_factors(x_size, y_size, min_size=256):
+    """
+    decimation factors 2, 4, 8, ... until the smaller side of the coarsest
+    level is below min_size pixels
+    """
+    factors = []
+    factor = 2
+    while min(x_size, y_size) // (factor // 2) > min_size:
+        factors.append(factor)
+        factor *= 2
+    return factors
+
+
+def build_overviews(path, factors=None, resampling="average",
+                    external=False, min_size=256):
+    """
+    builds overview levels of all bands of the raster at path
+    factors: decimation factors, by default overview_factors()
+    resampling: one of RESAMPLING
+    external: write them to path + ".ovr" instead of into the file (needed
+              for read-only formats such as the USGS .dem)
+    returns the (x_size, y_size) of every overview level of band 1
+    """
+    resampling = resampling.lower()
+    if resampling not in RESAMPLING:
+        raise ValueError("unknown resampling: %r" % (resampling,))
+
+    data_set = gdal.Open(path, gdal.GA_ReadOnly if external else gdal.GA_Update)
+    if data_set is None:
+        raise IOError("could not open %s" % path)
+    if factors is None:
+        factors = overview_factors(data_set.RasterXSize, data_set.RasterYSize,
+                                   min_size)
+    if factors and data_set.BuildOverviews(resampling.upper(),
+                                           list(factors)) != 0:
+        raise IOError("could not build overviews of %s" % path)
+
+    band = data_set.GetRasterBand(1)
+    levels = [(band.GetOverview(i).XSize, band.GetOverview(i).YSize)
+              for i in range(band.GetOverviewCount())]
+    data_set = None
+    return levels
+
+
+def choose_level(pixel_sizes, resolution):
+    """
+    the coarsest level whose pixel size (ground units) does not exceed
+    resolution; pixel_sizes[0] is the full resolution, which is returned
+    when resolution is None or finer than every level
+    """
+    level = 0
+    if resolution is None:
+        return level
+    for i, size in enumerate(pixel_sizes):
+        if size <= resolution and size > pixel_sizes[level]:
+            level = i
+    return level
+
+
+if __name__ == "__main__":
+    # python overviews.py file [resampling [factor ...]]
+    if len(sys.argv) < 2:
+        print("Usage: overviews.py file [resampling [factor ...]]")
+        sys.exit(1)
+    resampling = sys.argv[2] if len(sys.argv) > 2 else "average"
+    factors = [int(f) for f in sys.argv[3:]] or None
+    for x_size, y_size in build_overviews(sys.argv[1], factors, resampling,
+                                          external=True):
+        print("%dx%d" % (x_size, y_size))
@@ -0,0 +1,390 @@
+"""
+Single-pass raster statistics
+
+The bands are read once, block by block, and in that one pass every band
+gets its min, max, mean, standard deviation, nodata count and,
+optionally, a fixed-bin histogram and a t-digest for approximate
+percentiles. GDAL's default histogram range depends on the min and max,
+so the values are counted on a fine grid during the pass and folded
+into the histogram bins once the range is known.
+Statistics of different parts of a band merge exactly (the digest
+approximately), so the blocks can be split over worker processes
+"""
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+try:
+    from osgeo import gdal
+except ImportError:
+    import gdal
+
+try:
+    from raster.tiles import block_windows
+except ImportError:
+    from tiles import block_windows
+
+
+class TDigest:
+    """
+    Mergeable sketch for approximate quantiles (a merging t-digest with
+    the k1 scale function), updated with whole arrays at a time
+    """
+    def __init__(self, compression=100):
+        self.compression = compression
+        self.means = np.empty(0)
+        self.weights = np.empty(0)
+        self.min = np.inf
+        self.max = -np.inf
+
+    def _compress(self, means, weights):
+        order = np.argsort(means, kind="mergesort")
+        means = means[order]
+        weights = weights[order]
+
+        # centroids are grouped by the integer part of k(q), which keeps the
+        # groups small near the tails and large around the median
+        position = (np.cumsum(weights) - weights / 2) / weights.sum()
+        k = self.compression * (np.arcsin(2 * position - 1) / np.pi + 0.5)
+        group = np.floor(k).astype(np.int64)
+        starts = np.flatnonzero(np.r_[True, group[1:] != group[:-1]])
+
+        self.weights = np.add.reduceat(weights, starts)
+        self.means = np.add.reduceat(weights * means, starts) / self.weights
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64).ravel()
+        if len(values) == 0:
+            return
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+        self._compress(np.concatenate([self.means, values]),
+                       np.concatenate([self.weights, np.ones(len(values))]))
+
+    def merge(self, other):
+        if len(other.weights) == 0:
+            return
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress(np.concatenate([self.means, other.means]),
+                       np.concatenate([self.weights, other.weights]))
+
+    def quantile(self, q):
+        """
+        approximate quantile(s) for q in [0, 1]
+        """
+        q = np.asarray(q, dtype=np.float64)
+        if len(self.weights) == 0:
+            return np.full(q.shape, np.nan)
+        total = self.weights.sum()
+        centers = np.cumsum(self.weights) - self.weights / 2
+        return np.interp(q * total, np.r_[0, centers, total],
+                         np.r_[self.min, self.means, self.max])
+
+
+class GridHistogram:
+    """
+    Counts of values on a grid of bins of a power of two width anchored at
+    0; the width doubles whenever the values span more than max_bins bins.
+    The grids of any two of them line up, so they merge exactly. Integer
+    values get bins at least 1 wide and are counted exactly as long as
+    their range fits in max_bins
+    """
+    def __init__(self, max_bins=16384):
+        self.max_bins = max_bins
+        self.step = None
+        self.start = 0      # grid index of counts[0]
+        self.counts = np.zeros(0, dtype=np.int64)
+        self.integer = True
+
+    def _initial_step(self, low, high):
+        span = high - low
+        step = 2.0 ** np.floor(np.log2(span / self.max_bins)) if span > 0 \
+            else 1.0
+        magnitude = max(abs(low), abs(high))
+        if magnitude > 0:
+            # no finer than float64 resolves; keeps the indices in int64
+            step = max(step, 2.0 ** (np.ceil(np.log2(magnitude)) - 52))
+        return max(step, 1.0) if self.integer else step
+
+    def _fit(self, low, high, step):
+        # the smallest step from `step` up that covers the counts and low..high
+        if len(self.counts):
+            low = min(low, self.start * self.step)
+            high = max(high, (self.start + len(self.counts) - 1) * self.step)
+        while np.floor(high / step) - np.floor(low / step) >= self.max_bins:
+            step *= 2
+        return step
+
+    def _coarsen(self, step):
+        factor = int(round(step / self.step))
+        if factor > 1 and len(self.counts):
+            index = np.arange(self.start, self.start + len(self.counts)) \
+                // factor
+            self.counts = np.bincount(index - index[0], weights=self.counts
+                                      ).astype(np.int64)
+            self.start = int(index[0])
+        self.step = step
+
+    def _add(self, start, counts):
+        if len(self.counts) == 0:
+            self.start, self.counts = start, counts
+            return
+        first = min(start, self.start)
+        last = max(start + len(counts), self.start + len(self.counts))
+        total = np.zeros(last - first, dtype=np.int64)
+        total[self.start - first:self.start - first + len(self.counts)] = \
+            self.counts
+        total[start - first:start - first + len(counts)] += counts
+        self.start, self.counts = first, total
+
+    def update(self, values, integer=False):
+        """
+        adds an array of finite float64 values
+        integer: the values come from an integer band
+        """
+        if len(values) == 0:
+            return
+        self.integer &= integer
+        low, high = values.min(), values.max()
+        if self.step is None:
+            self.step = self._initial_step(low, high)
+        self._coarsen(self._fit(low, high, self.step))
+        index = np.floor(values / self.step).astype(np.int64)
+        start = int(index.min())
+        self._add(start, np.bincount(index - start))
+
+    def merge(self, other):
+        if other.step is None:
+            return
+        self.integer &= other.integer
+        if self.step is None:
+            self.step = other.step
+        copy = GridHistogram(other.max_bins)
+        copy.step, copy.start, copy.counts = other.step, other.start, \
+            other.counts
+        step = self._fit(other.start * other.step,
+                         (other.start + len(other.counts) - 1) * other.step,
+                         max(self.step, other.step))
+        self._coarsen(step)
+        copy._coarsen(step)
+        self._add(copy.start, copy.counts)
+
+    def fold(self, hist_min, hist_max, buckets):
+        """
+        the counts in `buckets` equal bins from hist_min to hist_max, every
+        grid bin counted at the mean of the values it can hold
+        """
+        index = np.arange(self.start, self.start + len(self.counts))
+        centers = index * self.step + \
+            ((self.step - 1) / 2. if self.integer else self.step / 2.)
+        bucket = np.floor((centers - hist_min) * buckets
+                          / float(hist_max - hist_min)).astype(np.int64)
+        np.clip(bucket, 0, buckets - 1, out=bucket)
+        return np.bincount(bucket, weights=self.counts, minlength=buckets
+                           ).astype(np.int64)
+
+
+class RasterStatistics:
+    """
+    Statistics of one band, accumulated block by block. The histogram has
+    `buckets` equal bins from hist_min to hist_max; values outside the
+    range are counted in the first or last bin. Without a range (None)
+    there is no histogram, unless default_range is set: then the range is
+    GDAL's default for the min and max found in the same pass (see
+    histogram_range) and the histogram is folded from a GridHistogram of
+    1024 fine bins per bucket: integers whose range fits are binned
+    exactly, other values can land in the bucket next to theirs only
+    when they are within a fine bin of its edge
+    """
+    def __init__(self, hist_min, hist_max, buckets=256, compression=None,
+                 default_range=False):
+        self.count = 0
+        self.nodata_count = 0
+        self.min = np.inf
+        self.max = -np.inf
+        self.mean = 0.0
+        self._m2 = 0.0      # sum of squared deviations from the mean
+        self.buckets = buckets
+        self._range = (hist_min, hist_max)
+        self._histogram = np.zeros(buckets, dtype=np.int64) \
+            if hist_min is not None else None
+        self._grid = GridHistogram(1024 * buckets) \
+            if default_range and hist_min is None else None
+        self.digest = TDigest(compression) if compression else None
+
+    @property
+    def hist_min(self):
+        return self._hist_range()[0]
+
+    @property
+    def hist_max(self):
+        return self._hist_range()[1]
+
+    def _hist_range(self):
+        if self._grid is None:
+            return self._range
+        if self.count == 0:
+            return None, None
+        return histogram_range(self.min, self.max, self.buckets)
+
+    @property
+    def histogram(self):
+        if self._grid is None:
+            return self._histogram
+        if self.count == 0:
+            return np.zeros(self.buckets, dtype=np.int64)
+        return self._grid.fold(self.hist_min, self.hist_max, self.buckets)
+
+    @property
+    def stddev(self):
+        # population standard deviation, as GDAL reports it
+        return np.sqrt(self._m2 / self.count) if self.count else np.nan
+
+    def _combine(self, count, mean, m2):
+        # Chan et al. pairwise update of the mean and the squared deviations
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self._m2 += m2 + delta * delta * self.count * count / total
+        self.count = total
+
+    def update(self, values, nodata=None):
+        """
+        adds one block of pixel values
+        """
+        values = np.asarray(values).ravel()
+        integer = values.dtype.kind in "biu"
+        valid = ~np.isnan(values) if values.dtype.kind == "f" \
+            else np.ones(values.shape, dtype=bool)
+        if nodata is not None:
+            valid &= values != nodata
+        values = values[valid].astype(np.float64)
+        self.nodata_count += len(valid) - len(values)
+        if len(values) == 0:
+            return
+
+        mean = values.mean()
+        deviation = values - mean
+        self._combine(len(values), mean, np.dot(deviation, deviation))
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+
+        if self._histogram is not None:
+            hist_min, hist_max = self._range
+            scale = self.buckets / float(hist_max - hist_min)
+            index = np.floor((values - hist_min) * scale).astype(np.int64)
+            np.clip(index, 0, self.buckets - 1, out=index)
+            self._histogram += np.bincount(index, minlength=self.buckets)
+
+        if self._grid is not None:
+            self._grid.update(values[np.isfinite(values)], integer)
+
+        if self.digest is not None:
+            self.digest.update(values)
+
+    def merge(self, other):
+        """
+        adds the statistics of another part of the same band
+        """
+        bins = lambda stats: (stats._range, stats.buckets,
+                              stats._grid is None)
+        if bins(self) != bins(other):
+            raise ValueError("cannot merge histograms with different bins")
+        self.nodata_count += other.nodata_count
+        if self._histogram is not None:
+            self._histogram += other._histogram
+        if self._grid is not None:
+            self._grid.merge(other._grid)
+        if other.count:
+            self._combine(other.count, other.mean, other._m2)
+            self.min = min(self.min, other.min)
+            self.max = max(self.max, other.max)
+        if self.digest is not None and other.digest is not None:
+            self.digest.merge(other.digest)
+
+    def percentiles(self, percents):
+        """
+        approximate percentiles (0-100), needs a compression
+        """
+        if self.digest is None:
+            raise ValueError("percentiles need a t-digest compression")
+        return self.digest.quantile(np.asarray(percents) / 100.)
+
+
+def histogram_range(dfMin, dfMax, buckets=256):
+    """
+    the default histogram range of values from dfMin to dfMax, the same as
+    GDAL's GetDefaultHistogram (except for bytes, always -0.5..255.5): the
+    min/max widened by half a bucket
+    """
+    if dfMax == dfMin:
+        return dfMin - 0.5, dfMax + 0.5
+    half_bucket = (dfMax - dfMin) / (2. * (buckets - 1))
+    return dfMin - half_bucket, dfMax + half_bucket
+
+
+def _statistics_of_windows(path, bands, windows, ranges, buckets, compression):
+    data_set = gdal.Open(path, gdal.GA_ReadOnly)
+    # a range of None is the default range, found in this pass
+    results = [RasterStatistics(*(hist_range or (None, None)),
+                                buckets=buckets, compression=compression,
+                                default_range=hist_range is None)
+               for hist_range in ranges]
+    hBands = [data_set.GetRasterBand(i) for i in bands]
+    nodata = [hBand.GetNoDataValue() for hBand in hBands]
+
+    for window in windows:
+        for stats, hBand, value in zip(results, hBands, nodata):
+            stats.update(hBand.ReadAsArray(*window), value)
+    return results
+
+
+def compute_statistics(path, bands=None, buckets=256, hist_range=None,
+                       compression=None, tile_size=512, workers=1,
+                       histogram=False):
+    """
+    statistics of the bands (1-based numbers, all by default) of the
+    raster at path, reading every block once
+    histogram: also compute histograms of `buckets` bins
+    hist_range: (min, max) of the histogram (implies histogram), by
+                default GDAL's default range per band, taken from the
+                min and max of the same pass
+    compression: t-digest compression (e.g. 100) to get percentiles
+    workers: processes; each reads its own share of the blocks and the
+             partial statistics are merged in block order
+    returns a list with one RasterStatistics per band
+    """
+    data_set = gdal.Open(path, gdal.GA_ReadOnly)
+    if data_set is None:
+        raise IOError("could not open %s" % path)
+    if bands is None:
+        bands = list(range(1, data_set.RasterCount + 1))
+    hBands = [data_set.GetRasterBand(i) for i in bands]
+    if hist_range is not None:
+        ranges = [hist_range] * len(hBands)
+    elif histogram:
+        ranges = [(-0.5, 255.5) if hBand.DataType == gdal.GDT_Byte else None
+                  for hBand in hBands]
+    else:
+        ranges = [(None, None)] * len(hBands)
+    windows = list(block_windows(hBands[0], tile_size))
+    data_set = None
+
+    if workers is None or workers <= 1:
+        return _statistics_of_windows(path, bands, windows, ranges, buckets,
+                                      compression)
+
+    share = -(-len(windows) // workers)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_statistics_of_windows, path, bands,
+                                   windows[i:i+share], ranges, buckets,
+                                   compression)
+                   for i in range(0, len(windows), share)]
+        parts = [future.result() for future in futures]
+
+    results = parts[0]
+    for part in parts[1:]:
+        for stats, other in zip(results, part):
+            stats.merge(other)
+    return results
@@ -2,19 +2,23 @@
 import os, sys, time, gdal
 from gdalconst import *
 
-# coordinates to get pixel values for
-# UTM, zone 18
+import numpy as np
+
+try:
+    from raster.transform import from_latlon
+except ImportError:
+    from transform import from_latlon
+
+# coordinates to get pixel values for, WGS84
 
 # Breakiron:
 # lat: 40.954824, long: -76.881087
-# easting: 341685.7, northing: 4535445.9
 
 # the boat launch
 # lat: 40.955312, long: -76.877387
-# easting: 341998.2, northing: 4535493.4
 
-x_values = [341685.7, 341998.2]
-y_values = [4535445.9, 4535493.4]
+lat_values = [40.954824, 40.955312]
+lon_values = [-76.881087, -76.877387]
 
 startTime = time.time()
 
@@ -44,29 +48,30 @@ print("x origin, y origin: " + str(x_origin) + " " + str(y_origin))
 pixelWidth = transform[1]
 pixelHeight = transform[5]
 
-x_offset_list = []
-y_offset_list = []
+# to the coordinate system of the image (UTM, zone 18), all points at once
+x_values, y_values = from_latlon(lat_values, lon_values, ds.GetProjectionRef())
+
+# offsets for all the points at once
+x_offsets = ((np.array(x_values) - x_origin) / pixelWidth).astype(int)
+y_offsets = ((np.array(y_values) - y_origin) / pixelHeight).astype(int)
+print("xoffsets, yoffsets: ", x_offsets, y_offsets)
+
+# read the window covering all the points once per band,
+# then pick the points out of it
+x0, y0 = x_offsets.min(), y_offsets.min()
+values = []
+for j in range(n_band):
+    band = ds.GetRasterBand(j+1) # 1-based index
+    data = band.ReadAsArray(int(x0), int(y0),
+                            int(x_offsets.max() - x0 + 1),
+                            int(y_offsets.max() - y0 + 1))
+    values.append(data[y_offsets - y0, x_offsets - x0])
 
 for i in range(len(x_values)):
-    x = x_values[i]
-    y = y_values[i]
-
-    xOffset = int((x - x_origin) / pixelWidth)
-    x_offset_list.add(xOffset)
-    yOffset = int((y - y_origin) / pixelHeight)
-    y_offset_list.add(yOffset)
-
-    print( "xoffset, yoffset: ",xOffset, yOffset)
-
-
-    s = "target UTM coordinate: " + str(x) + ' ' + str(y) + '; \n'
-    s += "offset: " + str(xOffset) + ' ' + str(yOffset) + '; \n'
+    s = "target UTM coordinate: " + str(x_values[i]) + ' ' + str(y_values[i]) + '; \n'
+    s += "offset: " + str(x_offsets[i]) + ' ' + str(y_offsets[i]) + '; \n'
     for j in range(n_band):
-        band = ds.GetRasterBand(j+1) # 1-based index
-        # read data and add the value to the string
-        data = band.ReadAsArray(xOffset, yOffset, 1, 1)
-        value = data[0,0]
-        s += str(value)
+        s += str(values[j][i])
 
     print(s)
 
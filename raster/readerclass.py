@@ -9,6 +9,23 @@ from shapely.wkb import loads
 import numpy as np
 import matplotlib.pyplot as plt
 
+try:
+    from raster.bandcache import BandCache, BlockCache, CacheInfo
+    from raster.transect import Transect, sample_positions
+    from raster.lineofsight import clearance
+    from raster.overviews import choose_level
+    from raster.memmapdem import open_dataset
+    from raster.interpolation import METHODS, OFFSETS, interpolate
+    from raster.transform import from_latlon
+except ImportError:
+    from bandcache import BandCache, BlockCache, CacheInfo
+    from transect import Transect, sample_positions
+    from lineofsight import clearance
+    from overviews import choose_level
+    from memmapdem import open_dataset
+    from interpolation import METHODS, OFFSETS, interpolate
+    from transform import from_latlon
+
 # see http://www.gis.usu.edu/~chrisg/python/2009/lectures/ospy_slides4.pdf
 
 
@@ -16,15 +33,25 @@ class Reader:
     """
     Loads raster data point one at a time
     """
-    def __init__(self,file_name):
+    def __init__(self, file_name, cache=None, cache_blocks=256, data_set=None):
         """
-        initializes the data_set member
+        initializes the data_set member; memmap rasters (memmapdem.py)
+        are opened without GDAL, anything else with gdal.Open
+        data_set: an already open dataset to use instead of opening
+                  file_name, see from_dataset
+        cache: None reads every point through GDAL,
+               "band" loads each band into memory on first use,
+               "block" keeps the `cache_blocks` most recently used
+               GDAL blocks of each band in memory;
+               overview levels get caches of their own
         """
         # register all of the drivers
         gdal.AllRegister()
 
         # open image
-        self.data_set = gdal.Open(file_name, GA_ReadOnly)
+        self.file_name = file_name
+        self.data_set = data_set if data_set is not None \
+            else open_dataset(file_name)
         if self.data_set is None:
             print("Could not open file")
             exit(1)
@@ -57,11 +84,26 @@ class Reader:
         self.x_list = []            # x-coordinates along the cross-section of choice
         self.y_list = []            # y-coordinates along the cross-section of choice
         self.elevation_list = []    # the elevation at point (x,y), unit: m
+        self.transect = None        # the Transect sampled by get_line_feature
+        self.line_ends = None       # its (x1, y1, x2, y2) in map units
+        self.line_method = "nearest"    # and its sampling method
         self.k1 = 0                 # slop of transect in x-y plane
         self.b1 = 0                 # y-axis intersection
         self.n_step=0
+        self._levels = []           # (cols, rows, pixelWidth, pixelHeight) of
+                                    # the full resolution and each overview
+        self._caches = {}           # BandCache/BlockCache per (band, level)
 
         self._define_boundaries()   # initialize boundary variables
+        self._init_caches(cache, cache_blocks)
+
+    @classmethod
+    def from_dataset(cls, data_set, cache=None, cache_blocks=256):
+        """
+        a Reader on an open dataset: a GDAL dataset, a MemmapDataset or a
+        sharedband.SharedDataset attached in a worker process
+        """
+        return cls(data_set.GetDescription(), cache, cache_blocks, data_set)
 
     def __str__(self):
         """
@@ -76,6 +118,13 @@ class Reader:
             else:
                 return pszProjection
 
+    def from_latlon(self, lats, lons):
+        """
+        WGS84 latitudes and longitudes (arrays or scalars) to (xs, ys) in
+        the coordinate system of the raster, see transform.py
+        """
+        return from_latlon(lats, lons, self.data_set.GetProjectionRef())
+
     def _define_boundaries(self):
         """
         Defines the boundary of the raster files
@@ -94,8 +143,87 @@ class Reader:
         self._pixelWidth = geo_transform[1]
         self._pixelHeight = geo_transform[5]
 
+        self._nodata = [self.data_set.GetRasterBand(i+1).GetNoDataValue()
+                        for i in range(self._bands)]
+
+        # level 0 is the full resolution, level i the overview i-1 of the
+        # bands; an overview covers the same extent with bigger pixels
+        self._levels = [(self._cols, self._rows,
+                         self._pixelWidth, self._pixelHeight)]
+        band = self.data_set.GetRasterBand(1)
+        for i in range(band.GetOverviewCount()):
+            overview = band.GetOverview(i)
+            self._levels.append((overview.XSize, overview.YSize,
+                                 self._pixelWidth * self._cols / float(overview.XSize),
+                                 self._pixelHeight * self._rows / float(overview.YSize)))
+
+    def _init_caches(self, cache, cache_blocks):
+        """
+        checks the cache mode; the caches themselves are created by
+        _cache on first use of a band and level
+        """
+        if cache not in (None, "band", "block"):
+            raise ValueError("unknown cache mode: %r" % (cache,))
+        self._cache_mode = cache
+        self._cache_blocks = cache_blocks
+
+    def _band(self, band_index, level=0):
+        """
+        the GDAL band (0-based) at an overview level (0: full resolution)
+        """
+        band = self.data_set.GetRasterBand(band_index+1)
+        return band if level == 0 else band.GetOverview(level - 1)
+
+    def _cache(self, band_index, level=0):
+        """
+        the cache of a band (0-based) at an overview level, or None when
+        the reader does not cache
+        """
+        if self._cache_mode is None:
+            return None
+        key = (band_index, level)
+        if key not in self._caches:
+            band = self._band(band_index, level)
+            if self._cache_mode == "band":
+                self._caches[key] = BandCache(band)
+            else:
+                self._caches[key] = BlockCache(band, self._cache_blocks)
+        return self._caches[key]
+
+    def overview_level(self, resolution=None):
+        """
+        the coarsest overview level whose pixels are no larger than
+        `resolution` map units; 0 (full resolution) for None
+        """
+        return choose_level([max(abs(width), abs(height))
+                             for cols, rows, width, height in self._levels],
+                            resolution)
+
+    def pixel_size(self, level=0):
+        """
+        the (width, height) of the pixels of an overview level
+        """
+        return self._levels[level][2:]
+
+    def cache_info(self):
+        """
+        returns the hit/miss counts of the looked-up points (a miss is a
+        point that needed a read), the number of cached blocks and the
+        memory they take, summed over all bands
+        """
+        infos = [cache.info() for cache in self._caches.values()]
+        return CacheInfo(*(sum(field) for field in zip(*infos))) \
+            if infos else CacheInfo(0, 0, 0, 0)
+
     def close(self):
+        for cache in self._caches.values():
+            cache.clear()
+        self._caches = {}
+        # shared memory datasets unmap their block
+        close = getattr(self.data_set, "close", None)
         self.data_set = None
+        if close is not None:
+            close()
 
     def get_x_offset(self, x):
         """
@@ -109,77 +237,311 @@ class Reader:
         """
         return int((y - self._originY) / self._pixelHeight)
 
-    def get_pixel_value(self, x, y):
+    def get_x_offsets(self, xs, level=0):
         """
-        x: easting
-        y: northing
-        the pixel value is -32768? for data points
-        outside the raster image
+        gets the pixel indices on x-axis for an array of eastings;
+        unlike get_x_offset this floors, so points left of the origin
+        get a negative index
+        level: overview level the indices refer to
         """
+        offsets = (np.asarray(xs, dtype=np.float64) - self._originX) \
+            / self._levels[level][2]
+        return np.floor(offsets).astype(np.int64)
 
-        x_offset = self.get_x_offset(x)
-        y_offset = self.get_y_offset(y)
+    def get_y_offsets(self, ys, level=0):
+        """
+        gets the pixel indices on y-axis for an array of northings
+        """
+        offsets = (np.asarray(ys, dtype=np.float64) - self._originY) \
+            / self._levels[level][3]
+        return np.floor(offsets).astype(np.int64)
 
-        for i in range(self._bands):
-            band = self.data_set.GetRasterBand(i+1)
+    # largest window _take reads at once without a cache; points spread
+    # over more than this are read block by block
+    max_window_pixels = 2**22
+
+    def _take(self, band_index, rows, cols, level=0):
+        """
+        gathers the values of one band (0-based) at in-extent pixel indices
+        of an overview level, from the cache if there is one, otherwise
+        with a single ReadAsArray of the window that covers all the points,
+        or, when that window is larger than max_window_pixels, with one
+        read of every GDAL block that holds a point
+        """
+        cache = self._cache(band_index, level)
+        if cache is not None:
+            return cache.take(rows, cols)
+
+        band = self._band(band_index, level)
+        if rows.size == 0:
+            return band.ReadAsArray(0, 0, 1, 1)[:0, 0]
+        x0 = int(cols.min())
+        y0 = int(rows.min())
+        x_size = int(cols.max()) - x0 + 1
+        y_size = int(rows.max()) - y0 + 1
+        if x_size * y_size > self.max_window_pixels:
+            # grouped by block, one block in memory at a time
+            return BlockCache(band, 1).take(rows, cols)
+        window = band.ReadAsArray(x0, y0, x_size, y_size)
+        return window[rows - y0, cols - x0]
+
+    def read_band(self, band=1, resolution=None):
+        """
+        the whole band (1-based) as a masked 2-D array (rows, cols),
+        nodata pixels are masked; served from the band cache if enabled
+        resolution: read the coarsest overview with pixels no larger than
+                    this many map units instead of the full resolution
+        """
+        level = self.overview_level(resolution)
+        cache = self._cache(band - 1, level)
+        if isinstance(cache, BandCache):
+            values = cache.array
+        else:
+            values = self._band(band - 1, level).ReadAsArray()
+        return np.ma.MaskedArray(values, mask=self._nodata_mask(band - 1, values))
+
+    def _nodata_mask(self, band_index, values):
+        """
+        True where values equal the nodata value of the band (0-based)
+        """
+        nodata = self._nodata[band_index]
+        if nodata is None:
+            return np.zeros(np.shape(values), dtype=bool)
+        if nodata != nodata:
+            return np.isnan(values)
+        return values == nodata
+
+    def _gather(self, xs, ys, band_indices, level=0):
+        """
+        values of the given bands (0-based) at eastings xs and northings ys,
+        as a masked array of shape (len(band_indices),) + xs.shape
+        level: overview level to read
+        """
+        xs, ys = np.broadcast_arrays(np.asarray(xs, dtype=np.float64),
+                                     np.asarray(ys, dtype=np.float64))
+        cols = self.get_x_offsets(xs, level)
+        rows = self.get_y_offsets(ys, level)
+        n_cols, n_rows = self._levels[level][:2]
+        inside = (cols >= 0) & (cols < n_cols) \
+            & (rows >= 0) & (rows < n_rows)
+
+        values = None
+        mask = np.empty((len(band_indices),) + xs.shape, dtype=bool)
+        for n, i in enumerate(band_indices):
+            band_values = self._take(i, rows[inside], cols[inside], level)
+            if values is None:
+                values = np.zeros(mask.shape, dtype=band_values.dtype)
+            values[n][inside] = band_values
+            mask[n] = ~inside
+            mask[n] |= self._nodata_mask(i, values[n])
+
+        return np.ma.MaskedArray(values, mask=mask)
+
+    def _interpolate(self, xs, ys, band_indices, level=0, method="bilinear"):
+        """
+        like _gather, but interpolated between the pixel centres around
+        each point (see interpolation.py), as float64; only the pixels of
+        those neighbourhoods are read. Neighbours past the raster edge
+        repeat the edge pixels, so every point inside the extent has a
+        value unless nodata pixels get in the way
+        """
+        xs, ys = np.broadcast_arrays(np.asarray(xs, dtype=np.float64),
+                                     np.asarray(ys, dtype=np.float64))
+        n_cols, n_rows, width, height = self._levels[level]
+        fx = (xs - self._originX) / width
+        fy = (ys - self._originY) / height
+        inside = (fx >= 0) & (fx < n_cols) & (fy >= 0) & (fy < n_rows)
+
+        # positions relative to the pixel centres
+        px = fx[inside] - 0.5
+        py = fy[inside] - 0.5
+        x0 = np.floor(px)
+        y0 = np.floor(py)
+        offsets = OFFSETS[method]
+        cols = np.clip(x0.astype(np.int64)[:, None] + offsets, 0, n_cols - 1)
+        rows = np.clip(y0.astype(np.int64)[:, None] + offsets, 0, n_rows - 1)
+        shape = (len(px), len(offsets), len(offsets))
+        rows = np.broadcast_to(rows[:, :, None], shape).ravel()
+        cols = np.broadcast_to(cols[:, None, :], shape).ravel()
+
+        values = np.zeros((len(band_indices),) + xs.shape)
+        mask = np.empty(values.shape, dtype=bool)
+        for n, i in enumerate(band_indices):
+            neighbours = self._take(i, rows, cols, level).reshape(shape)
+            result, valid = interpolate(neighbours.astype(np.float64),
+                                        self._nodata_mask(i, neighbours),
+                                        px - x0, py - y0, method)
+            values[n][inside] = result
+            mask[n] = ~inside
+            mask[n][inside] = ~valid
+
+        return np.ma.MaskedArray(values, mask=mask)
+
+    def _sample(self, xs, ys, band_indices, level=0, method="nearest"):
+        """
+        _gather for method "nearest", otherwise _interpolate
+        """
+        if method not in METHODS:
+            raise ValueError("unknown sampling method: %r" % (method,))
+        if method == "nearest":
+            return self._gather(xs, ys, band_indices, level)
+        return self._interpolate(xs, ys, band_indices, level, method)
+
+    def get_pixel_values(self, xs, ys, resolution=None, method="nearest",
+                         latlon=False):
+        """
+        xs: eastings
+        ys: northings
+        latlon: xs and ys are WGS84 latitudes and longitudes instead
+        resolution: read from the coarsest overview with pixels no larger
+                    than this many map units (default: full resolution)
+        method: "nearest" (the value of the pixel under the point),
+                "bilinear" or "bicubic" (interpolated, float64)
+        batch version of get_pixel_value; returns a masked array of shape
+        (bands,) + xs.shape with all bands. Points outside the raster image
+        and nodata pixels are masked
+        """
+        if latlon:
+            xs, ys = self.from_latlon(xs, ys)
+        return self._sample(xs, ys, range(self._bands),
+                            self.overview_level(resolution), method)
+
+    def get_pixel_value(self, x, y, method="nearest", latlon=False):
+        """
+        x: easting
+        y: northing
+        method: see get_pixel_values
+        latlon: x and y are a WGS84 latitude and longitude instead
+        returns the value of the first band, None for data points outside
+        the raster image and on nodata pixels
+        """
+        if latlon:
+            xs, ys = self.from_latlon([x], [y])
+            x, y = xs[0], ys[0]
+        if method != "nearest":
+            value = self._sample([x], [y], [0], 0, method)[0, 0]
+            return None if value is np.ma.masked else float(value)
+
+        # floored like get_pixel_values: int() would map points up to a
+        # pixel west or north of the origin to index 0
+        x_offset = int(self.get_x_offsets(x))
+        y_offset = int(self.get_y_offsets(y))
+        if not (0 <= x_offset < self._cols and 0 <= y_offset < self._rows):
+            return None
+
+        cache = self._cache(0)
+        if cache is not None:
+            value = cache.value(x_offset, y_offset)
+        else:
+            band = self.data_set.GetRasterBand(1)
             # dataArray: one data point at a time
             data_array = band.ReadAsArray(x_offset, y_offset, 1, 1)
             value = data_array[0, 0]
-            return value
+        return None if self._nodata_mask(0, value) else value
 
-    def get_line_feature(self, x1, y1, x2, y2):
+    def sample_transect(self, x1, y1, x2, y2, spacing=None, band=1,
+                        resolution=None, method="nearest", latlon=False):
+        """
+        four parameters are in UTM, or latitude, longitude, latitude,
+        longitude (WGS84) with latlon
+        samples the transect from (x1, y1) to (x2, y2) every `spacing`
+        map units (default: the smaller pixel dimension) and reads all the
+        samples of `band` in one vectorized pass
+        resolution: sample the coarsest overview with pixels no larger than
+                    this many map units; the default spacing is then the
+                    overview pixel size
+        method: "nearest", "bilinear" or "bicubic", see get_pixel_values
+        returns a Transect of arrays (distance, x, y, z)
+        """
+        if latlon:
+            (x1, x2), (y1, y2) = self.from_latlon([x1, x2], [y1, y2])
+        level = self.overview_level(resolution)
+        if spacing is None:
+            width, height = self.pixel_size(level)
+            spacing = min(abs(width), abs(height))
+        distance, x, y = sample_positions(x1, y1, x2, y2, spacing)
+        z = self._sample(x, y, [band - 1], level, method)[0]
+        return Transect(distance, x, y, z)
+
+    def get_line_feature(self, x1, y1, x2, y2, resolution=None,
+                         method="nearest", latlon=False):
         """
         four parameters are in UTM
         x1, x2: easting
         y1, y2: northing
         (x1, y1): coordinate for the transmitter
         (x2, y2): coordinate for the receiver
-        samples the transect with interval = pixel width and
-        generates the elevation list
+        resolution: ground resolution in map units; coarser values read an
+                    overview instead of every cell (see sample_transect)
+        method: "bilinear" or "bicubic" interpolate the elevations between
+                pixel centres instead of stepping from cell to cell
+        latlon: the end points are given as WGS84 (latitude, longitude)
+        samples the transect with interval = pixel width, keeps the arrays
+        in x_list, y_list and elevation_list and returns the Transect
         """
-        self.k1 = (y2 - y1) / (x2 - x1)
-        self.b1 = y1 - self.k1 * x1
-        self.n_step = (x2 - x1) // self._pixelWidth
-
-        for i in range(int(self.n_step)):
-            x = x1 + i * self._pixelWidth
-            y = self.k1 * x + self.b1
-            self.x_list.append(x)
-            self.y_list.append(y)
-            value = self.get_pixel_value(x, y)
-            self.elevation_list.append(value)
-
-
-
-    def get_hindrance(self):
+        if latlon:
+            (x1, x2), (y1, y2) = self.from_latlon([x1, x2], [y1, y2])
+        self.transect = self.sample_transect(x1, y1, x2, y2,
+                                             resolution=resolution,
+                                             method=method)
+        self.line_ends = (x1, y1, x2, y2)
+        self.line_method = method
+        self.x_list = self.transect.x
+        self.y_list = self.transect.y
+        self.elevation_list = self.transect.z
+        self.n_step = len(self.transect.x)
+
+        if x2 != x1:
+            self.k1 = (y2 - y1) / (x2 - x1)
+            self.b1 = y1 - self.k1 * x1
+        else:
+            # vertical transect: no slope in the x-y plane
+            self.k1 = float("inf")
+            self.b1 = float("nan")
+        return self.transect
+
+    def get_hindrance(self, height1=0.0, height2=0.0, k_factor=None):
         """
-        this method might be broken
+        height1, height2: antenna heights above the ground at the
+        transmitter and the receiver of the last get_line_feature transect
+        returns (x, elevation) of the first point where the terrain rises
+        above the ray between the two antennas, or None for a clear line
+        of sight; see lineofsight.line_of_sight for many pairs at once
+        raises ValueError before any get_line_feature, and when an end
+        point is outside the raster or on nodata (line_of_sight reports
+        such a pair as not visible)
         """
-        hindrance_list = []
-        sensor_elev = self.elevation_list[0]
-        recv_elev = self.elevation_list[-1]
-        delta_elev = sensor_elev - recv_elev
-        x_square = (self.x_list[0] - self.x_list[-1]) ** 2
-        y_square = (self.y_list[0] - self.y_list[-1]) ** 2
-        distance = (x_square + y_square) ** 0.5
-
-        k = (delta_elev) / (distance)
-        b = self.elevation_list[0] - k * self.x_list[0]
-
-        for i in range(len(self.elevation_list)):
-            supposed_elev = self.x_list[i] * self.k1  + self.b1
-            if self.elevation_list[i] >= supposed_elev:
-                return (self.x_list[i], self.elevation_list[i])
-
-    def plot_results(self):
+        t = self.transect
+        if t is None:
+            raise ValueError("no transect: call get_line_feature first")
+        last = len(t.distance) - 1
+        ends = np.ma.getmaskarray(t.z)[[0, last]]
+        if ends.any():
+            raise ValueError("the %s is outside the raster or on nodata"
+                             % ("transmitter" if ends[0] else "receiver"))
+        profile = clearance(t.distance[None, :], t.z[None, :], [last],
+                            height1, height2, k_factor)[0]
+        blocked = np.flatnonzero(profile.filled(np.inf) < 0)
+        if len(blocked) == 0:
+            return None
+        i = blocked[0]
+        return (self.x_list[i], self.elevation_list[i])
+
+    def plot_results(self, resolution=None):
         """
-        this method is broken?
+        plots the last transect; with a resolution the transect between
+        the same end points is resampled from the matching overview first,
+        with the method it was sampled with
         """
+        if resolution is not None:
+            x1, y1, x2, y2 = self.line_ends
+            self.get_line_feature(x1, y1, x2, y2, resolution,
+                                  method=self.line_method)
         fig = plt.figure()
         fig.suptitle('Cross section', fontsize=14, fontweight='bold')
         ax = fig.add_subplot(111)
-        ax.plot(self.x_list, self.elevation_list)
-        ax.set_xlabel('easting')
+        ax.plot(self.transect.distance, self.transect.z)
+        ax.set_xlabel('distance (m)')
         ax.set_ylabel('elevation (m)')
 
         plt.show()
@@ -188,26 +550,17 @@ class Reader:
 
 
 if __name__ == "__main__":
-    # some convenient coordinates:
-    # Breakiron:
-    # lat: 40.954824, long: -76.881087
-    # easting: 341685.7, northing: 4535445.9
-
-    # the boat launch
-    # lat: 40.955312, long: -76.877387
-    # easting: 341998.2, northing: 4535493.4
-
-
-    # north size of winfield
-    # 342279.95, 4532332.21
+    # some convenient coordinates (WGS84 lat, long):
+    # Breakiron: 40.954824, -76.881087
+    # the boat launch: 40.955312, -76.877387
+    # north side of winfield: 40.926905, -76.873237
     t_start = time.time()
     reader = Reader("../lewisburg_pa/lewisburg_pa.dem")
 
-    # print(reader.get_pixel_value(341674.7, 4535455.3))
-    reader.get_line_feature(338977.89, 4536688.13, 339514.93, 4534804.52)
+    # print(reader.get_pixel_value(40.954824, -76.881087, latlon=True))
+    reader.get_line_feature(40.965479, -76.913567, 40.948626, -76.906700,
+                            latlon=True)
     reader.plot_results()
     reader.close()
     t_end = time.time()
     print("Time: " + str(t_end - t_start))
-
-    # add converter: distance -> easting and northing
@@ -0,0 +1,179 @@
+"""
+Persistent cache of gdalinfo reports (with their statistics, histograms and
+checksums), so repeated inventories only recompute files that changed
+
+Entries live in an SQLite file and are keyed by the dataset path and the
+report options. A dataset is unchanged while the size and modification
+time of all its files match: the file itself and the other files GDAL
+listed for it when the report was made (.aux.xml, .ovr, world files,
+the modules of multi-file formats). A sidecar created after the report
+was cached is not in that list, so refresh the entry after adding one.
+With content_hash=True a dataset whose sizes/mtimes changed is hashed and
+its entry is still reused if the content is the same. The cache is
+capped in bytes and evicts the least recently used entries
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+
+# options that only change how a report is computed, not its content
+EXECUTION_OPTIONS = ("nStatsWorkers", "nChecksumWorkers")
+
+
+class ReportCache:
+    """
+    SQLite-backed report cache; safe to share between processes. Use it
+    in a with statement, or call close(), to release the connection
+    """
+    def __init__(self, db_path, max_bytes=256 * 2**20, content_hash=False):
+        self.max_bytes = max_bytes
+        self.content_hash = content_hash
+        self._db = sqlite3.connect(db_path, timeout=60)
+        columns = [row[1] for row in
+                   self._db.execute("PRAGMA table_info(reports)")]
+        if columns and "files" not in columns:
+            # written before sidecars were fingerprinted
+            self._db.execute("DROP TABLE reports")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS reports ("
+            " path TEXT, options TEXT, files TEXT,"
+            " digest TEXT, report TEXT, nbytes INTEGER, last_used REAL,"
+            " PRIMARY KEY (path, options))")
+        self._db.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @staticmethod
+    def options_key(options):
+        """
+        the options as stored in the cache, without EXECUTION_OPTIONS
+        """
+        return json.dumps(dict((name, value) for name, value in options.items()
+                               if name not in EXECUTION_OPTIONS),
+                          sort_keys=True)
+
+    @staticmethod
+    def fingerprint(paths):
+        """
+        [path, size, mtime_ns] of every file, size and mtime None for a
+        file that does not exist
+        """
+        files = []
+        for path in paths:
+            try:
+                stat = os.stat(path)
+                files.append([path, stat.st_size, stat.st_mtime_ns])
+            except OSError:
+                files.append([path, None, None])
+        return files
+
+    @staticmethod
+    def digest(paths):
+        """
+        sha1 of the contents of the files, in order
+        """
+        sha1 = hashlib.sha1()
+        for path in paths:
+            file_sha1 = hashlib.sha1()
+            try:
+                with open(path, "rb") as f:
+                    for chunk in iter(lambda: f.read(2**20), b""):
+                        file_sha1.update(chunk)
+            except IOError:
+                file_sha1 = hashlib.sha1(b"missing")
+            sha1.update(file_sha1.digest())
+        return sha1.hexdigest()
+
+    @staticmethod
+    def dataset_files(path, report):
+        """
+        path followed by the other files GDAL lists for the dataset
+        """
+        path = os.path.abspath(path)
+        others = [os.path.abspath(name) for name in report.get("files") or []]
+        return [path] + [name for name in others if name != path]
+
+    def get(self, path, options):
+        """
+        the cached report of path for these options, or None if there is
+        no entry or the dataset changed since it was stored
+        """
+        path = os.path.abspath(path)
+        key = self.options_key(options)
+        row = self._db.execute(
+            "SELECT files, digest, report FROM reports"
+            " WHERE path = ? AND options = ?", (path, key)).fetchone()
+        if row is None:
+            return None
+
+        files, digest, report = row
+        files = json.loads(files)
+        paths = [name for name, size, mtime_ns in files]
+        current = self.fingerprint(paths)
+        if current[0][1] is None:
+            self.invalidate(path)
+            return None
+        if current != files:
+            if not (self.content_hash and digest == self.digest(paths)):
+                self.invalidate(path)
+                return None
+            self._db.execute(
+                "UPDATE reports SET files = ? WHERE path = ? AND options = ?",
+                (json.dumps(current), path, key))
+
+        self._db.execute(
+            "UPDATE reports SET last_used = ? WHERE path = ? AND options = ?",
+            (time.time(), path, key))
+        self._db.commit()
+        return json.loads(report)
+
+    def put(self, path, options, report):
+        """
+        stores the report of path, then evicts the least recently used
+        entries until the cache fits in max_bytes
+        """
+        paths = self.dataset_files(path, report)
+        files = json.dumps(self.fingerprint(paths))
+        digest = self.digest(paths) if self.content_hash else None
+        text = json.dumps(report)
+        self._db.execute(
+            "INSERT OR REPLACE INTO reports VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (paths[0], self.options_key(options), files, digest, text,
+             len(text), time.time()))
+        self._evict()
+        self._db.commit()
+
+    def _evict(self):
+        total = self._db.execute(
+            "SELECT COALESCE(SUM(nbytes), 0) FROM reports").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._db.execute(
+            "SELECT rowid, nbytes FROM reports ORDER BY last_used").fetchall()
+        for rowid, nbytes in rows:
+            if total <= self.max_bytes:
+                break
+            self._db.execute("DELETE FROM reports WHERE rowid = ?", (rowid,))
+            total -= nbytes
+
+    def invalidate(self, path=None):
+        """
+        drops the entries of path (all options), or the whole cache
+        """
+        if path is None:
+            self._db.execute("DELETE FROM reports")
+        else:
+            self._db.execute("DELETE FROM reports WHERE path = ?",
+                             (os.path.abspath(path),))
+        self._db.commit()
+
+    def close(self):
+        self._db.commit()
+        self._db.close()
@@ -0,0 +1,367 @@
+"""
+Long-running elevation query service on a warm Reader
+
+Small jobs ask this process over HTTP (TCP or a Unix socket) instead of
+each one starting Python, registering the GDAL drivers and opening the
+DEM. The bands are read into memory once, at start (Reader cache="band").
+
+Point, batch and transect requests do not read on their own: they queue
+their coordinates in a Batcher, which concatenates everything that
+arrives within `max_delay`, or while the previous read is running, into
+one vectorized read per (overview level, method, latlon) and hands every
+request its slice. Reads run on a single worker thread, so the event
+loop keeps accepting requests and the Reader is never used concurrently.
+
+Endpoints, all answering JSON (masked values are null):
+  GET  /info                      size, extent, bands and projection
+  GET  /point?x=..&y=..           values of every band at one point
+  POST /points {"x": [..], "y": [..]}   values of every band per point
+  GET  /transect?x1=..&y1=..&x2=..&y2=..[&spacing=..][&band=1]
+  GET  /stats                     latency histogram per endpoint,
+                                  batching and cache counts
+Every query takes method=nearest|bilinear|bicubic, resolution=<map
+units> (read an overview) and latlon=1 (x, y are WGS84 latitude and
+longitude); /points also takes them in its JSON body.
+
+Usage: python service.py dem [port | socket_path] [max_delay_ms]
+"""
+import asyncio
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qsl, urlsplit
+
+import numpy as np
+
+try:
+    from raster.readerclass import Reader
+    from raster.transect import sample_positions
+except ImportError:
+    from readerclass import Reader
+    from transect import sample_positions
+
+
+ENDPOINTS = ("/info", "/point", "/points", "/transect", "/stats")
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found",
+           500: "Internal Server Error"}
+
+
+class LatencyHistogram:
+    """
+    request latencies in buckets growing by 2 ** 0.25 (19 %) from 0.1 ms
+    up to ~100 s, plus one overflow bucket
+    """
+    BOUNDS = 1e-4 * 2.0 ** (np.arange(81) / 4.0)    # upper bounds, seconds
+
+    def __init__(self):
+        self.counts = np.zeros(len(self.BOUNDS) + 1, dtype=np.int64)
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds):
+        self.counts[np.searchsorted(self.BOUNDS, seconds)] += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def quantile(self, q):
+        """
+        upper bound (seconds) of the bucket holding the q-quantile, the
+        largest latency for the overflow bucket, None when empty
+        """
+        n = self.counts.sum()
+        if n == 0:
+            return None
+        i = int(np.searchsorted(np.cumsum(self.counts), q * n))
+        return float(self.BOUNDS[i]) if i < len(self.BOUNDS) else self.max
+
+    def summary(self):
+        n = int(self.counts.sum())
+        ms = lambda seconds: None if seconds is None else seconds * 1000.0
+        return {"count": n,
+                "mean_ms": ms(self.total / n) if n else None,
+                "max_ms": ms(self.max),
+                "p50_ms": ms(self.quantile(0.5)),
+                "p90_ms": ms(self.quantile(0.9)),
+                "p99_ms": ms(self.quantile(0.99)),
+                # [upper bound in ms (null: overflow), count], non-empty only
+                "buckets": [[ms(float(self.BOUNDS[i])) if i < len(self.BOUNDS)
+                             else None, int(count)]
+                            for i, count in enumerate(self.counts) if count]}
+
+
+class Batcher:
+    """
+    Coalesces concurrent point lookups into vectorized reads of a Reader
+    reader: used only from executor, which must have a single thread
+    max_delay: seconds the first request of a batch waits for others
+    """
+    def __init__(self, reader, executor, max_delay=0.002):
+        self._reader = reader
+        self._executor = executor
+        self.max_delay = max_delay
+        self._pending = {}      # (level, method, latlon) -> [(xs, ys, future)]
+        self._task = None
+        self.batches = 0
+        self.requests = 0
+        self.points = 0
+
+    async def sample(self, xs, ys, level=0, method="nearest", latlon=False):
+        """
+        values of every band at xs, ys (1-D arrays), as Reader._sample
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._pending.setdefault((level, method, latlon), []).append(
+            (xs, ys, future))
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+        return await future
+
+    async def _run(self):
+        await asyncio.sleep(self.max_delay)
+        loop = asyncio.get_running_loop()
+        try:
+            # requests that arrive during a read make up the next batch
+            while self._pending:
+                batch, self._pending = self._pending, {}
+                try:
+                    results = await loop.run_in_executor(self._executor,
+                                                         self._read, batch)
+                except Exception as e:
+                    results = dict((key, [e] * len(entries))
+                                   for key, entries in batch.items())
+                for key, entries in batch.items():
+                    for (xs, ys, future), result in zip(entries, results[key]):
+                        if future.done():
+                            # the client went away
+                            continue
+                        if isinstance(result, Exception):
+                            future.set_exception(result)
+                        else:
+                            future.set_result(result)
+        finally:
+            self._task = None
+
+    def _read(self, batch):
+        """
+        one read per key of the batch; returns per key the list of the
+        requests' values, or of the exception the read raised
+        """
+        results = {}
+        for (level, method, latlon), entries in batch.items():
+            sizes = [len(xs) for xs, ys, future in entries]
+            xs = np.concatenate([entry[0] for entry in entries])
+            ys = np.concatenate([entry[1] for entry in entries])
+            try:
+                if latlon:
+                    xs, ys = self._reader.from_latlon(xs, ys)
+                values = self._reader._sample(xs, ys,
+                                              range(self._reader._bands),
+                                              level, method)
+            except (ValueError, RuntimeError) as e:
+                results[(level, method, latlon)] = [e] * len(entries)
+                continue
+            results[(level, method, latlon)] = np.split(
+                values, np.cumsum(sizes)[:-1], axis=1)
+            self.batches += 1
+            self.requests += len(entries)
+            self.points += len(xs)
+        return results
+
+    def info(self):
+        return {"batches": self.batches, "requests": self.requests,
+                "points": self.points,
+                "requests_per_batch": self.requests / float(self.batches)
+                if self.batches else None}
+
+
+def _to_json(values):
+    """
+    a masked array as nested lists with null for masked values
+    """
+    values = np.ma.asarray(values)
+    return np.where(np.ma.getmaskarray(values), None,
+                    values.data.astype(object)).tolist()
+
+
+def _flag(value):
+    return str(value).lower() in ("1", "true", "yes")
+
+
+class ElevationService:
+    """
+    The HTTP front end: parses requests, feeds the Batcher and keeps the
+    latency histograms
+    """
+    def __init__(self, file_name, max_delay=0.002):
+        self.reader = Reader(file_name, cache="band")
+        # warm: read every band now rather than on the first request
+        for i in range(self.reader._bands):
+            self.reader._cache(i).array
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self.batcher = Batcher(self.reader, self._executor, max_delay)
+        self.histograms = dict((name, LatencyHistogram()) for name in ENDPOINTS)
+        self.started = time.time()
+
+    def _query(self, params):
+        """
+        (level, method, latlon) of the common query parameters
+        """
+        resolution = params.get("resolution")
+        return (self.reader.overview_level(
+                    None if resolution is None else float(resolution)),
+                params.get("method", "nearest"),
+                _flag(params.get("latlon", False)))
+
+    async def info(self, params):
+        reader = self.reader
+        cols, rows, width, height = reader._levels[0]
+        x2 = reader._originX + cols * width
+        y2 = reader._originY + rows * height
+        return {"file_name": reader.file_name, "cols": cols, "rows": rows,
+                "bands": reader._bands, "pixel_size": [width, height],
+                "bounds": [min(reader._originX, x2), min(reader._originY, y2),
+                           max(reader._originX, x2), max(reader._originY, y2)],
+                "overviews": len(reader._levels) - 1,
+                "projection": reader.data_set.GetProjectionRef()}
+
+    async def point(self, params):
+        values = await self.batcher.sample(
+            np.array([float(params["x"])]), np.array([float(params["y"])]),
+            *self._query(params))
+        return {"values": _to_json(values[:, 0])}
+
+    async def points(self, params):
+        xs = np.asarray(params["x"], dtype=np.float64).ravel()
+        ys = np.asarray(params["y"], dtype=np.float64).ravel()
+        if xs.shape != ys.shape:
+            raise ValueError("x and y differ in length")
+        values = await self.batcher.sample(xs, ys, *self._query(params))
+        return {"values": _to_json(values)}
+
+    async def transect(self, params):
+        level, method, latlon = self._query(params)
+        band = int(params.get("band", 1))
+        if not 1 <= band <= self.reader._bands:
+            raise ValueError("no band %d" % band)
+        ends = [float(params[name]) for name in ("x1", "y1", "x2", "y2")]
+        if latlon:
+            xs, ys = await asyncio.get_running_loop().run_in_executor(
+                self._executor, self.reader.from_latlon,
+                ends[0::2], ends[1::2])
+            ends = [xs[0], ys[0], xs[1], ys[1]]
+        spacing = params.get("spacing")
+        spacing = float(spacing) if spacing is not None \
+            else min(abs(size) for size in self.reader.pixel_size(level))
+        if not spacing > 0:
+            raise ValueError("spacing must be positive")
+        distance, x, y = sample_positions(*(ends + [spacing]))
+        z = (await self.batcher.sample(x, y, level, method))[band - 1]
+        return {"distance": distance.tolist(), "x": x.tolist(),
+                "y": y.tolist(), "z": _to_json(z)}
+
+    async def stats(self, params):
+        return {"uptime": time.time() - self.started,
+                "latency": dict((name, histogram.summary())
+                                for name, histogram in self.histograms.items()),
+                "batching": self.batcher.info(),
+                "cache": self.reader.cache_info()._asdict()}
+
+    async def _dispatch(self, target, body):
+        url = urlsplit(target)
+        handler = getattr(self, url.path.strip("/"), None) \
+            if url.path in ENDPOINTS else None
+        if handler is None:
+            return 404, {"error": "no endpoint %s" % url.path}
+        try:
+            params = dict(parse_qsl(url.query))
+            if body:
+                params.update(json.loads(body.decode("utf-8")))
+            return 200, await handler(params)
+        except (KeyError, ValueError, TypeError) as e:
+            return 400, {"error": "%s: %s" % (type(e).__name__, e)}
+        except Exception as e:
+            return 500, {"error": "%s: %s" % (type(e).__name__, e)}
+
+    async def _handle(self, stream_reader, writer):
+        """
+        one HTTP/1.1 connection, kept alive until the client closes it
+        """
+        try:
+            while True:
+                line = await stream_reader.readline()
+                if not line.strip():
+                    break
+                verb, target, version = line.decode("latin-1").split()
+                headers = {}
+                while True:
+                    header = await stream_reader.readline()
+                    if not header.strip():
+                        break
+                    name, _, value = header.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await stream_reader.readexactly(
+                    int(headers.get("content-length", 0)))
+
+                start = time.perf_counter()
+                status, payload = await self._dispatch(target, body)
+                data = json.dumps(payload).encode("utf-8")
+                keep_alive = version == "HTTP/1.1" \
+                    and headers.get("connection", "").lower() != "close"
+                writer.write(("HTTP/1.1 %d %s\r\n"
+                              "Content-Type: application/json\r\n"
+                              "Content-Length: %d\r\n"
+                              "Connection: %s\r\n\r\n"
+                              % (status, REASONS[status], len(data),
+                                 "keep-alive" if keep_alive else "close")
+                              ).encode("latin-1") + data)
+                await writer.drain()
+                path = urlsplit(target).path
+                if path in self.histograms:
+                    self.histograms[path].record(time.perf_counter() - start)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            # malformed request or the client went away
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, port=8080, host="127.0.0.1", path=None):
+        """
+        serves on host:port, or on the Unix socket at path, until cancelled
+        """
+        if path is not None:
+            server = await asyncio.start_unix_server(self._handle, path)
+        else:
+            server = await asyncio.start_server(self._handle, host, port)
+        print("serving %s on %s" % (self.reader.file_name,
+                                    path if path is not None
+                                    else "http://%s:%d" % (host, port)))
+        async with server:
+            await server.serve_forever()
+
+    def close(self):
+        self._executor.shutdown()
+        self.reader.close()
+
+
+if __name__ == "__main__":
+    # python service.py ../lewisburg_pa/lewisburg_pa.dem 8080
+    # curl 'localhost:8080/point?x=40.954824&y=-76.881087&latlon=1'
+    if len(sys.argv) < 2:
+        print("Usage: service.py dem [port | socket_path] [max_delay_ms]")
+        sys.exit(1)
+    address = sys.argv[2] if len(sys.argv) > 2 else "8080"
+    max_delay = float(sys.argv[3]) / 1000.0 if len(sys.argv) > 3 else 0.002
+    service = ElevationService(sys.argv[1], max_delay)
+    try:
+        if address.isdigit():
+            asyncio.run(service.serve(port=int(address)))
+        else:
+            asyncio.run(service.serve(path=address))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
@@ -0,0 +1,226 @@
+"""
+Raster bands in shared memory for process pools
+
+The parent reads the bands once into a multiprocessing.shared_memory
+block (SharedRaster); workers attach to it by name (attach) and wrap the
+read-only NumPy view in a Reader, instead of every worker opening the
+file and reading its own copy of the band
+
+Lifecycle: the SharedRaster owns the block and unlinks it on close(), at
+the end of a with block, or when it is garbage collected. Workers only
+close their mapping. Workers must be started through multiprocessing
+(they then share the parent's resource tracker), otherwise Python
+versions before 3.13 unlink the block when an attached process exits
+"""
+import os
+import sys
+import time
+import weakref
+from collections import namedtuple
+from multiprocessing import Pool
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+try:
+    from raster.memmapdem import MemmapBand, open_dataset
+except ImportError:
+    from memmapdem import MemmapBand, open_dataset
+
+
+# everything a worker needs to attach; small and picklable
+SharedRasterInfo = namedtuple("SharedRasterInfo", [
+    "name", "shape", "dtype", "nodata", "geotransform", "projection",
+    "description"])
+
+
+def _release(shm):
+    shm.close()
+    try:
+        shm.unlink()
+    except FileNotFoundError:
+        pass
+
+
+class SharedRaster:
+    """
+    Owner of a shared memory copy of the bands (1-based, all by default)
+    of the raster at file_name
+    """
+    def __init__(self, file_name, bands=None):
+        data_set = open_dataset(file_name)
+        if data_set is None:
+            raise IOError("could not open %s" % file_name)
+        if bands is None:
+            bands = list(range(1, data_set.RasterCount + 1))
+        hBands = [data_set.GetRasterBand(i) for i in bands]
+        dtype = np.result_type(*[hBand.ReadAsArray(0, 0, 1, 1).dtype
+                                 for hBand in hBands])
+        shape = (len(bands), data_set.RasterYSize, data_set.RasterXSize)
+
+        self._shm = SharedMemory(create=True,
+                                 size=max(int(np.prod(shape)) * dtype.itemsize, 1))
+        self._finalizer = weakref.finalize(self, _release, self._shm)
+        array = np.ndarray(shape, dtype, buffer=self._shm.buf)
+        for i, hBand in enumerate(hBands):
+            array[i] = hBand.ReadAsArray()
+        # no view may outlive the owner's close()
+        del array
+
+        self.descriptor = SharedRasterInfo(
+            self._shm.name, shape, dtype.str,
+            [hBand.GetNoDataValue() for hBand in hBands],
+            tuple(data_set.GetGeoTransform()), data_set.GetProjectionRef(),
+            file_name)
+
+    @property
+    def nbytes(self):
+        return self._shm.size
+
+    def close(self):
+        """
+        releases and unlinks the block; attached workers keep their
+        mappings until they close them
+        """
+        self._finalizer()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _open_shared(name):
+    try:
+        return SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13 has no track argument
+        return SharedMemory(name=name)
+
+
+class SharedDataset:
+    """
+    A worker's read-only view of a SharedRaster, with the GDAL Dataset
+    methods Reader needs (see Reader.from_dataset)
+    """
+    def __init__(self, descriptor):
+        self.descriptor = descriptor
+        self._shm = _open_shared(descriptor.name)
+        self.array = np.ndarray(descriptor.shape, np.dtype(descriptor.dtype),
+                                buffer=self._shm.buf)
+        self.array.flags.writeable = False
+        self.RasterCount, self.RasterYSize, self.RasterXSize = descriptor.shape
+        self._bands = [MemmapBand(self.array[i], nodata)
+                       for i, nodata in enumerate(descriptor.nodata)]
+
+    def GetRasterBand(self, i):
+        return self._bands[i-1]
+
+    def GetGeoTransform(self):
+        return self.descriptor.geotransform
+
+    def GetProjectionRef(self):
+        return self.descriptor.projection
+
+    def GetDescription(self):
+        return self.descriptor.description
+
+    def close(self):
+        """
+        drops the views and unmaps the block; arrays taken from the
+        dataset (e.g. by a Reader cache) must be released first
+        """
+        self._bands = []
+        self.array = None
+        try:
+            self._shm.close()
+        except BufferError:
+            # views are still alive; the mapping goes with the process
+            pass
+
+
+def attach(descriptor):
+    """
+    the SharedDataset of a SharedRaster descriptor
+    """
+    return SharedDataset(descriptor)
+
+
+_worker = {}
+
+
+def _private_bytes():
+    """
+    memory of this process not shared with others (Linux), else peak RSS
+    """
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            return sum(int(line.split()[1]) * 1024 for line in f
+                       if line.startswith(("Private_Clean", "Private_Dirty")))
+    except IOError:
+        import resource
+        scale = 1 if sys.platform == "darwin" else 1024
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+
+def _init_loading_worker(file_name):
+    try:
+        from raster.readerclass import Reader
+    except ImportError:
+        from readerclass import Reader
+    _worker["reader"] = Reader(file_name, cache="band")
+
+
+def _init_shared_worker(descriptor):
+    try:
+        from raster.readerclass import Reader
+    except ImportError:
+        from readerclass import Reader
+    _worker["reader"] = Reader.from_dataset(attach(descriptor))
+
+
+def _query_points(n_points):
+    reader = _worker["reader"]
+    cols, rows, width, height = reader._levels[0]
+    random = np.random.RandomState(os.getpid())
+    xs = reader._originX + random.uniform(0, cols * width, n_points)
+    ys = reader._originY + random.uniform(0, rows * height, n_points)
+    reader.get_pixel_values(xs, ys)
+    return os.getpid(), _private_bytes()
+
+
+def _run(initializer, initargs, processes, tasks, points):
+    start = time.time()
+    with Pool(processes, initializer=initializer, initargs=initargs) as pool:
+        results = pool.map(_query_points, [points] * tasks, chunksize=1)
+    seconds = time.time() - start
+    private = dict(results)
+    return {"seconds": seconds,
+            "points_per_second": tasks * points / seconds,
+            "private_bytes_per_worker": max(private.values()),
+            "private_bytes_total": sum(private.values())}
+
+
+def benchmark(file_name, processes=4, tasks=16, points=100000):
+    """
+    random point queries from a pool of workers that each load the band
+    (Reader cache="band", the current way) against workers attached to
+    one SharedRaster; reports throughput and the private (unshared)
+    memory of the workers
+    """
+    loading = _run(_init_loading_worker, (file_name,), processes, tasks, points)
+    with SharedRaster(file_name) as shared:
+        sharing = _run(_init_shared_worker, (shared.descriptor,), processes,
+                       tasks, points)
+        sharing["shared_bytes"] = shared.nbytes
+    return {"per_worker_load": loading, "shared_memory": sharing}
+
+
+if __name__ == "__main__":
+    file_name = sys.argv[1] if len(sys.argv) > 1 else "../lewisburg_pa/lewisburg_pa.dem"
+    processes = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    for mode, result in sorted(benchmark(file_name, processes).items()):
+        print("%-16s %8.2f s  %12.0f points/s  %8.1f MB private per worker"
+              % (mode, result["seconds"], result["points_per_second"],
+                 result["private_bytes_per_worker"] / 2.**20))
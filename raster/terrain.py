@@ -0,0 +1,133 @@
+"""
+Terrain derivatives of a DEM computed together from its 3x3 neighbourhoods
+
+slope and aspect use Horn's method, the curvatures Zevenbergen & Thorne's.
+All derivatives take the pixel size from the geotransform, so they are in
+real ground units (degrees for slope/aspect, 1/m for curvature, m for TRI
+and TPI). Cells with a nodata neighbour come out as nan
+"""
+import numpy as np
+
+try:
+    from osgeo import gdal
+except ImportError:
+    import gdal
+
+try:
+    from raster.tiles import run_tiled
+except ImportError:
+    from tiles import run_tiled
+
+
+DERIVATIVES = ("slope", "aspect", "plan_curvature", "profile_curvature",
+               "tri", "tpi")
+
+
+def terrain_derivatives(array, pixel_width, pixel_height,
+                        derivatives=DERIVATIVES, nodata=None):
+    """
+    array: the DEM (rows, cols); rows go from north to south
+    pixel_width, pixel_height: the pixel size from the geotransform
+    derivatives: the names from DERIVATIVES to compute
+    returns a dict name -> float32 array of the same shape as array
+    """
+    unknown = set(derivatives) - set(DERIVATIVES)
+    if unknown:
+        raise ValueError("unknown derivatives: %s" % ", ".join(sorted(unknown)))
+
+    z = np.asarray(array, dtype=np.float64)
+    if nodata is not None:
+        z = np.where(z == nodata, np.nan, z)
+    dx = abs(pixel_width)
+    dy = abs(pixel_height)
+
+    # the border is padded with its own values so every cell has
+    # 8 neighbours; z1 is the north-west neighbour, z9 the south-east one
+    z = np.pad(z, 1, mode="edge")
+    z1, z2, z3 = z[:-2, :-2], z[:-2, 1:-1], z[:-2, 2:]
+    z4, z5, z6 = z[1:-1, :-2], z[1:-1, 1:-1], z[1:-1, 2:]
+    z7, z8, z9 = z[2:, :-2], z[2:, 1:-1], z[2:, 2:]
+
+    result = {}
+    with np.errstate(invalid="ignore", divide="ignore"):
+        if "slope" in derivatives or "aspect" in derivatives:
+            # Horn: dz/dx towards east, dz/dy towards north
+            p = ((z3 + 2 * z6 + z9) - (z1 + 2 * z4 + z7)) / (8 * dx)
+            q = ((z1 + 2 * z2 + z3) - (z7 + 2 * z8 + z9)) / (8 * dy)
+            if "slope" in derivatives:
+                result["slope"] = np.degrees(np.arctan(np.hypot(p, q)))
+            if "aspect" in derivatives:
+                # direction of steepest descent, clockwise from north
+                aspect = np.degrees(np.arctan2(-p, -q)) % 360
+                aspect[(p == 0) & (q == 0)] = np.nan
+                result["aspect"] = aspect
+
+        if "plan_curvature" in derivatives or "profile_curvature" in derivatives:
+            d = ((z4 + z6) / 2 - z5) / (dx * dx)
+            e = ((z2 + z8) / 2 - z5) / (dy * dy)
+            f = (-z1 + z3 + z7 - z9) / (4 * dx * dy)
+            g = (z6 - z4) / (2 * dx)
+            h = (z2 - z8) / (2 * dy)
+            g2 = g * g
+            h2 = h * h
+            gh = g * h
+            norm = g2 + h2
+            flat = norm == 0
+            if "profile_curvature" in derivatives:
+                profile = -2 * (d * g2 + e * h2 + f * gh) / norm
+                profile[flat] = 0
+                result["profile_curvature"] = profile
+            if "plan_curvature" in derivatives:
+                plan = 2 * (d * h2 + e * g2 - f * gh) / norm
+                plan[flat] = 0
+                result["plan_curvature"] = plan
+
+        if "tri" in derivatives or "tpi" in derivatives:
+            neighbours = (z1, z2, z3, z4, z6, z7, z8, z9)
+            if "tri" in derivatives:
+                # Riley's terrain ruggedness index
+                squares = np.zeros_like(z5)
+                for neighbour in neighbours:
+                    diff = neighbour - z5
+                    diff *= diff
+                    squares += diff
+                result["tri"] = np.sqrt(squares, out=squares)
+            if "tpi" in derivatives:
+                total = np.zeros_like(z5)
+                for neighbour in neighbours:
+                    total += neighbour
+                result["tpi"] = z5 - total / 8
+
+    return dict((name, result[name].astype(np.float32)) for name in derivatives)
+
+
+def reader_terrain(reader, band=1, derivatives=DERIVATIVES):
+    """
+    terrain derivatives of a whole band of a Reader
+    """
+    dem = reader.read_band(band).astype(np.float64).filled(np.nan)
+    return terrain_derivatives(dem, reader._pixelWidth, reader._pixelHeight,
+                               derivatives)
+
+
+def tiled_terrain(src_path, dst_path, derivatives=DERIVATIVES, band=1,
+                  tile_size=512, workers=4):
+    """
+    writes the derivatives of src_path to dst_path, one band each in the
+    order given, streaming block-aligned tiles with a one pixel halo
+    """
+    data_set = gdal.Open(src_path, gdal.GA_ReadOnly)
+    if data_set is None:
+        raise IOError("could not open %s" % src_path)
+    geo_transform = data_set.GetGeoTransform()
+    nodata = data_set.GetRasterBand(band).GetNoDataValue()
+    data_set = None
+
+    def derive_tile(array):
+        tile = terrain_derivatives(array, geo_transform[1], geo_transform[5],
+                                   derivatives, nodata)
+        return np.stack([tile[name] for name in derivatives])
+
+    run_tiled(src_path, dst_path, derive_tile, halo=1, tile_size=tile_size,
+              workers=workers, band=band, out_bands=len(derivatives),
+              descriptions=derivatives)
@@ -0,0 +1,130 @@
+"""
+Tiled (windowed) processing of rasters that do not fit in memory
+
+The raster is cut into windows aligned to its GDAL blocks. Every window is
+read with a halo of neighbouring pixels so that neighbourhood operations
+(gradients, 3x3 kernels) give the same result at tile seams as on the whole
+raster. Tiles are processed in a thread pool and written to the output as
+they finish, so at most a few tiles are in memory at any time
+"""
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+import numpy as np
+
+try:
+    from osgeo import gdal
+except ImportError:
+    import gdal
+
+
+Window = namedtuple("Window", ["x_offset", "y_offset", "x_size", "y_size"])
+
+
+def _aligned(size, block, total):
+    """
+    `size` rounded to a whole number of blocks, at most `total`
+    """
+    return min(max(int(round(size / float(block))), 1) * block, total)
+
+
+def block_windows(band, tile_size=512):
+    """
+    windows covering the band, each made of whole GDAL blocks and roughly
+    tile_size x tile_size pixels; None gives one window per block
+    """
+    block_x, block_y = band.GetBlockSize()
+    if tile_size is None:
+        tile_x, tile_y = block_x, block_y
+    else:
+        tile_x = _aligned(tile_size, block_x, band.XSize)
+        tile_y = _aligned(tile_size, block_y, band.YSize)
+
+    for y_offset in range(0, band.YSize, tile_y):
+        for x_offset in range(0, band.XSize, tile_x):
+            yield Window(x_offset, y_offset,
+                         min(tile_x, band.XSize - x_offset),
+                         min(tile_y, band.YSize - y_offset))
+
+
+def read_with_halo(band, window, halo):
+    """
+    reads the window plus up to `halo` pixels on each side (less at the
+    raster edges)
+    returns (array, top, left): top and left are the halo rows/columns
+    actually read before the window
+    """
+    x0 = max(window.x_offset - halo, 0)
+    y0 = max(window.y_offset - halo, 0)
+    x1 = min(window.x_offset + window.x_size + halo, band.XSize)
+    y1 = min(window.y_offset + window.y_size + halo, band.YSize)
+    array = band.ReadAsArray(x0, y0, x1 - x0, y1 - y0)
+    return array, window.y_offset - y0, window.x_offset - x0
+
+
+def run_tiled(src_path, dst_path, func, halo=1, tile_size=512, workers=4,
+              band=1, out_bands=1, out_type=None, driver="GTiff",
+              options=("TILED=YES",), descriptions=None):
+    """
+    applies func tile by tile to `band` of src_path and writes the result
+    to a new raster dst_path with the same size, geotransform and projection
+    func: takes the tile with its halo (2-D array) and returns an array of
+          the same shape, or (out_bands, rows, cols) for several bands;
+          the halo is cut off the result
+    workers: number of threads; each thread opens its own dataset, since
+             GDAL datasets must not be shared between threads
+    descriptions: optional names for the output bands
+    """
+    if out_type is None:
+        out_type = gdal.GDT_Float32
+
+    src = gdal.Open(src_path, gdal.GA_ReadOnly)
+    if src is None:
+        raise IOError("could not open %s" % src_path)
+    src_band = src.GetRasterBand(band)
+
+    dst = gdal.GetDriverByName(driver).Create(
+        dst_path, src.RasterXSize, src.RasterYSize, out_bands, out_type,
+        options=list(options))
+    dst.SetGeoTransform(src.GetGeoTransform())
+    dst.SetProjection(src.GetProjectionRef())
+    if descriptions is not None:
+        for i, description in enumerate(descriptions):
+            dst.GetRasterBand(i+1).SetDescription(description)
+
+    local = threading.local()
+
+    def process(window):
+        if not hasattr(local, "band"):
+            local.data_set = gdal.Open(src_path, gdal.GA_ReadOnly)
+            local.band = local.data_set.GetRasterBand(band)
+        array, top, left = read_with_halo(local.band, window, halo)
+        result = np.asarray(func(array))
+        if result.ndim == 2:
+            result = result[None]
+        return window, result[:, top:top + window.y_size,
+                              left:left + window.x_size]
+
+    def write(future):
+        window, result = future.result()
+        for i in range(out_bands):
+            dst.GetRasterBand(i+1).WriteArray(result[i], window.x_offset,
+                                              window.y_offset)
+
+    # keep a bounded number of tiles in flight so memory depends on the
+    # tile size and not on the raster size
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = set()
+        for window in block_windows(src_band, tile_size):
+            if len(pending) >= 2 * workers:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    write(future)
+            pending.add(executor.submit(process, window))
+        for future in pending:
+            write(future)
+
+    dst.FlushCache()
+    dst = None
+    src = None
@@ -0,0 +1,26 @@
+"""
+Sample positions along a straight transect between two map coordinates
+"""
+from collections import namedtuple
+
+import numpy as np
+
+
+# one sampled transect, all fields are 1-D arrays of the same length
+# distance: from the start point along the line, in map units
+# x, y: easting and northing of every sample
+# z: the pixel value (elevation) at every sample, masked outside the raster
+Transect = namedtuple("Transect", ["distance", "x", "y", "z"])
+
+
+def sample_positions(x1, y1, x2, y2, spacing):
+    """
+    evenly spaced positions from (x1, y1) to (x2, y2), both ends included,
+    no more than `spacing` apart. Works in any direction, including
+    vertical (x1 == x2) and steep lines
+    returns (distance, x, y)
+    """
+    length = np.hypot(x2 - x1, y2 - y1)
+    n_samples = max(int(np.ceil(length / spacing)), 1) + 1
+    t = np.linspace(0.0, 1.0, n_samples)
+    return t * length, x1 + t * (x2 - x1), y1 + t * (y2 - y1)
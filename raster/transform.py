@@ -0,0 +1,120 @@
+"""
+Batch coordinate transformations between WGS84 latitude/longitude and the
+coordinate system of a raster (UTM for the DEMs here)
+
+One osr.CoordinateTransformation is built per (source, target) pair and
+kept for the life of the process; whole arrays of points go through a
+single TransformPoints call. Both ends use the traditional GIS axis
+order (x = longitude/easting, y = latitude/northing) whatever the
+authority says, so EPSG:4326 does not swap axes under GDAL 3
+"""
+import sys
+
+import numpy as np
+
+try:
+    from osgeo import osr
+except ImportError:
+    import osr
+
+
+WGS84 = "EPSG:4326"
+
+# CoordinateTransformation per (source, target); osr objects are not
+# thread safe, but every process of a pool gets its own
+_transformers = {}
+
+
+def spatial_reference(crs):
+    """
+    osr.SpatialReference of a WKT string, "EPSG:n" or anything else
+    SetFromUserInput accepts, in traditional GIS axis order
+    """
+    hSRS = osr.SpatialReference()
+    if hSRS.SetFromUserInput(crs) != 0:
+        raise ValueError("unknown coordinate system: %r" % (crs,))
+    if hasattr(osr, "OAMS_TRADITIONAL_GIS_ORDER"):
+        # GDAL >= 3; older versions always use this order
+        hSRS.SetAxisMappingStrategy(osr.OAMS_TRADITIONAL_GIS_ORDER)
+    return hSRS
+
+
+def transformer(source, target):
+    """
+    the cached CoordinateTransformation from source to target
+    """
+    key = (source, target)
+    hTransform = _transformers.get(key)
+    if hTransform is None:
+        hTransform = osr.CoordinateTransformation(spatial_reference(source),
+                                                  spatial_reference(target))
+        if hTransform is None:
+            raise ValueError("cannot transform from %r to %r" % key)
+        _transformers[key] = hTransform
+    return hTransform
+
+
+def transform(xs, ys, source, target, chunk_size=1000000):
+    """
+    xs, ys: arrays of coordinates in source (x = longitude/easting)
+    chunk_size: points per TransformPoints call, to bound the temporary
+                Python objects of the osr bindings
+    returns arrays (xs, ys) in target, with the broadcast shape of the
+    inputs; points that fail to transform are inf or nan
+    """
+    xs, ys = np.broadcast_arrays(np.asarray(xs, dtype=np.float64),
+                                 np.asarray(ys, dtype=np.float64))
+    if source == target:
+        return xs.copy(), ys.copy()
+    hTransform = transformer(source, target)
+    points = np.column_stack((xs.ravel(), ys.ravel()))
+    out = np.empty((len(points), 2))
+    for i in range(0, len(points), chunk_size):
+        result = hTransform.TransformPoints(points[i:i+chunk_size])
+        out[i:i+chunk_size] = np.asarray(result, dtype=np.float64)[:, :2]
+    return out[:, 0].reshape(xs.shape), out[:, 1].reshape(xs.shape)
+
+
+def from_latlon(lats, lons, crs):
+    """
+    WGS84 latitudes and longitudes to (xs, ys) in crs
+    """
+    return transform(lons, lats, WGS84, crs)
+
+
+def to_latlon(xs, ys, crs):
+    """
+    (lats, lons) in WGS84 of xs, ys in crs
+    """
+    lons, lats = transform(xs, ys, crs, WGS84)
+    return lats, lons
+
+
+def load_latlon(filename, lat_column="latitude", lon_column="longitude"):
+    """
+    the (lats, lons) columns of a CSV file with a header line, such as
+    datasets/Workbook1.csv
+    """
+    with open(filename) as f:
+        header = [name.strip() for name in f.readline().split(",")]
+    data = np.loadtxt(filename, delimiter=",", skiprows=1, ndmin=2,
+                      usecols=(header.index(lat_column),
+                               header.index(lon_column)))
+    return data[:, 0], data[:, 1]
+
+
+if __name__ == "__main__":
+    # python transform.py ../datasets/Workbook1.csv ../lewisburg_pa/lewisburg_pa.dem
+    # prints latitude,longitude,x,y in the coordinate system of the raster
+    try:
+        from raster.memmapdem import open_dataset
+    except ImportError:
+        from memmapdem import open_dataset
+    if len(sys.argv) != 3:
+        print("Usage: transform.py points.csv raster")
+        sys.exit(1)
+    lats, lons = load_latlon(sys.argv[1])
+    xs, ys = from_latlon(lats, lons, open_dataset(sys.argv[2]).GetProjectionRef())
+    print("latitude,longitude,x,y")
+    for row in zip(lats, lons, xs, ys):
+        print("%.8g,%.8g,%.3f,%.3f" % row)
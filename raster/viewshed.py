@@ -0,0 +1,120 @@
+"""
+Viewshed of an observer over the whole DEM
+
+Rays are cast from the observer to every cell on the border of the area of
+interest. Along each ray the cells are visited in order of distance and the
+horizon (the steepest elevation angle seen so far) is carried forward, so
+every cell is tested against the running horizon in O(1) instead of with its
+own transect. All rays of a chunk are swept together with NumPy
+"""
+import numpy as np
+
+try:
+    from raster.lineofsight import EARTH_RADIUS
+except ImportError:
+    from lineofsight import EARTH_RADIUS
+
+
+def _border(row_min, row_max, col_min, col_max):
+    """
+    row and column indices of the cells on the border of a rectangle
+    """
+    cols = np.arange(col_min, col_max + 1)
+    rows = np.arange(row_min + 1, row_max)
+    border_rows = np.concatenate([np.full(len(cols), row_min),
+                                  np.full(len(cols), row_max),
+                                  rows, rows])
+    border_cols = np.concatenate([cols, cols,
+                                  np.full(len(rows), col_min),
+                                  np.full(len(rows), col_max)])
+    return border_rows, border_cols
+
+
+def _sweep(terrain, row0, col0, target_rows, target_cols, eye, pixel_width,
+           pixel_height, target_height, max_distance, k_factor, visible):
+    """
+    sweeps the rays from the observer cell to the target cells and marks
+    the cells seen along them in `visible`
+    """
+    d_rows = target_rows - row0
+    d_cols = target_cols - col0
+    n_steps = np.maximum(np.abs(d_rows), np.abs(d_cols))
+
+    # one sample per row or column crossed, starting next to the observer
+    steps = np.arange(1, n_steps.max() + 1)
+    fraction = steps / n_steps[:, None]
+    on_ray = steps <= n_steps[:, None]
+    rows = np.where(on_ray, np.rint(row0 + fraction * d_rows[:, None]), row0)
+    cols = np.where(on_ray, np.rint(col0 + fraction * d_cols[:, None]), col0)
+    rows = rows.astype(np.int64)
+    cols = cols.astype(np.int64)
+
+    distance = fraction * np.hypot(d_rows * pixel_height,
+                                   d_cols * pixel_width)[:, None]
+    if max_distance is not None:
+        on_ray &= distance <= max_distance
+
+    z = terrain[rows, cols]
+    if k_factor is not None:
+        z = z - distance * distance / (2.0 * k_factor * EARTH_RADIUS)
+    on_ray &= ~np.isnan(z)
+
+    # the horizon in front of every sample is the running maximum of the
+    # elevation angles (as slopes) of the samples before it on the same ray
+    slope = np.where(on_ray, (z - eye) / distance, -np.inf)
+    horizon = np.maximum.accumulate(slope, axis=1)
+    horizon = np.concatenate([np.full((len(slope), 1), -np.inf),
+                              horizon[:, :-1]], axis=1)
+
+    seen = on_ray & ((z + target_height - eye) / distance >= horizon)
+    visible[rows[seen], cols[seen]] = True
+
+
+def viewshed(reader, x, y, observer_height=1.75, target_height=0.0,
+             max_distance=None, k_factor=None, band=1, chunk_size=256):
+    """
+    reader: a Reader on the DEM
+    x, y: easting and northing of the observer (UTM)
+    observer_height: height of the observer (antenna) above the ground
+    target_height: height above the ground of the points being looked at
+    max_distance: only cells within this distance can be visible
+    k_factor: effective earth radius factor (4/3 for radio, None ignores
+              earth curvature)
+    chunk_size: number of rays swept together
+    returns a boolean (rows, cols) array, True where the target is visible
+    """
+    dem = reader.read_band(band)
+    n_rows, n_cols = dem.shape
+    col0 = int(reader.get_x_offsets(x))
+    row0 = int(reader.get_y_offsets(y))
+    if not (0 <= col0 < n_cols and 0 <= row0 < n_rows):
+        raise ValueError("observer is outside the raster")
+    if np.ma.getmaskarray(dem)[row0, col0]:
+        raise ValueError("observer is on a nodata pixel")
+
+    pixel_width = abs(reader._pixelWidth)
+    pixel_height = abs(reader._pixelHeight)
+    terrain = dem.astype(np.float64).filled(np.nan)
+    eye = terrain[row0, col0] + observer_height
+
+    row_min, row_max, col_min, col_max = 0, n_rows - 1, 0, n_cols - 1
+    if max_distance is not None:
+        reach_rows = int(np.ceil(max_distance / pixel_height))
+        reach_cols = int(np.ceil(max_distance / pixel_width))
+        row_min = max(row0 - reach_rows, 0)
+        row_max = min(row0 + reach_rows, n_rows - 1)
+        col_min = max(col0 - reach_cols, 0)
+        col_max = min(col0 + reach_cols, n_cols - 1)
+
+    target_rows, target_cols = _border(row_min, row_max, col_min, col_max)
+    away = (target_rows != row0) | (target_cols != col0)
+    target_rows = target_rows[away]
+    target_cols = target_cols[away]
+
+    visible = np.zeros((n_rows, n_cols), dtype=bool)
+    visible[row0, col0] = True
+    for i in range(0, len(target_rows), chunk_size):
+        _sweep(terrain, row0, col0, target_rows[i:i+chunk_size],
+               target_cols[i:i+chunk_size], eye, pixel_width, pixel_height,
+               target_height, max_distance, k_factor, visible)
+    return visible
@@ -0,0 +1,65 @@
+"""
+Shared fixtures. raster/ is imported as a package and datasets/ by module
+name, the way the scripts in it import each other. Tests that write
+rasters need the GDAL Python bindings and are skipped without them
+"""
+import os
+import sys
+
+import numpy as np
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, "datasets")]
+
+NODATA = -9999
+GEOTRANSFORM = (500000.0, 30.0, 0.0, 4500000.0, 0.0, -30.0)
+
+
+def write_gtiff(path, values, nodata=None, block=16, overviews=()):
+    """
+    writes a (rows, cols) or (bands, rows, cols) array as a tiled GTiff in
+    UTM 18N, with the given overview factors; returns path
+    """
+    gdal = pytest.importorskip("osgeo.gdal")
+    gdal_array = pytest.importorskip("osgeo.gdal_array")
+    osr = pytest.importorskip("osgeo.osr")
+
+    values = np.asarray(values)
+    if values.ndim == 2:
+        values = values[np.newaxis]
+    data_set = gdal.GetDriverByName("GTiff").Create(
+        path, values.shape[2], values.shape[1], values.shape[0],
+        gdal_array.NumericTypeCodeToGDALTypeCode(values.dtype),
+        ["TILED=YES", "BLOCKXSIZE=%d" % block, "BLOCKYSIZE=%d" % block])
+    data_set.SetGeoTransform(GEOTRANSFORM)
+    srs = osr.SpatialReference()
+    srs.ImportFromEPSG(32618)
+    data_set.SetProjection(srs.ExportToWkt())
+    for i, band_values in enumerate(values):
+        band = data_set.GetRasterBand(i + 1)
+        if nodata is not None:
+            band.SetNoDataValue(nodata)
+        band.WriteArray(band_values)
+    if overviews:
+        data_set.BuildOverviews("NEAREST", list(overviews))
+    data_set.FlushCache()
+    data_set = None
+    return path
+
+
+def dem_values(rows=40, cols=50, seed=0):
+    """
+    a smooth Int16 elevation grid with a few nodata pixels
+    """
+    random = np.random.RandomState(seed)
+    y, x = np.mgrid[0:rows, 0:cols]
+    values = 300 + 2 * x + 3 * y + random.randint(0, 20, (rows, cols))
+    values[random.randint(0, rows, 10), random.randint(0, cols, 10)] = NODATA
+    return values.astype(np.int16)
+
+
+@pytest.fixture
+def dem_path(tmp_path):
+    return write_gtiff(str(tmp_path / "dem.tif"), dem_values(), NODATA,
+                       overviews=(2, 4))
@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from raster.bandcache import BandCache, BlockCache
+
+
+class ArrayBand:
+    """
+    the parts of a GDAL band the caches use, over a NumPy array
+    """
+    def __init__(self, array, block=(16, 8)):
+        self.array = array
+        self.YSize, self.XSize = array.shape
+        self.block = list(block)
+        self.reads = 0
+
+    def GetBlockSize(self):
+        return self.block
+
+    def ReadAsArray(self, xoff=0, yoff=0, win_xsize=None, win_ysize=None):
+        self.reads += 1
+        if win_xsize is None:
+            win_xsize = self.XSize - xoff
+        if win_ysize is None:
+            win_ysize = self.YSize - yoff
+        return self.array[yoff:yoff + win_ysize, xoff:xoff + win_xsize].copy()
+
+
+@pytest.fixture
+def band():
+    return ArrayBand(np.arange(60 * 50, dtype=np.int32).reshape(60, 50))
+
+
+@pytest.mark.parametrize("make_cache", [BandCache, BlockCache,
+                                        lambda band: BlockCache(band, 2)])
+def test_take_and_value(band, make_cache):
+    cache = make_cache(band)
+    random = np.random.RandomState(0)
+    rows = random.randint(0, 60, (30, 20))
+    cols = random.randint(0, 50, (30, 20))
+
+    assert np.array_equal(cache.take(rows, cols), band.array[rows, cols])
+    assert cache.value(49, 59) == band.array[59, 49]
+    assert cache.take(rows[:0], cols[:0]).shape == (0, 20)
+
+
+@pytest.mark.parametrize("make_cache", [BandCache, BlockCache])
+def test_hits_and_misses_count_points(band, make_cache):
+    cache = make_cache(band)
+    random = np.random.RandomState(1)
+    rows = random.randint(0, 60, 1000)
+    cols = random.randint(0, 50, 1000)
+
+    cache.take(rows, cols)
+    cache.take(rows, cols)
+    cache.value(0, 0)
+
+    info = cache.info()
+    assert info.hits + info.misses == 2001
+    assert info.misses == band.reads == info.blocks
+    assert info.nbytes == band.array.nbytes
@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+gdal = pytest.importorskip("osgeo.gdal")
+
+from conftest import NODATA, dem_values, write_gtiff
+from raster.checksum import band_checksums
+
+
+def gdal_checksums(path):
+    """
+    {band: {"checksum", "overviews"}} from GDAL's own Checksum()
+    """
+    data_set = gdal.Open(path)
+    result = {}
+    for i in range(1, data_set.RasterCount + 1):
+        band = data_set.GetRasterBand(i)
+        result[i] = {"checksum": band.Checksum(),
+                     "overviews": [band.GetOverview(j).Checksum()
+                                   for j in range(band.GetOverviewCount())]}
+    return result
+
+
+def test_matches_band_checksum_in_memory():
+    path = write_gtiff("/vsimem/checksum.tif",
+                       np.stack([dem_values(seed=0), dem_values(seed=1)]),
+                       NODATA, overviews=(2, 4))
+    try:
+        # /vsimem files only exist in this process
+        assert band_checksums(path, workers=1, strip_rows=16) == \
+            gdal_checksums(path)
+    finally:
+        gdal.Unlink(path)
+
+
+@pytest.mark.parametrize("strip_rows", [16, 32, 256])
+def test_matches_band_checksum_float(tmp_path, strip_rows):
+    values = np.linspace(-3e9, 3e9, 40 * 50).reshape(40, 50).astype(np.float32)
+    values[::7, ::3] = np.nan
+    values[1, :5] = [np.inf, -np.inf, 0.5, -0.5, 2.5]
+    path = write_gtiff(str(tmp_path / "float.tif"), values, overviews=(2,))
+
+    assert band_checksums(path, workers=2, strip_rows=strip_rows) == \
+        gdal_checksums(path)
+
+
+def test_sha256_does_not_depend_on_workers(dem_path):
+    serial = band_checksums(dem_path, mode="sha256", workers=1)
+    parallel = band_checksums(dem_path, mode="sha256", workers=3)
+
+    assert serial == parallel
+    assert len(serial[1]["checksum"]) == 64
@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("scipy")
+
+from events import EARTH_RADIUS_KM, EventStore
+
+
+def haversine_km(lon1, lat1, lon2, lat2):
+    lon1, lat1, lon2, lat2 = map(np.radians, (lon1, lat1, lon2, lat2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 \
+        + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+@pytest.fixture
+def store():
+    random = np.random.RandomState(0)
+    n = 5000
+    lons = random.uniform(-180, 180, n)
+    lats = np.degrees(np.arcsin(random.uniform(-1, 1, n)))
+    # clusters at the poles and across the antimeridian
+    lats[:200] = random.uniform(88, 90, 200)
+    lons[200:400] = random.uniform(179, 181, 200)
+    lons[200:400] -= 360 * (lons[200:400] > 180)
+    lats[200:400] = random.uniform(-5, 5, 200)
+    lons[400:410] = np.nan
+    times = np.datetime64("2014-01-01T00:00", "ms") \
+        + random.randint(0, 10 * 86400000, n).astype("timedelta64[ms]")
+    times[410:420] = np.datetime64("NaT")
+    return EventStore({"longitude": lons, "latitude": lats, "time": times})
+
+
+SITES = [(0.0, 90.0), (180.0, 0.0), (-179.9, 1.0), (12.5, 41.9),
+         (-76.9, 40.9), (45.0, -89.5)]
+
+
+@pytest.mark.parametrize("radius_km", [10.0, 150.0, 2000.0])
+def test_within_radius_matches_haversine(store, radius_km):
+    lons, lats = zip(*SITES)
+    found = store.within_radius(lons, lats, radius_km)
+    counts = store.count_within_radius(lons, lats, radius_km)
+
+    for (lon, lat), indices, count in zip(SITES, found, counts):
+        distance = haversine_km(lon, lat, store.lons, store.lats)
+        # the chord test and haversine may round differently at the edge
+        near_edge = np.abs(distance - radius_km) < 1e-6
+        expected = set(np.flatnonzero((distance <= radius_km) & ~near_edge))
+        assert expected <= set(indices)
+        assert set(indices) - expected <= set(np.flatnonzero(near_edge))
+        assert list(indices) == sorted(indices)
+        assert count == len(indices)
+
+
+def test_within_radius_time_window(store):
+    start = np.datetime64("2014-01-03", "ms")
+    end = np.datetime64("2014-01-06", "ms")
+    found = store.within_radius(0.0, 90.0, 500.0, start, end)[0]
+
+    distance = haversine_km(0.0, 90.0, store.lons, store.lats)
+    in_window = (store.times >= start) & (store.times < end)
+    assert set(found) == set(np.flatnonzero((distance <= 500.0) & in_window))
@@ -0,0 +1,47 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from conftest import NODATA, ROOT, dem_values, write_gtiff
+
+pytest.importorskip("osgeo.gdal")
+
+GDALINFO = os.path.join(ROOT, "raster", "gdalinfo.py")
+
+
+def gdalinfo(*args):
+    """
+    stdout of raster/gdalinfo.py run as a script
+    """
+    result = subprocess.run([sys.executable, GDALINFO] + list(args),
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                            universal_newlines=True, check=False)
+    return result.stdout
+
+
+@pytest.mark.parametrize("stats", ["-stats", "-native_stats"])
+def test_json_hist_output_parses(dem_path, stats):
+    report = json.loads(gdalinfo("-json", "-hist", stats, dem_path))
+
+    band = report["bands"][0]
+    histogram = band["histogram"] if stats == "-stats" \
+        else band["native_stats"]["histogram"]
+    assert histogram["count"] == len(histogram["buckets"]) == 256
+    assert sum(histogram["buckets"]) == (dem_values() != NODATA).sum()
+
+
+@pytest.mark.parametrize("timeout", [[], ["-timeout", "60"]])
+def test_batch_hist_output_parses(tmp_path, timeout):
+    paths = [write_gtiff(str(tmp_path / ("dem%d.tif" % i)), dem_values(seed=i),
+                         NODATA) for i in range(4)]
+
+    output = gdalinfo(*(["-batch", "-workers", "2", "-hist"] + timeout
+                        + [str(tmp_path)]))
+
+    records = [json.loads(line) for line in output.splitlines()]
+    assert sorted(record["path"] for record in records) == paths
+    for record in records:
+        assert "histogram" in record["report"]["bands"][0]
@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("osgeo.gdal")
+
+from raster.rasterstats import RasterStatistics, histogram_range
+
+
+def default_histogram(values, buckets=256):
+    hist_min, hist_max = histogram_range(values.min(), values.max(), buckets)
+    index = np.floor((values - hist_min) * buckets / (hist_max - hist_min))
+    index = np.clip(index.astype(np.int64), 0, buckets - 1)
+    return hist_min, hist_max, np.bincount(index, minlength=buckets)
+
+
+def accumulate(values, nodata=None, parts=3, blocks=13):
+    """
+    statistics of values updated block by block over `parts` partial
+    results, merged as compute_statistics does with workers
+    """
+    results = [RasterStatistics(None, None, default_range=True)
+               for _ in range(parts)]
+    for i, block in enumerate(np.array_split(values, blocks)):
+        results[i % parts].update(block, nodata)
+    for other in results[1:]:
+        results[0].merge(other)
+    return results[0]
+
+
+def test_moments_match_numpy():
+    values = np.random.RandomState(0).normal(500, 120, 20000).astype(np.float32)
+    values[::50] = np.nan
+    stats = accumulate(values)
+
+    valid = values[~np.isnan(values)].astype(np.float64)
+    assert stats.count == len(valid)
+    assert stats.nodata_count == len(values) - len(valid)
+    assert stats.min == valid.min() and stats.max == valid.max()
+    assert np.isclose(stats.mean, valid.mean())
+    assert np.isclose(stats.stddev, valid.std())
+
+
+def test_default_range_histogram_is_exact_for_integers():
+    values = np.random.RandomState(1).randint(-400, 3000, 50000).astype(np.int16)
+    values[::97] = -9999
+    stats = accumulate(values, nodata=-9999)
+
+    hist_min, hist_max, expected = default_histogram(
+        values[values != -9999].astype(np.float64))
+    assert (stats.hist_min, stats.hist_max) == (hist_min, hist_max)
+    assert np.array_equal(stats.histogram, expected)
+
+
+def test_default_range_histogram_for_floats():
+    values = np.random.RandomState(2).lognormal(5, 1, 50000)
+    stats = accumulate(values)
+
+    hist_min, hist_max, expected = default_histogram(values)
+    assert (stats.hist_min, stats.hist_max) == (hist_min, hist_max)
+    assert stats.histogram.sum() == len(values)
+    # values within a fine bin of a bucket edge may change bucket
+    assert np.abs(stats.histogram - expected).sum() <= len(values) // 100
+
+
+def test_fixed_range_histograms_merge():
+    values = np.arange(1000, dtype=np.float64)
+    first = RasterStatistics(0.0, 1000.0, buckets=10)
+    second = RasterStatistics(0.0, 1000.0, buckets=10)
+    first.update(values[:300])
+    second.update(values[300:])
+    first.merge(second)
+
+    assert first.histogram.tolist() == [100] * 10
+    with pytest.raises(ValueError):
+        first.merge(RasterStatistics(0.0, 500.0, buckets=10))
@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+# readerclass imports the old top-level GDAL bindings and plots with
+# matplotlib
+pytest.importorskip("gdal")
+pytest.importorskip("shapely")
+pytest.importorskip("matplotlib")
+
+from conftest import GEOTRANSFORM
+from raster.readerclass import Reader
+
+
+def random_points(n=500, seed=0):
+    """
+    eastings and northings over the 50x40 test DEM and a margin around it
+    """
+    random = np.random.RandomState(seed)
+    x0, width, _, y0, _, height = GEOTRANSFORM
+    xs = x0 + random.uniform(-3, 53, n) * width
+    ys = y0 + random.uniform(-3, 43, n) * height
+    # pixel corners and the far edges of the raster
+    xs[:4] = x0 + np.array([0, 50, 10, 49.999]) * width
+    ys[:4] = y0 + np.array([0, 40, 40, 39.999]) * height
+    return xs, ys
+
+
+@pytest.mark.parametrize("cache", [None, "band", "block"])
+@pytest.mark.parametrize("method", ["nearest", "bilinear", "bicubic"])
+def test_batch_matches_scalar(dem_path, cache, method):
+    reader = Reader(dem_path, cache=cache)
+    xs, ys = random_points()
+
+    batch = reader.get_pixel_values(xs, ys, method=method)[0]
+    scalar = [reader.get_pixel_value(x, y, method=method)
+              for x, y in zip(xs, ys)]
+
+    assert list(np.ma.getmaskarray(batch)) == [v is None for v in scalar]
+    assert batch.compressed().tolist() == \
+        [v for v in scalar if v is not None]
+    reader.close()
+
+
+def test_block_by_block_reads_match_window_reads(dem_path, monkeypatch):
+    reader = Reader(dem_path)
+    xs, ys = random_points()
+    window = reader.get_pixel_values(xs, ys)
+
+    monkeypatch.setattr(Reader, "max_window_pixels", 64)
+    blocks = reader.get_pixel_values(xs, ys)
+
+    assert np.array_equal(np.ma.getmaskarray(window),
+                          np.ma.getmaskarray(blocks))
+    assert np.array_equal(window.compressed(), blocks.compressed())
+    reader.close()
+
+
+def test_cache_info_counts_points(dem_path):
+    reader = Reader(dem_path, cache="block")
+    xs, ys = random_points()
+    x0, width, _, y0, _, height = GEOTRANSFORM
+    cols = np.floor((xs - x0) / width)
+    rows = np.floor((ys - y0) / height)
+    inside = (cols >= 0) & (cols < 50) & (rows >= 0) & (rows < 40)
+
+    reader.get_pixel_values(xs, ys)
+    info = reader.cache_info()
+    assert info.hits + info.misses == inside.sum()
+    assert info.misses == info.blocks
+    reader.close()
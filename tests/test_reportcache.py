@@ -0,0 +1,68 @@
+import json
+import os
+
+from raster.reportcache import ReportCache
+
+OPTIONS = {"bStats": True, "nStatsWorkers": 1}
+
+
+def write(path, data):
+    with open(path, "w") as f:
+        f.write(data)
+    return path
+
+
+def test_reuses_until_a_dataset_file_changes(tmp_path):
+    main = write(str(tmp_path / "dem.bil"), "pixels")
+    header = write(str(tmp_path / "dem.hdr"), "header")
+    report = {"files": [main, header], "size": [1, 1]}
+
+    with ReportCache(str(tmp_path / "cache.db")) as cache:
+        cache.put(main, OPTIONS, report)
+        assert cache.get(main, OPTIONS) == report
+        # worker counts do not change the report
+        assert cache.get(main, dict(OPTIONS, nStatsWorkers=8)) == report
+        assert cache.get(main, dict(OPTIONS, bStats=False)) is None
+
+        write(header, "a longer header")
+        assert cache.get(main, OPTIONS) is None
+
+
+def test_content_hash_survives_touch(tmp_path):
+    main = write(str(tmp_path / "dem.tif"), "pixels")
+    sidecar = write(str(tmp_path / "dem.tif.aux.xml"), "<PAMDataset/>")
+    report = {"files": [main, sidecar]}
+
+    with ReportCache(str(tmp_path / "cache.db"), content_hash=True) as cache:
+        cache.put(main, OPTIONS, report)
+        os.utime(sidecar, ns=(10**9, 10**9))
+        assert cache.get(main, OPTIONS) == report
+
+        write(sidecar, "<PAMDataset></PAMDataset>")
+        assert cache.get(main, OPTIONS) is None
+
+
+def test_entries_persist_after_close(tmp_path):
+    main = write(str(tmp_path / "dem.tif"), "pixels")
+    db_path = str(tmp_path / "cache.db")
+    with ReportCache(db_path) as cache:
+        cache.put(main, OPTIONS, {"files": [main]})
+
+    with ReportCache(db_path) as cache:
+        assert cache.get(main, OPTIONS) == {"files": [main]}
+        cache.invalidate(main)
+        assert cache.get(main, OPTIONS) is None
+
+
+def test_evicts_least_recently_used(tmp_path):
+    paths = [write(str(tmp_path / ("%d.tif" % i)), "x") for i in range(3)]
+    reports = [{"files": [path]} for path in paths]
+    room_for_two = len(json.dumps(reports[0])) * 2
+    with ReportCache(str(tmp_path / "cache.db"), room_for_two) as cache:
+        for path, report in zip(paths, reports):
+            cache.put(path, OPTIONS, report)
+            cache.get(paths[0], OPTIONS)
+
+        assert cache.get(paths[0], OPTIONS) is not None
+        assert cache.get(paths[1], OPTIONS) is None
+        assert cache.get(paths[2], OPTIONS) is not None
@@ -0,0 +1,111 @@
+import os
+
+import numpy as np
+import pytest
+
+from catalog import COLUMN_TYPES, load_catalog
+from conftest import ROOT
+from store import CatalogStore
+
+FEED = os.path.join(ROOT, "datasets", "earthquake_data.csv")
+
+
+@pytest.fixture
+def catalog():
+    return load_catalog(FEED, list(COLUMN_TYPES))
+
+
+def column_bytes(directory):
+    """
+    {file name: contents} of the column and index files
+    """
+    result = {}
+    for name in os.listdir(directory):
+        if name.endswith(".bin"):
+            with open(os.path.join(directory, name), "rb") as f:
+                result[name] = f.read()
+    return result
+
+
+def assert_same_rows(store, catalog, rows, indices):
+    for name in COLUMN_TYPES:
+        expected = np.asarray(catalog[name])[indices]
+        actual = np.asarray(store.catalog[name])[rows]
+        if expected.dtype.kind == "f":
+            assert np.array_equal(actual, expected, equal_nan=True), name
+        else:
+            assert np.array_equal(actual, expected), name
+
+
+def test_reingest_is_idempotent(tmp_path, catalog):
+    directory = str(tmp_path / "store")
+    store = CatalogStore(directory)
+    first = store.ingest(FEED)
+    files = column_bytes(directory)
+
+    again = store.ingest(FEED)
+    reopened = CatalogStore(directory)
+    from_dict = reopened.ingest(catalog)
+
+    n = len(catalog["id"])
+    assert len(first.added) == n and first.ignored == 0
+    for delta in (again, from_dict):
+        assert len(delta.added) == 0 and len(delta.revised) == 0
+        assert delta.ignored == n
+    assert column_bytes(directory) == files
+    assert len(reopened) == n
+    assert_same_rows(reopened, catalog, np.arange(n), np.arange(n))
+
+
+def test_later_revision_overwrites_row(tmp_path, catalog):
+    store = CatalogStore(str(tmp_path / "store"))
+    store.ingest(catalog)
+    rows = store.lookup(catalog["id"][[3, 10, 500]])
+
+    revision = dict((name, np.asarray(values)[[3, 10, 500]].copy())
+                    for name, values in catalog.items())
+    revision["updated"] += np.timedelta64(1, "h")
+    revision["mag"] += 1.5
+    revision["place"] = np.array(["a much longer place name than any before",
+                                  "b", "c"])
+    stale = dict((name, values[:1].copy()) for name, values in revision.items())
+    stale["updated"] -= np.timedelta64(2, "h")
+    stale["mag"] -= 5
+    batch = dict((name, np.concatenate([stale[name], revision[name]]))
+                 for name in revision)
+
+    delta = store.ingest(batch)
+
+    assert len(delta.added) == 0
+    assert sorted(delta.revised) == sorted(rows)
+    assert delta.ignored == 1
+    order = np.argsort(rows)
+    assert np.array_equal(delta.previous["mag"][np.argsort(delta.revised)],
+                          catalog["mag"][[3, 10, 500]][order])
+    untouched = np.setdiff1d(np.arange(len(store)), rows)
+    for current in (store, CatalogStore(store.directory)):
+        assert len(current) == len(catalog["id"])
+        assert_same_rows(current, revision, rows, np.arange(3))
+        assert_same_rows(current, catalog, untouched, untouched)
+
+
+def test_batch_keeps_latest_per_id_and_appends_new(tmp_path, catalog):
+    store = CatalogStore(str(tmp_path / "store"))
+    store.ingest(dict((name, values[:100]) for name, values in catalog.items()))
+
+    batch = dict((name, np.asarray(values)[[150, 150, 120, 5]].copy())
+                 for name, values in catalog.items())
+    batch["id"] = batch["id"].astype("U64")
+    batch["id"][:2] = "a_new_event_id_longer_than_the_others"
+    batch["updated"][0] += np.timedelta64(1, "m")
+    batch["mag"][:2] = [4.0, 3.0]
+
+    delta = store.ingest(batch)
+
+    assert list(delta.added) == [100, 101]
+    assert delta.ignored == 2
+    reopened = CatalogStore(store.directory)
+    assert list(reopened.lookup(["a_new_event_id_longer_than_the_others",
+                                 catalog["id"][120], catalog["id"][5],
+                                 "missing"])) == [100, 101, 5, -1]
+    assert reopened.catalog["mag"][100] == 4.0